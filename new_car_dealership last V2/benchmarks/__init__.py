@@ -0,0 +1 @@
+"""مولد بيانات تجريبية وقياسات أداء طبقة البيانات"""
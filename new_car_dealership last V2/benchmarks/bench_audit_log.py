@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+قياس زمن استعلامات سجل التدقيق والبحث النصي مع نمو حجم السجل، وزمن التحقق
+من سلسلة البصمات (كامل مقابل تزايدي)، وزمن تسجيل الحدث من جهة المستدعي
+(كتابة مباشرة مقابل الطابور والكاتب الخلفي)
+
+يولد أحداثاً صناعية في مجلد مؤقت (لا يمس logs/ الخاص بالتطبيق) ثم يقيس
+get_logs بمرشحات مختلفة لكل حجم.
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.bench_audit_log --sizes 10000 100000 1000000
+"""
+
+import os
+import sys
+import json
+import logging
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from car_dealership.audit_store import AuditStore
+from car_dealership.audit_writer import AuditWriter
+from benchmarks.bench_data_layer import BENCH_DIR, git_revision
+
+EVENT_TYPES = (
+    'تسجيل_دخول', 'إضافة_سيارة', 'تعديل_سيارة', 'حذف_سيارة',
+    'إضافة_عميل', 'تعديل_عميل', 'حذف_عميل', 'إضافة_معاملة'
+)
+USERNAMES = ('admin', 'ahmed', 'mohamed', 'sara', 'khaled', 'omar', 'mona', 'ali', 'hassan', 'youssef', 'nour')
+CLIENT_NAMES = ('أحمد إبراهيم', 'محمد علي', 'فاطمة حسن', 'مُحَمَّد السيد', 'آية محمود', 'أسامة مصطفى', 'إيمان عادل')
+CAR_NAMES = ('تويوتا كورولا', 'هيونداي النترا', 'كيا سيراتو', 'نيسان صني', 'شيفروليه أوبترا')
+DESCRIPTIONS = (
+    "تمت إضافة العميل {client}",
+    "تعديل بيانات العميل {client}",
+    "إضافة سيارة {car} إلى المعرض",
+    "بيع سيارة {car} للعميل {client}",
+    "حذف سيارة {car}",
+    "تسجيل دفعة قسط للعميل {client}",
+)
+
+
+def generate_events(count, seed, end_date=datetime(2024, 12, 31)):
+    """أحداث صناعية موزعة على ثلاث سنوات (مرتبة زمنياً كما في السجل الحقيقي)"""
+    rng = random.Random(seed)
+    start = end_date - timedelta(days=3 * 365)
+    step = (end_date - start).total_seconds() / count
+    for i in range(count):
+        user_id = rng.randint(1, len(USERNAMES))
+        yield {
+            'timestamp': (start + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S'),
+            'user_id': user_id,
+            'username': USERNAMES[user_id - 1],
+            'event_type': rng.choice(EVENT_TYPES),
+            'description': rng.choice(DESCRIPTIONS).format(
+                client=rng.choice(CLIENT_NAMES), car=rng.choice(CAR_NAMES)
+            ) + f" (عملية {i})",
+            'status': 'فشل' if rng.random() < 0.03 else 'نجاح'
+        }
+
+
+def fill_store(store, count, seed, batch=5000):
+    """كتابة الأحداث على دفعات"""
+    pending = []
+    for entry in generate_events(count, seed):
+        pending.append(entry)
+        if len(pending) >= batch:
+            store.append(pending)
+            pending = []
+    store.append(pending)
+
+
+CASES = [
+    ('latest_100', dict(limit=100)),
+    ('event_type_limit_100', dict(event_type='حذف_عميل', limit=100)),
+    ('user_11_limit_100', dict(user_id=11, limit=100)),
+    ('failed_last_week', dict(status='فشل', date_from='2024-12-24', date_to='2024-12-31')),
+    ('one_day', dict(date_from='2024-06-15', date_to='2024-06-15')),
+]
+
+# البحث النصي: صيغ مختلفة للهمزات والتاء المربوطة والتشكيل تطابق نفس الأحداث
+SEARCH_CASES = [
+    ('search_name', 'احمد ابراهيم', {}),
+    ('search_prefix', 'تويو', {}),
+    ('search_taa_marbuta', 'سياره كيا', {}),
+    ('search_with_filter', 'محمد', dict(event_type='حذف_عميل')),
+    ('search_one_month', 'قسط', dict(date_from='2024-06-01', date_to='2024-06-30')),
+]
+
+
+def run_size(size, seed, repeat):
+    """قياس كل الحالات على سجل بحجم size"""
+    logs_dir = tempfile.mkdtemp(prefix='bench_audit_')
+    try:
+        store = AuditStore(logs_dir)
+        start = time.perf_counter()
+        fill_store(store, size, seed)
+        fill_seconds = time.perf_counter() - start
+
+        results = []
+        for name, kwargs in CASES:
+            timings = []
+            rows = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = len(store.query(**kwargs))
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append({
+                'name': name,
+                'rows': rows,
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3)
+            })
+            print(f"    {name:<24} {rows:>7,} صف  median {results[-1]['median_ms']:>8.3f} ms")
+
+        for name, text, filters in SEARCH_CASES:
+            timings = []
+            rows = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = len(store.search(text, limit=200, **filters))
+                timings.append((time.perf_counter() - start) * 1000)
+            matched = store.search_count(text, **filters)
+            results.append({
+                'name': name,
+                'rows': rows,
+                'matched': matched,
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3)
+            })
+            print(f"    {name:<24} {matched:>7,} نتيجة median {results[-1]['median_ms']:>8.3f} ms")
+
+        # التحقق الكامل يعيد حساب كل البصمات، والتزايدي ما بعد آخر نقطة معتمدة فقط
+        for name, full, new_events in (('verify_full', True, 0), ('verify_incremental_1000', False, 1000)):
+            if new_events:
+                store.append(list(generate_events(new_events, seed + 1, end_date=datetime(2025, 1, 31))))
+            start = time.perf_counter()
+            report = store.verify(full=full)
+            elapsed = (time.perf_counter() - start) * 1000
+            results.append({
+                'name': name,
+                'rows': report['checked'],
+                'ok': report['ok'],
+                'median_ms': round(elapsed, 3),
+                'max_ms': round(elapsed, 3)
+            })
+            print(f"    {name:<24} {report['checked']:>7,} سجل   {elapsed:>8.3f} ms")
+
+        store.close()
+        return {
+            'size': size,
+            'fill_seconds': round(fill_seconds, 3),
+            'file_mb': round(os.path.getsize(store.events_file) / 1024 / 1024, 2),
+            'results': results
+        }
+    finally:
+        shutil.rmtree(logs_dir, ignore_errors=True)
+
+
+def measure_write_latency(count, seed):
+    """زمن تسجيل حدث واحد كما يراه المستدعي (خيط الواجهة)"""
+    results = []
+    for name in ('sync_append', 'queued_submit'):
+        logs_dir = tempfile.mkdtemp(prefix='bench_audit_')
+        try:
+            store = AuditStore(logs_dir)
+            writer = AuditWriter(store, logging.getLogger('bench_audit'))
+            timings = []
+            for entry in generate_events(count, seed):
+                start = time.perf_counter()
+                if name == 'sync_append':
+                    store.append([entry])
+                else:
+                    writer.submit(entry)
+                timings.append((time.perf_counter() - start) * 1_000_000)
+            start = time.perf_counter()
+            writer.flush(timeout=60)
+            drain_ms = (time.perf_counter() - start) * 1000
+            written = store.count()
+            store.close()
+        finally:
+            shutil.rmtree(logs_dir, ignore_errors=True)
+
+        timings.sort()
+        results.append({
+            'name': name,
+            'events': count,
+            'written': written,
+            'median_us': round(statistics.median(timings), 2),
+            'p99_us': round(timings[int(0.99 * (len(timings) - 1))], 2),
+            'max_us': round(timings[-1], 2),
+            'drain_ms': round(drain_ms, 3)
+        })
+        print(f"    {name:<16} median {results[-1]['median_us']:>9.2f} us  p99 {results[-1]['p99_us']:>9.2f} us")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء استعلامات سجل التدقيق")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help="أحجام السجل (عدد الأحداث)")
+    parser.add_argument('--seed', type=int, default=42, help="بذرة توليد الأحداث")
+    parser.add_argument('--repeat', type=int, default=20, help="عدد مرات تكرار كل استعلام")
+    parser.add_argument('--write-events', type=int, default=5000, help="عدد الأحداث في قياس زمن التسجيل")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'audit_log.json'),
+                        help="ملف النتائج (JSON)")
+    args = parser.parse_args()
+
+    runs = []
+    for size in args.sizes:
+        print(f"حجم السجل: {size:,} حدث")
+        runs.append(run_size(size, args.seed, args.repeat))
+
+    print(f"زمن تسجيل الحدث ({args.write_events:,} حدث):")
+    write_latency = measure_write_latency(args.write_events, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat
+        },
+        'runs': runs,
+        'write_latency': write_latency
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"تم حفظ النتائج في: {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+قياس تكلفة تسجيل تغييرات الصفوف بالمشغلات على عمليات الكتابة
+
+ينفذ نفس الإضافات والتعديلات والحذف على financial_entries و cars مرتين:
+مرة مع مشغلات row_changes ومرة بعد حذفها، ويقارن الزمن لكل عملية.
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.bench_change_capture --rows 20000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from car_dealership.migrations import apply_migrations, register_change_user, CAPTURED_TABLES
+from benchmarks.bench_data_layer import BENCH_DIR, git_revision
+
+
+def entry_rows(count):
+    for i in range(count):
+        yield ('إيراد' if i % 3 else 'مصروف', f"فئة {i % 12}", f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+               1000.0 + i, f"عملية رقم {i}", 1)
+
+
+def car_rows(count):
+    for i in range(count):
+        yield ('تويوتا', 'كورولا', 2020 + i % 5, f"CH{i:08d}", f"EN{i:08d}", 'جديدة', 'شراء',
+               350000.0 + i, '2024-01-01', '2025-01-01', 'عميل', '0100000000', 'القاهرة', 'نشط')
+
+
+# (الاسم، العبارة، مولد المعاملات) - كل عبارة في معاملة واحدة لكل صف كما في التطبيق
+def build_cases(count):
+    return [
+        ('financial_entries.insert', """
+            INSERT INTO financial_entries (entry_type, category, date, amount, description, created_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, lambda: entry_rows(count)),
+        ('financial_entries.update', """
+            UPDATE financial_entries SET amount = amount + 1, description = description || '*'
+            WHERE id = ?
+        """, lambda: ((i,) for i in range(1, count + 1))),
+        ('cars.insert', """
+            INSERT INTO cars (brand, model, year, chassis, engine, condition, transaction_type,
+                              price, purchase_date, license_expiry, client_name, client_phone,
+                              client_address, client_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, lambda: car_rows(count)),
+        ('cars.update', "UPDATE cars SET price = price - 1000 WHERE id = ?",
+         lambda: ((i,) for i in range(1, count + 1))),
+        ('financial_entries.delete', "DELETE FROM financial_entries WHERE id = ?",
+         lambda: ((i,) for i in range(1, count + 1))),
+    ]
+
+
+def run(capture, count):
+    """تنفيذ الحالات على قاعدة جديدة (مع المشغلات أو بدونها)"""
+    work_dir = tempfile.mkdtemp(prefix='bench_capture_')
+    try:
+        conn = sqlite3.connect(os.path.join(work_dir, 'bench.db'), isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        apply_migrations(conn)
+        # المشغلات تقرأ المستخدم من دالة الاتصال (كما يسجلها مجمع الاتصالات)
+        register_change_user(conn, 1)
+        if not capture:
+            for table in CAPTURED_TABLES:
+                for operation in ('insert', 'update', 'delete'):
+                    conn.execute(f"DROP TRIGGER trg_{table}_capture_{operation}")
+
+        results = {}
+        for name, statement, params in build_cases(count):
+            start = time.perf_counter()
+            for row in params():
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(statement, row)
+                conn.execute("COMMIT")
+            results[name] = (time.perf_counter() - start) * 1_000_000 / count
+
+        changes = conn.execute("SELECT COUNT(*) FROM row_changes").fetchone()[0]
+        conn.close()
+        return results, changes
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس تكلفة تسجيل تغييرات الصفوف")
+    parser.add_argument('--rows', type=int, default=20000, help="عدد الصفوف لكل عملية")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'change_capture.json'),
+                        help="ملف النتائج (JSON)")
+    args = parser.parse_args()
+
+    baseline, _ = run(False, args.rows)
+    captured, changes = run(True, args.rows)
+
+    results = []
+    for name in baseline:
+        overhead = (captured[name] - baseline[name]) / baseline[name] * 100
+        results.append({
+            'name': name,
+            'without_us': round(baseline[name], 2),
+            'with_us': round(captured[name], 2),
+            'overhead_pct': round(overhead, 1)
+        })
+        print(f"    {name:<26} بدون {baseline[name]:>8.2f} us  مع {captured[name]:>8.2f} us  ({overhead:+.1f}%)")
+    print(f"    سجلات التغيير: {changes:,}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'rows': args.rows
+        },
+        'results': results,
+        'row_changes': changes
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"تم حفظ النتائج في: {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
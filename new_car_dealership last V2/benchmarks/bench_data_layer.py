@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+قياس أداء مديري النظام المالي على أحجام بيانات مختلفة
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.bench_data_layer --sizes 1000 10000 100000 --output benchmarks/results/latest.json
+    python -m benchmarks.bench_data_layer --compare benchmarks/results/v1.json benchmarks/results/latest.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from car_dealership.database import Database
+from car_dealership.query_stats import query_stats
+from car_dealership.financial import (
+    AccountingManager, InstallmentsManager, InvoicesManager, ReportsManager
+)
+from benchmarks.generate_dataset import generate_database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+
+# فترة التقارير: سنة كاملة وشهر واحد من بيانات المولد
+YEAR = ('2024-01-01', '2024-12-31')
+MONTH = ('2024-06-01', '2024-06-30')
+
+
+class BenchContext:
+    """قاعدة بيانات مؤقتة مع المديرين وبعض المعرفات الجاهزة للقياس"""
+
+    def __init__(self, database):
+        self.database = database
+        self.accounting = AccountingManager(database)
+        self.installments = InstallmentsManager(database)
+        self.invoices = InvoicesManager(database)
+        self.reports = ReportsManager(database)
+        self.tmp_dir = tempfile.mkdtemp(prefix='bench_export_')
+
+        cursor = database.read_cursor()
+        cursor.execute("SELECT MAX(id) FROM financial_entries")
+        self.last_entry_id = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM installments WHERE remaining_amount > 0 ORDER BY id LIMIT 1")
+        self.open_installment_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(id) FROM installments")
+        self.last_installment_id = cursor.fetchone()[0]
+        cursor.execute("SELECT invoice_number FROM invoices ORDER BY id DESC LIMIT 1")
+        self.invoice_number = cursor.fetchone()[0]
+
+    def next_entry_id(self):
+        """معرف عملية مالية للتعديل/الحذف (يتناقص في كل مرة)"""
+        self.last_entry_id -= 1
+        return self.last_entry_id
+
+    def next_installment_id(self):
+        """معرف قسط للحذف (يتناقص في كل مرة)"""
+        self.last_installment_id -= 1
+        return self.last_installment_id
+
+    def cleanup(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def _export(ctx):
+    """تصدير نتيجة تقرير المبيعات إلى Excel"""
+    _, results, _, _ = ctx.reports.generate_sales_report(*MONTH)
+    headers = ["رقم الفاتورة", "السيارة", "العميل", "التاريخ", "المبلغ", "طريقة الدفع", "الحالة"]
+    return ctx.reports.export_to_excel(
+        [list(row) for row in results], headers,
+        os.path.join(ctx.tmp_dir, 'report.xlsx')
+    )
+
+
+# (الاسم، الدالة، عدد التكرارات) — الأسماء ثابتة لأنها مفاتيح المقارنة بين الإصدارات
+CASES = [
+    # المحاسبة
+    ('accounting.get_entries', lambda ctx: ctx.accounting.get_entries(), 3),
+    ('accounting.get_entries[month]', lambda ctx: ctx.accounting.get_entries(*MONTH), 10),
+    ('accounting.get_summary', lambda ctx: ctx.accounting.get_summary(), 10),
+    ('accounting.get_summary[year]', lambda ctx: ctx.accounting.get_summary(*YEAR), 10),
+    ('accounting.get_categories', lambda ctx: ctx.accounting.get_categories("إيراد"), 100),
+    ('accounting.save_entry', lambda ctx: ctx.accounting.save_entry(
+        "مصروف", "مرافق", 1500.0, '2024-06-15', "قياس أداء", 1), 50),
+    ('accounting.update_entry', lambda ctx: ctx.accounting.update_entry(
+        ctx.next_entry_id(), "مصروف", "مرافق", 1750.0, '2024-06-15', "قياس أداء"), 50),
+    ('accounting.delete_entry', lambda ctx: ctx.accounting.delete_entry(ctx.next_entry_id()), 50),
+
+    # الأقساط
+    ('installments.get_installments', lambda ctx: ctx.installments.get_installments(), 3),
+    ('installments.get_installments[late]', lambda ctx: ctx.installments.get_installments("متأخر"), 5),
+    ('installments.get_installments[month]', lambda ctx: ctx.installments.get_installments(None, *MONTH), 10),
+    ('installments.get_late_installments', lambda ctx: ctx.installments.get_late_installments(), 5),
+    ('installments.update_status', lambda ctx: ctx.installments.update_status(), 10),
+    ('installments.save_installment', lambda ctx: ctx.installments.save_installment(
+        1, 1, 240000.0, 40000.0, 24, '2024-06-15', "قياس أداء", 1), 50),
+    ('installments.record_payment', lambda ctx: ctx.installments.record_payment(
+        ctx.open_installment_id, 1.0, '2024-06-15', "نقدي", "قياس أداء", 1), 50),
+    ('installments.delete_installment', lambda ctx: ctx.installments.delete_installment(
+        ctx.next_installment_id()), 20),
+
+    # الفواتير
+    ('invoices.get_invoices', lambda ctx: ctx.invoices.get_invoices(), 3),
+    ('invoices.get_invoices[month]', lambda ctx: ctx.invoices.get_invoices(*MONTH), 10),
+    ('invoices.get_invoices[cash]', lambda ctx: ctx.invoices.get_invoices(None, None, "نقدي"), 3),
+    ('invoices.get_invoice_details', lambda ctx: ctx.invoices.get_invoice_details(ctx.invoice_number), 100),
+    ('invoices.get_invoice_file', lambda ctx: ctx.invoices.get_invoice_file(ctx.invoice_number), 100),
+    ('invoices.get_sales_summary', lambda ctx: ctx.invoices.get_sales_summary(), 10),
+    ('invoices.get_sales_summary[year]', lambda ctx: ctx.invoices.get_sales_summary(*YEAR), 10),
+    ('invoices.create_invoice', lambda ctx: ctx.invoices.create_invoice(1, 1, 350000.0, "نقدي", 1), 10),
+    ('invoices.regenerate_invoice', lambda ctx: ctx.invoices.regenerate_invoice(ctx.invoice_number), 10),
+
+    # التقارير
+    ('reports.generate_financial_report', lambda ctx: ctx.reports.generate_financial_report(*YEAR), 10),
+    ('reports.generate_installments_report', lambda ctx: ctx.reports.generate_installments_report(*YEAR), 5),
+    ('reports.generate_sales_report', lambda ctx: ctx.reports.generate_sales_report(*YEAR), 5),
+    ('reports.generate_clients_report', lambda ctx: ctx.reports.generate_clients_report(*YEAR), 3),
+    ('reports.export_to_excel', _export, 3),
+]
+
+
+def dataset_path(size, seed):
+    """مسار قاعدة البيانات المولدة لحجم معين (تُعاد استخدامها بين التشغيلات)"""
+    return os.path.join(DATA_DIR, f"aboraaya_{size}_{seed}.db")
+
+
+def prepare_dataset(size, seed):
+    """توليد قاعدة البيانات إن لم تكن موجودة"""
+    path = dataset_path(size, seed)
+    if not os.path.exists(path):
+        print(f"توليد بيانات الحجم {size:,} ...")
+        generate_database(path, size, seed)
+    return path
+
+
+def case_error(result):
+    """
+    رسالة الخطأ إذا أعادت العملية فشلاً
+
+    المديرون يعيدون عند الفشل صفاً أوله False وآخر نص فيه رسالة الخطأ،
+    مثل (False, "...") أو (False, [], {}, "...")
+
+    Returns:
+        str: رسالة الخطأ، أو None إذا نجحت العملية
+    """
+    if result is False:
+        return "فشلت العملية"
+    if isinstance(result, tuple) and result and result[0] is False:
+        messages = [str(item) for item in result[1:] if isinstance(item, str) and item]
+        return messages[-1] if messages else "فشلت العملية"
+    return None
+
+
+def run_case(ctx, name, fn, repeat):
+    """
+    تشغيل حالة قياس واحدة وإرجاع ملخص توقيتاتها
+
+    إذا فشلت العملية تُتخطى الحالة وتُسجل رسالة الخطأ بدلاً من التوقيتات،
+    حتى لا يُقاس زمن مسار الخطأ على أنه زمن العملية
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(ctx)
+        elapsed = (time.perf_counter() - start) * 1000
+        error = case_error(result)
+        if error:
+            return {'name': name, 'runs': len(timings), 'skipped': True, 'error': error}
+        timings.append(elapsed)
+
+    timings.sort()
+    return {
+        'name': name,
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))], 3),
+        'max_ms': round(timings[-1], 3),
+        'mean_ms': round(statistics.fmean(timings), 3)
+    }
+
+
+def run_size(size, seed, selected=None):
+    """قياس جميع الحالات على نسخة مؤقتة من بيانات حجم معين"""
+    source = prepare_dataset(size, seed)
+    work_dir = tempfile.mkdtemp(prefix='bench_db_')
+    results = []
+    try:
+        # العمليات الكاتبة تعمل على نسخة حتى تبقى البيانات المولدة كما هي
+        db_copy = os.path.join(work_dir, 'aboraaya.db')
+        shutil.copy2(source, db_copy)
+
+        database = Database(db_name=db_copy)
+        ctx = BenchContext(database)
+        try:
+            for name, fn, repeat in CASES:
+                if selected and not any(token in name for token in selected):
+                    continue
+                result = run_case(ctx, name, fn, repeat)
+                result['size'] = size
+                results.append(result)
+                if result.get('skipped'):
+                    print(f"    [{size:>8,}] {name:<45} تم التخطي: {result['error']}")
+                else:
+                    print(f"    [{size:>8,}] {name:<45} median {result['median_ms']:>10.3f} ms")
+        finally:
+            ctx.cleanup()
+            database.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    """رقم المراجعة الحالي في git إن وجد"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(baseline_file, current_file, tolerance):
+    """
+    مقارنة ملفي نتائج وطباعة التراجعات
+
+    Args:
+        baseline_file (str): نتائج الإصدار السابق
+        current_file (str): نتائج الإصدار الحالي
+        tolerance (float): نسبة الزيادة المسموح بها في الوسيط (0.2 = 20%)
+
+    Returns:
+        int: عدد الحالات التي تراجع أداؤها
+    """
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {(r['size'], r['name']): r for r in json.load(f)['results']}
+    with open(current_file, encoding='utf-8') as f:
+        current = {(r['size'], r['name']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    for key in sorted(set(baseline) & set(current)):
+        if baseline[key].get('skipped') or current[key].get('skipped'):
+            error = current[key].get('error') or baseline[key].get('error')
+            print(f"[{key[0]:>8,}] {key[1]:<45} (تم التخطي: {error})")
+            continue
+        old = baseline[key]['median_ms']
+        new = current[key]['median_ms']
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  <-- تراجع"
+            regressions += 1
+        print(f"[{key[0]:>8,}] {key[1]:<45} {old:>10.3f} -> {new:>10.3f} ms ({change:+.1%}){flag}")
+
+    for key in sorted(set(current) - set(baseline)):
+        print(f"[{key[0]:>8,}] {key[1]:<45} (جديد)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء طبقة البيانات")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="أحجام البيانات (عدد السيارات)")
+    parser.add_argument('--seed', type=int, default=42, help="بذرة توليد البيانات")
+    parser.add_argument('--only', nargs='*', help="تشغيل الحالات التي تحتوي أسماؤها على هذه النصوص فقط")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'latest.json'),
+                        help="ملف النتائج (JSON)")
+    parser.add_argument('--instrumented', action='store_true',
+                        help="إبقاء قياس الاستعلامات وسجل الاستعلامات البطيئة مفعلاً")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="مقارنة ملفي نتائج بدلاً من التشغيل")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="نسبة التراجع المسموح بها عند المقارنة")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.tolerance)
+        print(f"عدد التراجعات: {regressions}")
+        return 1 if regressions else 0
+
+    query_stats.configure(enabled=args.instrumented)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.seed, args.only))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': args.sizes,
+            'instrumented': args.instrumented
+        },
+        'results': results
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    skipped = [r for r in results if r.get('skipped')]
+    if skipped:
+        print(f"تم تخطي {len(skipped)} حالة فشلت عملياتها (انظر حقل error في النتائج)")
+    print(f"تم حفظ النتائج في: {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+قياس زمن رسم الفاتورة: بدون تخزين مؤقت (كل فاتورة تعيد تسجيل الخط وتشكيل النصوص)
+مقابل الرسام المشترك (الخط مسجل، القالب جاهز، النصوص المشكلة محفوظة)
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.bench_invoice_renderer --count 200 --output benchmarks/results/invoice_renderer.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from car_dealership.database import Database
+from car_dealership.query_stats import query_stats
+from car_dealership.financial.invoice_generator import (
+    FONT_NAME, FONT_PATH, INVOICE_DATA_QUERY,
+    InvoiceRenderer, get_renderer, shape_arabic
+)
+from benchmarks.bench_data_layer import BENCH_DIR, prepare_dataset, git_revision
+
+
+def uncached_render(filepath, data):
+    """الرسم كما كان قبل التخزين المؤقت: تسجيل الخط وتشكيل كل النصوص لكل فاتورة"""
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    shape_arabic.cache_clear()
+    InvoiceRenderer().render(filepath, data)
+
+
+def cached_render(filepath, data):
+    """الرسم عبر الرسام المشترك"""
+    get_renderer().render(filepath, data)
+
+
+def summarize(name, timings):
+    """ملخص توقيتات حالة واحدة"""
+    timings = sorted(timings)
+    return {
+        'name': name,
+        'runs': len(timings),
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))], 3),
+        'mean_ms': round(statistics.fmean(timings), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء رسم الفواتير")
+    parser.add_argument('--count', type=int, default=200, help="عدد الفواتير المرسومة لكل حالة")
+    parser.add_argument('--size', type=int, default=1000, help="حجم البيانات المولدة (عدد السيارات)")
+    parser.add_argument('--seed', type=int, default=42, help="بذرة توليد البيانات")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'invoice_renderer.json'),
+                        help="ملف النتائج (JSON)")
+    args = parser.parse_args()
+
+    query_stats.configure(enabled=False)
+
+    # البيانات تُجلب مرة واحدة حتى يقيس الاختبار الرسم فقط
+    database = Database(db_name=prepare_dataset(args.size, args.seed))
+    try:
+        cursor = database.read_cursor()
+        cursor.execute("SELECT invoice_number FROM invoices ORDER BY id LIMIT ?", (args.count,))
+        numbers = [row[0] for row in cursor.fetchall()]
+        rows = []
+        for number in numbers:
+            cursor.execute(INVOICE_DATA_QUERY, (number,))
+            rows.append(cursor.fetchone())
+    finally:
+        database.close()
+
+    out_dir = tempfile.mkdtemp(prefix='bench_invoices_')
+    results = []
+    try:
+        # تسخين: أول تحميل للخط واستيراد الوحدات لا يُحسب
+        cached_render(os.path.join(out_dir, 'warmup.pdf'), rows[0])
+
+        for name, render in (('uncached', uncached_render), ('cached', cached_render)):
+            timings = []
+            for i, data in enumerate(rows):
+                filepath = os.path.join(out_dir, f"{name}_{i}.pdf")
+                start = time.perf_counter()
+                render(filepath, data)
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append(summarize(name, timings))
+            print(f"    {name:<10} median {results[-1]['median_ms']:>8.3f} ms")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    speedup = results[0]['median_ms'] / results[1]['median_ms'] if results[1]['median_ms'] else 0
+    cache = shape_arabic.cache_info()
+    print(f"التسريع: {speedup:.2f}x | ذاكرة التشكيل: {cache.hits} إصابة / {cache.misses} إخفاق")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'count': len(rows),
+            'size': args.size,
+            'seed': args.seed
+        },
+        'results': results,
+        'speedup': round(speedup, 3),
+        'shape_cache': {'hits': cache.hits, 'misses': cache.misses, 'size': cache.currsize}
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"تم حفظ النتائج في: {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+قياس سرعة أرشفة سجل التغييرات وإعادة تطبيقه (الاسترجاع إلى لحظة محددة)
+
+ينفذ عمليات bench_change_capture (إضافة وتعديل وحذف على financial_entries
+و cars) على قاعدة جديدة، ويؤرشف سجلات row_changes الناتجة، ثم يعيد تطبيقها
+على نسخة من القاعدة قبل العمليات ويتحقق من تطابق الناتج مع الأصل.
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.bench_pitr_replay --rows 40000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from car_dealership.migrations import apply_migrations, register_change_user, CAPTURED_TABLES
+from car_dealership.change_journal import ChangeJournal, replay
+from benchmarks.bench_data_layer import BENCH_DIR, git_revision
+from benchmarks.bench_change_capture import build_cases
+
+# الجداول التي يجب أن تتطابق بعد إعادة التطبيق (المجاميع تحدثها مشغلاتها)
+COMPARED_TABLES = CAPTURED_TABLES + ('row_changes', 'financial_daily_totals', 'financial_monthly_totals')
+
+
+def table_digest(conn, table):
+    """محتوى جدول مرتباً (للمقارنة)"""
+    return conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+
+
+def run(count, batch):
+    work_dir = tempfile.mkdtemp(prefix='bench_pitr_')
+    try:
+        source_path = os.path.join(work_dir, 'source.db')
+        base_path = os.path.join(work_dir, 'base.db')
+        target_path = os.path.join(work_dir, 'replayed.db')
+
+        conn = sqlite3.connect(source_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        apply_migrations(conn)
+        register_change_user(conn, 1)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy2(source_path, base_path)
+
+        # العمليات في معاملات من batch صف (التوقيت هنا لا يُقاس)
+        for _, statement, params in build_cases(count):
+            rows = list(params())
+            for start in range(0, len(rows), batch):
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(statement, rows[start:start + batch])
+                conn.execute("COMMIT")
+        conn.close()
+
+        journal = ChangeJournal(os.path.join(work_dir, 'backups'))
+        start = time.perf_counter()
+        archived = journal.archive(source_path)
+        archive_seconds = time.perf_counter() - start
+        journal_bytes = sum(
+            os.path.getsize(os.path.join(journal.root, segment)) for segment in journal.segments()
+        )
+
+        start = time.perf_counter()
+        entries = list(journal.entries())
+        read_seconds = time.perf_counter() - start
+
+        shutil.copy2(base_path, target_path)
+        target = sqlite3.connect(target_path, isolation_level=None)
+        target.execute("PRAGMA journal_mode = WAL")
+        target.execute("PRAGMA synchronous = NORMAL")
+        start = time.perf_counter()
+        replayed = replay(target, entries)
+        replay_seconds = time.perf_counter() - start
+
+        source = sqlite3.connect(source_path)
+        mismatched = [
+            table for table in COMPARED_TABLES
+            if table_digest(source, table) != table_digest(target, table)
+        ]
+        source.close()
+        target.close()
+
+        return {
+            'changes': archived,
+            'journal_bytes': journal_bytes,
+            'archive_s': round(archive_seconds, 3),
+            'read_s': round(read_seconds, 3),
+            'replay_s': round(replay_seconds, 3),
+            'archive_per_s': round(archived / archive_seconds),
+            'replay_per_s': round(replayed / (read_seconds + replay_seconds)),
+            'identical': not mismatched,
+            'mismatched_tables': mismatched
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أرشفة سجل التغييرات وإعادة تطبيقه")
+    parser.add_argument('--rows', type=int, default=40000, help="عدد الصفوف لكل عملية (5 عمليات)")
+    parser.add_argument('--batch', type=int, default=500, help="عدد الصفوف في كل معاملة عند التوليد")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'pitr_replay.json'),
+                        help="ملف النتائج (JSON)")
+    args = parser.parse_args()
+
+    result = run(args.rows, args.batch)
+    print(f"    سجلات التغيير: {result['changes']:,} ({result['journal_bytes'] / 1024 / 1024:.1f} MB)")
+    print(f"    الأرشفة: {result['archive_s']} ث ({result['archive_per_s']:,} سجل/ث)")
+    print(f"    القراءة + التطبيق: {result['read_s']} + {result['replay_s']} ث "
+          f"({result['replay_per_s']:,} سجل/ث)")
+    print(f"    مطابقة للأصل: {'نعم' if result['identical'] else 'لا ' + ', '.join(result['mismatched_tables'])}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'rows': args.rows,
+            'batch': args.batch
+        },
+        'result': result
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"تم حفظ النتائج في: {os.path.abspath(args.output)}")
+    return 0 if result['identical'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+مولد قاعدة بيانات تجريبية واقعية لمعرض السيارات
+
+الاستخدام (من مجلد التطبيق):
+    python -m benchmarks.generate_dataset --size 200000 --output benchmarks/data/aboraaya.db
+"""
+
+import os
+import sys
+import random
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from car_dealership.database import Database
+from car_dealership.query_stats import query_stats
+from car_dealership.utils.constants import Constants
+
+FIRST_NAMES = [
+    "محمد", "أحمد", "محمود", "علي", "حسن", "حسين", "مصطفى", "إبراهيم",
+    "يوسف", "عمر", "خالد", "طارق", "سامي", "كريم", "وليد", "هشام",
+    "فاطمة", "مريم", "نور", "سارة", "هدى", "منى", "ياسمين", "آية"
+]
+
+FAMILY_NAMES = [
+    "عبد الله", "السيد", "عبد الرحمن", "الشريف", "منصور", "سليمان",
+    "عثمان", "الجمال", "حسانين", "أبو ريا", "عبد العزيز", "البنا",
+    "النجار", "الحداد", "فرج", "شاهين", "رمضان", "غنيم"
+]
+
+CITIES = [
+    "القاهرة", "الجيزة", "الإسكندرية", "المنصورة", "طنطا", "الزقازيق",
+    "أسيوط", "سوهاج", "بنها", "دمياط", "الإسماعيلية", "السويس"
+]
+
+CATEGORIES = {
+    "إيراد": ["مبيعات سيارات", "أقساط", "صيانة", "عمولات", "إيرادات أخرى"],
+    "مصروف": [
+        "مشتريات سيارات", "رواتب", "إيجارات", "مرافق", "صيانة",
+        "مصروفات تسويق", "مصروفات إدارية", "مصروفات أخرى"
+    ]
+}
+
+PAYMENT_METHODS = ["نقدي", "شيك", "تحويل بنكي"]
+
+# عدد الصفوف لكل جدول نسبةً إلى عدد السيارات
+RATIOS = {
+    'clients': 1.0,
+    'financial_entries': 4.0,
+    'installments': 0.5,
+    'invoices': 0.5
+}
+
+BATCH_SIZE = 10000
+
+
+def add_months(value, months):
+    """إضافة عدد من الأشهر إلى تاريخ (مع تثبيت اليوم عند 28 كحد أقصى)"""
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, min(value.day, 28))
+
+
+class DatasetGenerator:
+    """توليد بيانات عشوائية قابلة للتكرار (نفس البذرة تعطي نفس البيانات)"""
+
+    def __init__(self, database, size, seed=42, end_date=date(2024, 12, 31), years=3):
+        """
+        تهيئة المولد
+
+        Args:
+            database (Database): قاعدة البيانات الهدف
+            size (int): عدد السيارات، وبقية الجداول تُحسب منه عبر RATIOS
+            seed (int): بذرة التوليد العشوائي
+            end_date (date): آخر تاريخ في البيانات
+            years (int): عدد السنوات التي تغطيها البيانات
+        """
+        self.database = database
+        self.size = size
+        self.random = random.Random(seed)
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=365 * years)
+        self.days = (end_date - self.start_date).days
+        self.brands = sorted(Constants.CAR_BRANDS.keys())
+        self.clients = []
+
+    def random_date(self):
+        """تاريخ عشوائي داخل فترة البيانات"""
+        return self.start_date + timedelta(days=self.random.randrange(self.days))
+
+    def count(self, table):
+        """عدد الصفوف المطلوب للجدول"""
+        return max(1, int(self.size * RATIOS[table]))
+
+    def insert(self, sql, rows):
+        """إدخال الصفوف على دفعات داخل معاملة واحدة لكل دفعة"""
+        for start in range(0, len(rows), BATCH_SIZE):
+            with self.database.transaction():
+                self.database.cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+
+    def generate_clients(self):
+        """توليد العملاء"""
+        rows = []
+        for i in range(self.count('clients')):
+            name = f"{self.random.choice(FIRST_NAMES)} {self.random.choice(FIRST_NAMES)} {self.random.choice(FAMILY_NAMES)}"
+            phone = f"01{self.random.choice('0125')}{i:08d}"
+            address = f"{self.random.randint(1, 200)} شارع {self.random.choice(FAMILY_NAMES)}، {self.random.choice(CITIES)}"
+            status = self.random.choice(Constants.CLIENT_STATUSES)
+            rows.append((name, phone, address, status))
+            self.clients.append((i + 1, name, phone, address, status))
+
+        self.insert("""
+            INSERT INTO clients (name, phone, address, status)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        return len(rows)
+
+    def generate_cars(self):
+        """توليد السيارات مرتبطة بعملاء عشوائيين"""
+        rows = []
+        for i in range(self.size):
+            brand = self.random.choice(self.brands)
+            model = self.random.choice(Constants.CAR_BRANDS[brand])
+            purchase_date = self.random_date()
+            _, name, phone, address, status = self.random.choice(self.clients)
+            rows.append((
+                brand, model,
+                self.random.randint(2005, self.end_date.year),
+                f"CH{i:010d}", f"EN{i:010d}",
+                self.random.choice(Constants.CAR_CONDITIONS),
+                self.random.choice(Constants.TRANSACTION_TYPES),
+                float(self.random.randrange(150, 3000) * 1000),
+                purchase_date.isoformat(),
+                add_months(purchase_date, 12).isoformat(),
+                name, phone, address, status
+            ))
+
+        self.insert("""
+            INSERT INTO cars (
+                brand, model, year, chassis, engine, condition,
+                transaction_type, price, purchase_date, license_expiry,
+                client_name, client_phone, client_address, client_status
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        return len(rows)
+
+    def generate_financial_entries(self):
+        """توليد العمليات المالية (إيرادات أكثر من المصروفات)"""
+        rows = []
+        for i in range(self.count('financial_entries')):
+            entry_type = "إيراد" if self.random.random() < 0.6 else "مصروف"
+            category = self.random.choice(CATEGORIES[entry_type])
+            rows.append((
+                entry_type, category,
+                round(self.random.uniform(500, 250000), 2),
+                self.random_date().isoformat(),
+                f"{category} - عملية رقم {i + 1}",
+                1
+            ))
+
+        self.insert("""
+            INSERT INTO financial_entries (
+                entry_type, category, amount, date, description, created_by
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        return len(rows)
+
+    def generate_installments(self):
+        """توليد الأقساط ودفعاتها"""
+        installments = []
+        payments = []
+        for i in range(self.count('installments')):
+            installment_id = i + 1
+            total = float(self.random.randrange(100, 2000) * 1000)
+            count = self.random.choice([12, 24, 36, 48, 60])
+            start = self.random_date()
+            monthly = round(total / count, 2)
+
+            # عدد الأقساط المدفوعة حتى الآن (بعض العملاء متأخرون)
+            elapsed = max(0, (self.end_date.year - start.year) * 12 + self.end_date.month - start.month)
+            paid_count = min(count, elapsed - self.random.choice([0, 0, 0, 1, 2]))
+            paid_count = max(0, paid_count)
+
+            for n in range(paid_count):
+                payments.append((
+                    installment_id,
+                    add_months(start, n + 1).isoformat(),
+                    monthly,
+                    self.random.choice(PAYMENT_METHODS),
+                    None,
+                    1
+                ))
+
+            paid = round(monthly * paid_count, 2)
+            remaining = 0.0 if paid_count == count else round(total - paid, 2)
+            next_payment = add_months(start, paid_count + 1)
+            if remaining == 0:
+                status = "منتهي"
+            elif next_payment < self.end_date:
+                status = "متأخر"
+            else:
+                status = "جاري"
+
+            installments.append((
+                self.random.randint(1, self.size),
+                self.random.randint(1, len(self.clients)),
+                total, paid, remaining, count,
+                start.isoformat(), next_payment.isoformat(),
+                status, None, 1
+            ))
+
+        self.insert("""
+            INSERT INTO installments (
+                car_id, client_id, total_amount, paid_amount,
+                remaining_amount, installment_count, start_date,
+                next_payment_date, status, notes, created_by
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, installments)
+        self.insert("""
+            INSERT INTO installment_payments (
+                installment_id, payment_date, amount,
+                payment_method, notes, created_by
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, payments)
+        return len(installments), len(payments)
+
+    def generate_invoices(self):
+        """توليد الفواتير وبنودها بأرقام متسلسلة لكل شهر"""
+        invoice_dates = sorted(self.random_date() for _ in range(self.count('invoices')))
+        sequences = {}
+        invoices = []
+        items = []
+        for i, invoice_date in enumerate(invoice_dates):
+            period = invoice_date.strftime("%Y%m")
+            sequences[period] = sequences.get(period, 0) + 1
+            car_id = self.random.randint(1, self.size)
+            amount = float(self.random.randrange(150, 3000) * 1000)
+            method = "نقدي" if self.random.random() < 0.55 else "تقسيط"
+            invoices.append((
+                f"INV-{period}-{str(sequences[period]).zfill(4)}",
+                car_id,
+                self.random.randint(1, len(self.clients)),
+                invoice_date.isoformat(),
+                amount,
+                method,
+                "مدفوع" if method == "نقدي" else "تقسيط",
+                1
+            ))
+            items.append((i + 1, f"سيارة رقم {car_id}", 1, amount, amount))
+
+        self.insert("""
+            INSERT INTO invoices (
+                invoice_number, car_id, client_id, invoice_date,
+                total_amount, payment_method, payment_status, created_by
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, invoices)
+        self.insert("""
+            INSERT INTO invoice_items (
+                invoice_id, description, quantity, unit_price, total_price
+            ) VALUES (?, ?, ?, ?, ?)
+        """, items)
+        return len(invoices), len(items)
+
+    def generate(self):
+        """توليد جميع الجداول وإرجاع عدد الصفوف لكل جدول"""
+        counts = {}
+        counts['clients'] = self.generate_clients()
+        counts['cars'] = self.generate_cars()
+        counts['financial_entries'] = self.generate_financial_entries()
+        counts['installments'], counts['installment_payments'] = self.generate_installments()
+        counts['invoices'], counts['invoice_items'] = self.generate_invoices()
+
+        # تحديث إحصائيات المخطط بعد الإدخال الكبير
+        self.database.conn.execute("ANALYZE")
+        return counts
+
+
+def generate_database(output, size, seed=42, force=False):
+    """
+    إنشاء ملف قاعدة بيانات تجريبية
+
+    Args:
+        output (str): مسار الملف الناتج
+        size (int): عدد السيارات
+        seed (int): بذرة التوليد
+        force (bool): استبدال الملف إن كان موجوداً
+
+    Returns:
+        dict: عدد الصفوف لكل جدول
+    """
+    output = os.path.abspath(output)
+    if os.path.exists(output):
+        if not force:
+            raise FileExistsError(f"الملف موجود بالفعل: {output}")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(output + suffix):
+                os.remove(output + suffix)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    # القياس غير مطلوب أثناء التوليد
+    query_stats.configure(enabled=False)
+    database = Database(db_name=output)
+    try:
+        return DatasetGenerator(database, size, seed).generate()
+    finally:
+        database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات تجريبية لمعرض السيارات")
+    parser.add_argument('--size', type=int, default=200000, help="عدد السيارات")
+    parser.add_argument('--seed', type=int, default=42, help="بذرة التوليد العشوائي")
+    parser.add_argument(
+        '--output',
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'aboraaya.db'),
+        help="مسار قاعدة البيانات الناتجة"
+    )
+    parser.add_argument('--force', action='store_true', help="استبدال الملف إن كان موجوداً")
+    args = parser.parse_args()
+
+    try:
+        counts = generate_database(args.output, args.size, args.seed, args.force)
+    except FileExistsError as e:
+        print(f"{str(e)} (استخدم --force للاستبدال)")
+        return 1
+
+    print(f"تم إنشاء قاعدة البيانات: {os.path.abspath(args.output)}")
+    for table, count in counts.items():
+        print(f"    {table}: {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
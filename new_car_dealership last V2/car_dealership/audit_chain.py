@@ -0,0 +1,556 @@
+import os
+import sys
+import hmac
+import json
+import hashlib
+import secrets
+import argparse
+from datetime import datetime
+
+# قيمة "السجل السابق" لأول سجل في السلسلة
+GENESIS_HASH = '0' * 64
+
+# حقول الربط المضافة لكل سطر في ملفات JSONL
+CHAIN_FIELDS = ('seq', 'prev_hash', 'hash')
+
+# متغير البيئة الذي يمكن أن يحمل مفتاح التوقيع بدلاً من ملف المفتاح
+KEY_ENV = 'AUDIT_CHAIN_KEY'
+
+# ملف المفتاح القديم داخل مجلد السجلات (يُنقل إلى ملف المستخدم عند أول استخدام)
+LEGACY_KEY_FILE = '.audit_chain.key'
+
+
+def default_key_file():
+    """
+    ملف مفتاح التوقيع في ملف المستخدم (خارج مجلد البيانات)
+
+    مجلد التطبيق (السجلات وقاعدة البيانات) يُنسخ ويُشارك، وملف المستخدم لا
+    يُقرأ إلا بحسابه: %APPDATA% على ويندوز و ~/.config على غيره
+    """
+    base = os.environ.get('APPDATA') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'car_dealership', 'audit_chain.key')
+
+
+def record_hash(seq, prev_hash, entry, fields):
+    """بصمة SHA-256 للسجل: رقمه وبصمة السابق وحقول الحدث بترتيب ثابت"""
+    payload = json.dumps(
+        [seq, prev_hash] + [entry.get(field) for field in fields],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _last_line(path, chunk=65536):
+    """آخر سطر مكتمل في ملف (بقراءة نهايته فقط)"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = max(0, size - chunk)
+        while True:
+            f.seek(start)
+            data = f.read(size - start)
+            lines = data.split(b'\n')
+            # الجزء بعد آخر \n سطر لم يكتمل
+            complete = lines[:-1] if start == 0 else lines[1:-1]
+            complete = [line for line in complete if line.strip()]
+            if complete or start == 0:
+                return complete[-1] + b'\n' if complete else None
+            start = max(0, start - chunk)
+
+
+def _line_seq(line):
+    """رقم السجل في سطر (None لسطر بلا ربط)"""
+    try:
+        record = json.loads(line) if line and line.startswith(b'{') else None
+    except ValueError:
+        return None
+    return record.get('seq') if isinstance(record, dict) else None
+
+
+def chain_order(files):
+    """
+    ترتيب الملفات حسب أول رقم تسلسلي فيها (ترتيب الكتابة)
+
+    أسماء المقاطع تُرتب بتاريخ أول حدث، وقد يختلف عن ترتيب الكتابة إذا
+    كُتبت أحداث بطوابع زمنية أقدم (تغيير ساعة الجهاز مثلاً)
+    """
+    def first_seq(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    seq = _line_seq(line)
+                    # الأسطر بلا ربط أقدم من بداية السلسلة
+                    return seq if seq is not None else 0
+        return 0
+    return sorted(files, key=first_seq)
+
+
+class AuditChain:
+    """
+    سلسلة بصمات سجل التدقيق مع نقاط تحقق موقعة
+
+    كل سطر يحمل رقمه التسلسلي seq وبصمة السطر السابق prev_hash وبصمته hash،
+    فتعديل أو حذف أو إدراج أي سطر يكسر الربط. كل checkpoint_interval سجل
+    (وعند الإغلاق والأرشفة) تُكتب نقطة تحقق (seq, hash) موقعة بـ HMAC في
+    audit_checkpoints.jsonl: إعادة حساب البصمات بعد التعديل لا تطابق التوقيع
+    دون المفتاح.
+
+    التحقق تزايدي: يبدأ من آخر نقطة تحقق اعتُمدت في تحقق سابق ناجح (محفوظة
+    موقعة في audit_verify.json) فلا يعيد حساب إلا السجلات بعدها.
+
+    لكل سجل يحقق due(seq) يجب وجود نقطة تحقق موقعة: حذف ملف نقاط التحقق أو
+    اقتطاعه ثم إعادة حساب البصمات لا يمر على أنه سلسلة جديدة. أول تحقق ناجح
+    يضيف نقطة موقعة بعلامة verified، فضياع audit_verify.json بعدها يُبلّغ عنه
+    ولا يبدأ التحقق التزايدي من أول السجل بصمت.
+
+    المفتاح لا يُحفظ في مجلد السجلات: يُقرأ من AUDIT_CHAIN_KEY، أو من ملف في
+    ملف المستخدم يُنشأ عند أول استخدام (default_key_file). نقاط التحقق تكشف
+    التعديل ممن لا يملك المفتاح فقط: من يقرأ ملف المفتاح المحلي (حساب
+    المستخدم نفسه أو مدير الجهاز) يستطيع إعادة التوقيع، ولذلك يبين التحقق
+    مصدر المفتاح (key_source) وينبه عند استخدام المفتاح المحلي المُولد.
+    """
+
+    def __init__(self, logs_dir, checkpoint_interval=1000, key_file=None):
+        self.logs_dir = logs_dir
+        self.key_file = key_file or default_key_file()
+        self.checkpoints_file = os.path.join(logs_dir, 'audit_checkpoints.jsonl')
+        self.state_file = os.path.join(logs_dir, 'audit_verify.json')
+        self.checkpoint_interval = checkpoint_interval
+        self.head = None
+        self._key = None
+
+    # ------------------------------------------------------------------
+    # المفتاح والتوقيع
+    # ------------------------------------------------------------------
+
+    def key_source(self):
+        """مصدر مفتاح التوقيع: 'env' (متغير البيئة) أو 'local' (ملف المفتاح المحلي)"""
+        return 'env' if os.environ.get(KEY_ENV) else 'local'
+
+    def _signing_key(self):
+        """مفتاح HMAC: من متغير البيئة، أو من ملف المفتاح (يُنشأ عند أول استخدام)"""
+        if self._key is None:
+            if os.environ.get(KEY_ENV):
+                self._key = os.environ[KEY_ENV].encode('utf-8')
+            else:
+                self._key = self._local_key()
+        return self._key
+
+    def _local_key(self):
+        """قراءة ملف المفتاح المحلي أو إنشاؤه (بنقل المفتاح القديم من مجلد السجلات)"""
+        legacy_file = os.path.join(self.logs_dir, LEGACY_KEY_FILE)
+        if not os.path.exists(self.key_file):
+            os.makedirs(os.path.dirname(self.key_file), exist_ok=True)
+            if os.path.exists(legacy_file):
+                # نقاط التحقق الحالية موقعة بالمفتاح القديم
+                with open(legacy_file, 'rb') as f:
+                    key = f.read().strip()
+            else:
+                key = secrets.token_hex(32).encode('ascii')
+            try:
+                # O_EXCL: عمليتان لا تنشئان مفتاحين مختلفين
+                fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                pass
+            else:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(key)
+        with open(self.key_file, 'rb') as f:
+            key = f.read().strip()
+        if os.path.exists(legacy_file):
+            os.remove(legacy_file)
+        return key
+
+    def sign(self, record):
+        """توقيع قاموس (كل حقوله عدا mac)"""
+        payload = json.dumps(
+            {k: v for k, v in record.items() if k != 'mac'},
+            ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        )
+        return hmac.new(self._signing_key(), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def is_signed(self, record):
+        """هل توقيع القاموس صحيح"""
+        return bool(record) and hmac.compare_digest(str(record.get('mac', '')), self.sign(record))
+
+    # ------------------------------------------------------------------
+    # الكتابة
+    # ------------------------------------------------------------------
+
+    def recover(self, files):
+        """
+        استعادة رأس السلسلة (آخر seq و hash) من آخر سطر مربوط في الملفات،
+        أو من آخر نقطة تحقق إذا كانت أحدث (بعد أرشفة السجل بالكامل)
+        """
+        head = (0, GENESIS_HASH)
+        # آخر سجل مكتوب هو الأكبر رقماً بين أواخر الملفات (لا آخر ملف بالاسم)
+        for path in files:
+            if not os.path.getsize(path):
+                continue
+            line = _last_line(path)
+            seq = _line_seq(line)
+            if seq is not None and seq > head[0]:
+                head = (seq, json.loads(line)['hash'])
+
+        checkpoints = self.checkpoints()
+        if checkpoints and checkpoints[-1]['seq'] > head[0]:
+            head = (checkpoints[-1]['seq'], checkpoints[-1]['hash'])
+        self.head = head
+        return head
+
+    def seal(self, entry, fields):
+        """
+        ربط حدث جديد بالسلسلة
+
+        Returns:
+            dict: حقول الحدث مع seq و prev_hash و hash
+        """
+        seq, prev_hash = self.head
+        seq += 1
+        record = {field: entry.get(field) for field in fields}
+        record['seq'] = seq
+        record['prev_hash'] = prev_hash
+        record['hash'] = record_hash(seq, prev_hash, record, fields)
+        self.head = (seq, record['hash'])
+        return record
+
+    def due(self, seq):
+        """هل يُكتب بعد السجل seq نقطة تحقق دورية"""
+        return seq % self.checkpoint_interval == 0
+
+    def checkpoint(self, seq, record_hash_, inode=None, offset=None, archived=False, verified=False):
+        """
+        كتابة نقطة تحقق موقعة
+
+        Args:
+            seq (int): رقم آخر سجل تغطيه النقطة
+            record_hash_ (str): بصمته
+            inode (int): الملف الذي يحتويه (لبدء التحقق التالي منه مباشرة)
+            offset (int): الموضع بعد السجل في ذلك الملف
+            archived (bool): السجلات حتى seq نُقلت من السجل إلى نسخة احتياطية
+            verified (bool): علامة أول تحقق ناجح (نسخة من نقطة تحقق موجودة)
+        """
+        record = {
+            'seq': seq,
+            'hash': record_hash_,
+            'inode': inode,
+            'offset': offset,
+            'archived': archived,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if verified:
+            record['verified'] = True
+        record['mac'] = self.sign(record)
+        with open(self.checkpoints_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def checkpoints(self):
+        """نقاط التحقق المكتوبة (دون فحص التوقيع) مرتبة حسب seq"""
+        if not os.path.exists(self.checkpoints_file):
+            return []
+        records = []
+        with open(self.checkpoints_file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict) or not isinstance(record.get('seq'), int):
+                    # سطر تالف: يُحتفظ به ليبلّغ عنه التحقق
+                    record = {'seq': -1, 'hash': None, 'corrupt': True}
+                records.append(record)
+        return sorted(records, key=lambda record: record['seq'])
+
+    # ------------------------------------------------------------------
+    # التحقق
+    # ------------------------------------------------------------------
+
+    def verified_state(self):
+        """آخر نقطة تحقق اعتمدها تحقق ناجح (None إذا غابت أو لم يصح توقيعها)"""
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if self.is_signed(state) else None
+
+    def _save_state(self, checkpoint, mark=False):
+        """
+        اعتماد نقطة تحقق كبداية للتحقق التالي (كتابة ذرية)
+
+        Args:
+            checkpoint (dict): نقطة التحقق المعتمدة
+            mark (bool): إضافة علامة verified في ملف نقاط التحقق (أول تحقق ناجح)
+        """
+        state = {key: checkpoint.get(key) for key in ('seq', 'hash', 'inode', 'offset')}
+        state['verified_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        state['mac'] = self.sign(state)
+        temp_path = self.state_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_file)
+        if mark:
+            self.checkpoint(
+                checkpoint['seq'], checkpoint['hash'], checkpoint.get('inode'), checkpoint.get('offset'),
+                archived=bool(checkpoint.get('archived')), verified=True
+            )
+
+    @staticmethod
+    def _locate(files, state):
+        """
+        موضع بداية التحقق التزايدي: الملف الذي يحمل inode نقطة التحقق
+        (inode لا يتغير عند التدوير لأنه إعادة تسمية)
+
+        Returns:
+            tuple: (رقم الملف في القائمة، الموضع) أو None إذا لم يوجد
+        """
+        if not state or state.get('inode') is None:
+            return None
+        for index, path in enumerate(files):
+            stat = os.stat(path)
+            if stat.st_ino == state['inode'] and stat.st_size >= state['offset']:
+                with open(path, 'rb') as f:
+                    f.seek(state['offset'])
+                    line = f.readline()
+                if not line:
+                    return index, state['offset']
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return None
+                # inode قد يُعاد استخدامه لملف آخر: السطر يجب أن يكون التالي فعلاً
+                if record.get('seq') == state['seq'] + 1:
+                    return index, state['offset']
+                return None
+        return None
+
+    def verify(self, files, fields, full=False):
+        """
+        التحقق من سلامة السلسلة
+
+        Args:
+            files (list): ملفات السجل بالترتيب (المقاطع ثم الملف النشط)
+            fields (tuple): حقول الحدث الداخلة في البصمة
+            full (bool): التحقق من أول السجل بدلاً من آخر نقطة معتمدة
+
+        Returns:
+            dict: {ok, full, start_seq, last_seq, checked, unchained, checkpoint, broken, key_source}
+                  حيث broken أول رابط مكسور {seq, segment, offset, reason} أو None
+                  و key_source مصدر مفتاح التوقيع ('env' أو 'local')
+        """
+        checkpoints = self.checkpoints()
+        state = None if full else self.verified_state()
+        report = {
+            'ok': False, 'full': state is None, 'start_seq': 0, 'last_seq': 0,
+            'checked': 0, 'unchained': 0, 'checkpoint': None, 'broken': None,
+            'key_source': self.key_source()
+        }
+
+        def broken(reason, seq=None, segment=None, offset=None):
+            report['broken'] = {'seq': seq, 'segment': segment, 'offset': offset, 'reason': reason}
+            return report
+
+        if any(cp.get('corrupt') for cp in checkpoints):
+            return broken("سطر تالف في ملف نقاط التحقق")
+
+        # بعد أول تحقق ناجح لا يُقبل غياب حالته: البدء من أول السجل يلزمه طلب صريح
+        marked = any(cp.get('verified') and self.is_signed(cp) for cp in checkpoints)
+        if state is None and marked and not full:
+            report['full'] = False
+            return broken("حالة آخر تحقق ناجح (audit_verify.json) مفقودة أو توقيعها غير صحيح")
+
+        expected, prev_hash = 1, GENESIS_HASH
+        if state:
+            trusted = [cp for cp in checkpoints if cp['seq'] == state['seq'] and cp['hash'] == state['hash']]
+            if not trusted:
+                return broken("نقطة التحقق المعتمدة سابقاً حُذفت من ملف نقاط التحقق", state['seq'])
+            expected, prev_hash = state['seq'] + 1, state['hash']
+            report['start_seq'] = state['seq']
+            report['checkpoint'] = state['seq']
+
+        # نقاط التحقق بعد البداية فقط هي التي تُفحص توقيعاتها
+        pending = {}
+        for cp in checkpoints:
+            if cp['seq'] < expected:
+                continue
+            if not self.is_signed(cp):
+                return broken("توقيع نقطة تحقق غير صحيح", cp.get('seq'))
+            pending[cp['seq']] = cp
+        last_checkpoint = None
+
+        def missing_checkpoint(last):
+            """أول سجل دوري من expected حتى last بلا نقطة تحقق موقعة (أو None)"""
+            interval = self.checkpoint_interval
+            first_due = -(-expected // interval) * interval
+            for due_seq in range(first_due, last + 1, interval):
+                if due_seq not in pending:
+                    return due_seq
+            return None
+
+        def skip_archived(seq, prev=None):
+            """
+            السجلات حتى seq أُرشفت: مقبول فقط بنقطة تحقق أرشفة موقعة، وبنفس
+            البصمة التي يرتبط بها السجل التالي إن وُجد، مع بقاء نقاط التحقق
+            الدورية للسجلات المؤرشفة
+            """
+            cp = pending.get(seq)
+            if not cp or not cp.get('archived') or (prev is not None and cp['hash'] != prev):
+                return None
+            if missing_checkpoint(seq) is not None:
+                return None
+            for key in [key for key in pending if key <= seq]:
+                del pending[key]
+            return cp
+
+        files = chain_order(files)
+        located = self._locate(files, state)
+        first_file, offset = located if located else (0, 0)
+        # بعد موضع محدد نحن داخل السلسلة: لا يُقبل سطر بلا ربط
+        in_chain = located is not None
+        started = False
+        for path in files[first_file:]:
+            segment = os.path.basename(path)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    line_offset, offset = offset, offset + len(line)
+                    if not line.endswith(b'\n'):
+                        # سطر لم يكتمل بعد (كتابة جارية)
+                        break
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict):
+                        if in_chain:
+                            return broken("سطر غير صالح في السجل", expected, segment, line_offset)
+                        report['unchained'] += 1
+                        continue
+
+                    seq = record.get('seq')
+                    if seq is None:
+                        # أحداث كُتبت قبل تفعيل السلسلة: مقبولة في بداية السجل فقط
+                        if in_chain:
+                            return broken("سجل بلا ربط بعد بداية السلسلة", expected, segment, line_offset)
+                        report['unchained'] += 1
+                        continue
+                    in_chain = True
+                    if not started and not located and seq < expected:
+                        # بداية غير محددة الموضع: تخطي ما سبق التحقق منه
+                        continue
+                    started = True
+
+                    if seq != expected:
+                        cp = skip_archived(seq - 1, record.get('prev_hash')) if seq > expected else None
+                        if not cp:
+                            return broken(f"تسلسل غير متصل (المتوقع {expected})", seq, segment, line_offset)
+                        last_checkpoint = cp
+                        expected, prev_hash = seq, cp['hash']
+                    if record.get('prev_hash') != prev_hash:
+                        return broken("الربط بالسجل السابق مكسور", seq, segment, line_offset)
+                    digest = record_hash(seq, prev_hash, record, fields)
+                    if digest != record.get('hash'):
+                        return broken("محتوى السجل معدل", seq, segment, line_offset)
+
+                    cp = pending.pop(seq, None)
+                    if cp:
+                        if cp['hash'] != digest:
+                            return broken("السجل لا يطابق نقطة التحقق الموقعة", seq, segment, line_offset)
+                        last_checkpoint = cp
+                    elif self.due(seq):
+                        # ملف نقاط التحقق حُذف أو اقتُطع
+                        return broken("نقطة التحقق الموقعة لهذا السجل مفقودة", seq, segment, line_offset)
+                    prev_hash = digest
+                    expected += 1
+                    report['checked'] += 1
+            offset = 0
+
+        report['last_seq'] = expected - 1
+        if pending:
+            # نقاط بعد آخر سجل: إما أرشفة للسجل كاملاً أو سجلات محذوفة من النهاية
+            cp = skip_archived(max(pending)) if max(pending) >= expected else None
+            if cp and not pending:
+                last_checkpoint = cp
+                report['last_seq'] = cp['seq']
+            else:
+                return broken(
+                    f"سجلات مفقودة بعد السجل {expected - 1} (نقطة تحقق حتى {max(pending)})",
+                    expected
+                )
+
+        report['ok'] = True
+        if last_checkpoint:
+            report['checkpoint'] = last_checkpoint['seq']
+            self._save_state(last_checkpoint, mark=not marked)
+        return report
+
+    def check_file(self, path, fields):
+        """
+        فحص الربط الداخلي لملف واحد (نسخة احتياطية قبل استرجاعها)
+
+        Returns:
+            dict: أول رابط مكسور {seq, offset, reason} أو None
+        """
+        prev = None
+        seen_chained = False
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                line_offset, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line) if line.startswith(b'{') else None
+                except ValueError:
+                    record = None
+                seq = record.get('seq') if isinstance(record, dict) else None
+                if seq is None:
+                    if seen_chained:
+                        return {'seq': None, 'offset': line_offset, 'reason': "سجل بلا ربط بعد بداية السلسلة"}
+                    continue
+                if prev and (seq != prev[0] + 1 or record.get('prev_hash') != prev[1]):
+                    return {'seq': seq, 'offset': line_offset, 'reason': "الربط بالسجل السابق مكسور"}
+                digest = record_hash(seq, record.get('prev_hash'), record, fields)
+                if digest != record.get('hash'):
+                    return {'seq': seq, 'offset': line_offset, 'reason': "محتوى السجل معدل"}
+                seen_chained = True
+                prev = (seq, digest)
+        return None
+
+
+def main():
+    """التحقق من سلامة سجل التدقيق من سطر الأوامر"""
+    from .audit_store import AuditStore
+
+    parser = argparse.ArgumentParser(description="التحقق من سلسلة بصمات سجل التدقيق")
+    parser.add_argument('command', choices=['verify'], help="الأمر")
+    parser.add_argument('--full', action='store_true', help="التحقق من أول السجل لا من آخر نقطة معتمدة")
+    parser.add_argument('--logs-dir', default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs'),
+                        help="مجلد السجلات")
+    args = parser.parse_args()
+
+    store = AuditStore(args.logs_dir)
+    try:
+        report = store.verify(full=args.full)
+    finally:
+        store.close()
+
+    scope = "كامل" if report['full'] else f"تزايدي من السجل {report['start_seq']:,}"
+    print(f"التحقق ({scope}): تم فحص {report['checked']:,} سجل حتى السجل {report['last_seq']:,}")
+    if report['unchained']:
+        print(f"    {report['unchained']:,} حدث قديم كُتب قبل تفعيل السلسلة")
+    if report['key_source'] == 'local':
+        print(f"    تنبيه: التوقيع بالمفتاح المحلي المُولد ({default_key_file()}): من يقرأ هذا الملف "
+              f"يستطيع إعادة توقيع سجل معدل. لحماية أقوى عيّن المفتاح في {KEY_ENV}")
+    if report['ok']:
+        print(f"السلسلة سليمة (آخر نقطة تحقق معتمدة: {report['checkpoint']})")
+        return 0
+    link = report['broken']
+    print(f"أول رابط مكسور: السجل {link['seq']} | المقطع: {link['segment']} | الموضع: {link['offset']}")
+    print(f"    {link['reason']}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
 import os
+import atexit
 import logging
 from datetime import datetime
 from pathlib import Path
+from .audit_store import AuditStore
+from .audit_writer import AuditWriter
+from .backup_catalog import BackupCatalog, LOG_SUFFIX
 
 class AuditLog:
     def __init__(self):
@@ -10,17 +14,52 @@ class AuditLog:
         self.logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
         os.makedirs(self.logs_dir, exist_ok=True)
         
-        # تهيئة ملف السجل
+        # ملف السجل النصي القديم (يُنقل إلى المخزن عند أول تشغيل)
         self.log_file = os.path.join(self.logs_dir, 'audit.log')
         
+        # سجل أخطاء التطبيق العامة (لم يعد يختلط بأحداث التدقيق)
+        self.app_log_file = os.path.join(self.logs_dir, 'app.log')
+        
         # إعداد التسجيل
         logging.basicConfig(
-            filename=self.log_file,
+            filename=self.app_log_file,
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         self.logger = logging.getLogger('audit')
+        
+        # مخزن الأحداث: JSONL + فهرس SQLite
+        self.store = AuditStore(self.logs_dir)
+        self._import_legacy_log()
+        
+        # الكتابة تتم في خيط خلفي: log_event لا ينتظر القرص
+        self.writer = AuditWriter(self.store, self.logger)
+        atexit.register(self._shutdown)
+
+    def _shutdown(self):
+        """كتابة الأحداث المعلقة ثم نقطة تحقق موقعة عند رأس السلسلة"""
+        self.writer.close()
+        try:
+            self.store.checkpoint()
+        except Exception as e:
+            self.logger.error(f"خطأ في كتابة نقطة التحقق: {str(e)}")
+
+    def _import_legacy_log(self):
+        """نقل أحداث audit.log القديم مرة واحدة ثم إعادة تسميته"""
+        try:
+            if (os.path.exists(self.log_file) and os.path.getsize(self.log_file) > 0
+                    and not os.path.exists(self.store.events_file)):
+                count = self.store.import_legacy(self.log_file)
+                os.replace(self.log_file, f"{self.log_file}.imported")
+                self.logger.info(f"تم نقل {count} حدث من السجل القديم")
+        except Exception as e:
+            self.logger.error(f"خطأ في نقل السجل القديم: {str(e)}")
+
+    @property
+    def events_file(self):
+        """ملف أحداث التدقيق (JSONL)"""
+        return self.store.events_file
 
     def log_event(self, user_id: int, username: str, event_type: str, description: str, status: str = "نجاح"):
         """
@@ -43,103 +82,211 @@ class AuditLog:
                 'status': status
             }
             
-            log_message = (
-                f"المستخدم: {username} (ID: {user_id}) | "
-                f"النوع: {event_type} | "
-                f"الوصف: {description} | "
-                f"الحالة: {status}"
-            )
-            
-            self.logger.info(log_message)
+            self.writer.submit(log_entry)
             
         except Exception as e:
-            error_message = f"خطأ في تسجيل الحدث: {str(e)}"
-            self.logger.error(error_message)
-            raise Exception(error_message)
+            # فشل التسجيل لا يجب أن يوقف العملية الأصلية
+            self.logger.error(f"خطأ في تسجيل الحدث: {str(e)}")
 
-    def get_logs(self, limit: int = None, event_type: str = None, user_id: int = None) -> list:
+    def flush(self, timeout: float = 5.0) -> bool:
         """
-        استرجاع سجلات الأحداث مع إمكانية التصفية
+        الانتظار حتى تُكتب كل الأحداث المعلقة
+        
+        Args:
+            timeout (float): أقصى مدة انتظار بالثواني
+            
+        Returns:
+            bool: هل اكتملت الكتابة
+        """
+        return self.writer.flush(timeout)
+
+    def get_logs(self, limit: int = None, event_type: str = None, user_id: int = None,
+                 date_from: str = None, date_to: str = None, status: str = None) -> list:
+        """
+        استرجاع سجلات الأحداث مع إمكانية التصفية (استعلام مفهرس)
         
         Args:
             limit (int): عدد السجلات المطلوبة (اختياري)
             event_type (str): نوع الحدث للتصفية (اختياري)
             user_id (int): معرف المستخدم للتصفية (اختياري)
+            date_from (str): بداية الفترة YYYY-MM-DD (اختياري)
+            date_to (str): نهاية الفترة YYYY-MM-DD شاملة (اختياري)
+            status (str): حالة الحدث للتصفية (اختياري)
             
         Returns:
-            list: قائمة بالسجلات المطلوبة
+            list: قائمة بالأحداث (قواميس) من الأقدم للأحدث
         """
         try:
-            if not os.path.exists(self.log_file):
-                return []
-                
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                logs = f.readlines()
-            
-            # تصفية السجلات
-            filtered_logs = []
-            for log in logs:
-                if event_type and event_type not in log:
-                    continue
-                if user_id and str(user_id) not in log:
-                    continue
-                filtered_logs.append(log.strip())
-            
-            # تحديد عدد السجلات المطلوبة
-            if limit:
-                filtered_logs = filtered_logs[-limit:]
-                
-            return filtered_logs
+            # الأحداث المعلقة في الطابور تظهر في النتائج
+            self.flush()
+            return self.store.query(
+                limit=limit,
+                event_type=event_type,
+                user_id=user_id,
+                date_from=date_from,
+                date_to=date_to,
+                status=status
+            )
             
         except Exception as e:
             error_message = f"خطأ في استرجاع السجلات: {str(e)}"
             self.logger.error(error_message)
             return []
 
+    def get_page(self, before: tuple = None, limit: int = 500, max_id: int = None, **filters) -> list:
+        """
+        صفحة من الأحداث الأحدث أولاً (للعرض التدريجي)
+        
+        Args:
+            before (tuple): (timestamp, id) لآخر حدث في الصفحة السابقة
+            limit (int): حجم الصفحة
+            max_id (int): آخر معرف يشمله العرض (من tail_position)
+            **filters: event_type, user_id, date_from, date_to, status
+            
+        Returns:
+            list: قائمة بالأحداث (قواميس)
+        """
+        try:
+            return self.store.page(before=before, limit=limit, max_id=max_id, **filters)
+            
+        except Exception as e:
+            self.logger.error(f"خطأ في استرجاع صفحة السجلات: {str(e)}")
+            return []
+
+    def search_logs(self, text: str, limit: int = 200, offset: int = 0, max_id: int = None, **filters) -> list:
+        """
+        بحث نصي في الأحداث (أسماء المستخدمين والوصف) مرتب حسب الصلة
+        
+        Args:
+            text (str): نص البحث (الهمزات والتاء المربوطة والتشكيل لا تؤثر)
+            limit (int): عدد النتائج
+            offset (int): تخطي أول offset نتيجة
+            max_id (int): آخر معرف يشمله البحث (من tail_position)
+            **filters: event_type, user_id, date_from, date_to, status
+            
+        Returns:
+            list: قائمة بالأحداث مع rank ومواضع التظليل highlights
+        """
+        try:
+            self.flush()
+            return self.store.search(text, limit=limit, offset=offset, max_id=max_id, **filters)
+            
+        except Exception as e:
+            self.logger.error(f"خطأ في البحث في السجلات: {str(e)}")
+            return []
+
+    def count_search_results(self, text: str, **filters) -> int:
+        """عدد نتائج البحث النصي"""
+        try:
+            return self.store.search_count(text, **filters)
+            
+        except Exception as e:
+            self.logger.error(f"خطأ في حساب نتائج البحث: {str(e)}")
+            return 0
+
+    def tail_position(self) -> dict:
+        """موضع نهاية السجل بعد كتابة الأحداث المعلقة (بداية المتابعة المباشرة)"""
+        self.flush()
+        return self.store.tail_position()
+
+    def read_new_events(self, position: dict) -> tuple:
+        """
+        الأحداث الجديدة منذ موضع سابق
+        
+        Returns:
+            tuple: (قائمة الأحداث من الأقدم للأحدث، الموضع الجديد)
+        """
+        try:
+            return self.store.read_since(position)
+            
+        except Exception as e:
+            self.logger.error(f"خطأ في قراءة الأحداث الجديدة: {str(e)}")
+            return [], position
+
+    def count_events(self, date_from: str = None, date_to: str = None,
+                     event_type: str = None, status: str = None) -> int:
+        """
+        عدد الأحداث في فترة (من البيانات الوصفية للمقاطع)
+        
+        Args:
+            date_from (str): بداية الفترة YYYY-MM-DD (اختياري)
+            date_to (str): نهاية الفترة YYYY-MM-DD شاملة (اختياري)
+            event_type (str): نوع الحدث (اختياري)
+            status (str): حالة الحدث (اختياري)
+            
+        Returns:
+            int: عدد الأحداث
+        """
+        try:
+            self.flush()
+            return self.store.count(date_from, date_to, event_type, status)
+            
+        except Exception as e:
+            self.logger.error(f"خطأ في حساب عدد السجلات: {str(e)}")
+            return 0
+
+    def verify_integrity(self, full: bool = False):
+        """
+        التحقق من سلسلة بصمات سجل التدقيق
+
+        Args:
+            full (bool): التحقق من أول السجل بدلاً من آخر نقطة تحقق معتمدة
+
+        Returns:
+            tuple: (السلسلة سليمة، التقرير أو رسالة الخطأ)
+        """
+        try:
+            self.flush()
+            report = self.store.verify(full=full)
+            if not report['ok']:
+                link = report['broken']
+                self.logger.error(
+                    f"سجل التدقيق معدل: السجل {link['seq']} في {link['segment']} - {link['reason']}"
+                )
+            return report['ok'], report
+        except Exception as e:
+            error_message = f"خطأ في التحقق من سلامة السجلات: {str(e)}"
+            self.logger.error(error_message)
+            return False, error_message
+
+    @staticmethod
+    def format_event(event: dict) -> str:
+        """نص الحدث للعرض والتصدير"""
+        return (
+            f"{event['timestamp']} - "
+            f"المستخدم: {event['username']} (ID: {event['user_id']}) | "
+            f"النوع: {event['event_type']} | "
+            f"الوصف: {event['description']} | "
+            f"الحالة: {event['status']}"
+        )
+
     def clear_logs(self):
-        """مسح جميع السجلات (متاح فقط للمدير)"""
+        """
+        مسح جميع السجلات (متاح فقط للمدير) بعد نقلها إلى ملف نسخة احتياطية
+
+        قاعدة البيانات لا تُنسخ هنا: نسخها مستقل عبر إدارة النسخ الاحتياطي
+        """
         try:
-            if os.path.exists(self.log_file):
-                # إغلاق جميع handlers للسماح بتعديل الملف
-                for handler in self.logger.handlers[:]:
-                    handler.close()
-                    self.logger.removeHandler(handler)
-                logging.shutdown()
-                
+            self.flush()
+            if os.path.exists(self.events_file) or self.store.segment_files():
                 # إنشاء مجلد للنسخ الاحتياطية إذا لم يكن موجوداً
                 backup_dir = os.path.join(os.path.dirname(self.logs_dir), 'backups')
                 os.makedirs(backup_dir, exist_ok=True)
                 
                 # إنشاء نسخة احتياطية قبل المسح
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_base = os.path.join(backup_dir, timestamp)
-                
-                # نسخ ملف السجلات
-                log_backup = f"{backup_base}_audit.log.backup"
-                os.rename(self.log_file, log_backup)
-                
-                # نسخ قاعدة البيانات
-                db_file = os.path.join(os.path.dirname(__file__), 'aboraaya.db')
-                if os.path.exists(db_file):
-                    db_backup = f"{backup_base}_database.db.backup"
-                    import shutil
-                    shutil.copy2(db_file, db_backup)
                 
-                # إنشاء ملف سجل جديد
-                with open(self.log_file, 'w', encoding='utf-8') as f:
-                    f.write(f"# تم إنشاء ملف سجل جديد في {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                # دمج مقاطع الأحداث (JSONL) في ملف النسخة الاحتياطية
+                log_backup = os.path.join(backup_dir, f"{timestamp}{LOG_SUFFIX}")
+                meta = self.store.archive(log_backup)
                 
-                # إعادة تهيئة التسجيل
-                logging.basicConfig(
-                    filename=self.log_file,
-                    level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S',
-                    force=True
+                # تسجيل النسخة في فهرس النسخ الاحتياطية
+                BackupCatalog(backup_dir).record_log(
+                    timestamp, os.path.basename(log_backup),
+                    meta['bytes'], meta['lines'], meta['sha256']
                 )
-                self.logger = logging.getLogger('audit')
                 
-                return True, f"تم مسح السجلات وإنشاء نسخة احتياطية كاملة في: {backup_dir}"
+                return True, f"تم مسح السجلات وحفظها في: {log_backup}"
             return False, "ملف السجل غير موجود"
             
         except Exception as e:
@@ -148,20 +295,17 @@ class AuditLog:
             return False, error_message
 
     def restore_backup(self, backup_file: str):
-        """استرجاع نسخة احتياطية من السجلات"""
+        """استرجاع نسخة احتياطية من السجلات (قاعدة البيانات تُسترجع من إدارة النسخ الاحتياطي)"""
         try:
             if not os.path.exists(backup_file):
                 return False, "ملف النسخة الاحتياطية غير موجود"
 
-            # إغلاق جميع handlers للسماح بتعديل الملف
-            for handler in self.logger.handlers[:]:
-                handler.close()
-                self.logger.removeHandler(handler)
-            logging.shutdown()
+            self.flush()
 
-            # استخراج المسار الأساسي للنسخة الاحتياطية
-            backup_base = backup_file.rsplit('_audit.log.backup', 1)[0]
-            db_backup = f"{backup_base}_database.db.backup"
+            # نسخة عُدلت بعد إنشائها لا تُسترجع (قبل أرشفة السجل الحالي)
+            broken = self.store.check_file(backup_file)
+            if broken:
+                return False, f"النسخة الاحتياطية معدلة عند السجل {broken['seq']}: {broken['reason']}"
 
             # عمل نسخة احتياطية من الملفات الحالية
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -169,36 +313,11 @@ class AuditLog:
             os.makedirs(current_backup_dir, exist_ok=True)
 
             # نسخ الملفات الحالية كنسخة احتياطية
-            if os.path.exists(self.log_file):
-                current_log_backup = os.path.join(current_backup_dir, 'audit.log.backup')
-                os.rename(self.log_file, current_log_backup)
-
-            db_file = os.path.join(os.path.dirname(__file__), 'aboraaya.db')
-            if os.path.exists(db_file):
-                current_db_backup = os.path.join(current_backup_dir, 'database.db.backup')
-                import shutil
-                shutil.copy2(db_file, current_db_backup)
-
-            # استرجاع النسخة الاحتياطية
-            # 1. استرجاع ملف السجلات
-            with open(backup_file, 'r', encoding='utf-8') as src, \
-                 open(self.log_file, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
-
-            # 2. استرجاع قاعدة البيانات إذا كانت موجودة
-            if os.path.exists(db_backup):
-                import shutil
-                shutil.copy2(db_backup, db_file)
-
-            # إعادة تهيئة التسجيل
-            logging.basicConfig(
-                filename=self.log_file,
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S',
-                force=True
-            )
-            self.logger = logging.getLogger('audit')
+            current_log_backup = os.path.join(current_backup_dir, 'audit.log.backup')
+            self.store.archive(current_log_backup)
+
+            # استرجاع ملف الأحداث ثم إعادة بناء الفهرس منه
+            self.store.load(backup_file)
 
             return True, "تم استرجاع النسخة الاحتياطية بنجاح"
 
@@ -0,0 +1,939 @@
+import os
+import re
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from .utils.text_normalizer import TextNormalizer
+from .audit_chain import AuditChain, CHAIN_FIELDS, chain_order
+
+# أعمدة الحدث كما تُكتب في ملف JSONL وكما تُعاد من الاستعلامات
+EVENT_FIELDS = ('timestamp', 'user_id', 'username', 'event_type', 'description', 'status')
+
+# لاحقة الملف الجانبي الذي يصف كل مقطع
+META_SUFFIX = '.meta.json'
+
+INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS audit_events (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        user_id INTEGER,
+        username TEXT,
+        event_type TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL,
+        segment TEXT NOT NULL,
+        offset INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_audit_events_timestamp ON audit_events(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_audit_events_type ON audit_events(event_type, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_audit_events_user ON audit_events(user_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_audit_events_status ON audit_events(status, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_audit_events_segment ON audit_events(segment, timestamp);
+
+    -- آخر موضع مفهرس في كل ملف (لاستكمال الفهرسة بعد انقطاع)
+    CREATE TABLE IF NOT EXISTS index_state (
+        segment TEXT PRIMARY KEY,
+        offset INTEGER NOT NULL
+    );
+"""
+
+# البحث النصي: نصوص موحدة (arabic_normalize) ومعرف الصف = audit_events.id
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE audit_fts USING fts5(
+        username, description, event_type,
+        tokenize = 'unicode61 remove_diacritics 0'
+    );
+"""
+
+# أوزان bm25 للأعمدة (username, description, event_type)
+FTS_WEIGHTS = (2.0, 1.0, 0.5)
+
+# علامات حدود الكلمات المطابقة في مخرجات highlight
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# صيغة السطر في ملف audit.log القديم
+LEGACY_LINE = re.compile(
+    r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - \w+ - "
+    r"المستخدم: (?P<username>.*?) \(ID: (?P<user_id>.*?)\) \| "
+    r"النوع: (?P<event_type>.*?) \| "
+    r"الوصف: (?P<description>.*) \| "
+    r"الحالة: (?P<status>.*)$"
+)
+
+
+def parse_legacy_line(line):
+    """
+    تحويل سطر من ملف السجل النصي القديم إلى حدث
+
+    Returns:
+        dict: الحدث، أو None إذا لم يكن السطر حدثاً (رأس ملف أو رسالة خطأ)
+    """
+    match = LEGACY_LINE.match(line.rstrip('\r\n'))
+    if not match:
+        return None
+    entry = match.groupdict()
+    entry['user_id'] = int(entry['user_id']) if entry['user_id'].isdigit() else None
+    return entry
+
+
+def parse_line(line):
+    """تحويل سطر (JSONL أو نصي قديم) إلى حدث، أو None"""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    if line.startswith('{'):
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+    return parse_legacy_line(line)
+
+
+def empty_meta(name):
+    """بيانات وصفية لمقطع فارغ"""
+    return {
+        'segment': name,
+        'min_timestamp': None,
+        'max_timestamp': None,
+        'lines': 0,
+        'bytes': 0,
+        'event_types': {},
+        'statuses': {}
+    }
+
+
+def add_to_meta(meta, entry, size):
+    """تحديث البيانات الوصفية بحدث واحد طوله size بايت"""
+    timestamp = entry.get('timestamp')
+    if timestamp:
+        if meta['min_timestamp'] is None or timestamp < meta['min_timestamp']:
+            meta['min_timestamp'] = timestamp
+        if meta['max_timestamp'] is None or timestamp > meta['max_timestamp']:
+            meta['max_timestamp'] = timestamp
+    meta['lines'] += 1
+    meta['bytes'] += size
+    event_type = entry.get('event_type')
+    meta['event_types'][event_type] = meta['event_types'].get(event_type, 0) + 1
+    status = entry.get('status')
+    meta['statuses'][status] = meta['statuses'].get(status, 0) + 1
+
+
+def write_meta(path, meta):
+    """حفظ الملف الجانبي (كتابة ذرية)"""
+    meta_path = path + META_SUFFIX
+    temp_path = meta_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temp_path, meta_path)
+
+
+def scan_meta(path):
+    """حساب البيانات الوصفية بقراءة الملف كاملاً (عند غياب الملف الجانبي فقط)"""
+    meta = empty_meta(os.path.basename(path))
+    with open(path, 'rb') as f:
+        for line in f:
+            entry = parse_line(line)
+            if entry:
+                add_to_meta(meta, entry, len(line))
+            else:
+                meta['bytes'] += len(line)
+    return meta
+
+
+def read_segment_meta(path):
+    """
+    البيانات الوصفية لمقطع أو ملف نسخة احتياطية
+
+    تُقرأ من الملف الجانبي؛ إذا غاب أو لم يعد مطابقاً لحجم الملف يُعاد
+    حسابها مرة واحدة وتُحفظ.
+
+    Returns:
+        dict: {segment, min_timestamp, max_timestamp, lines, bytes, event_types, statuses}
+    """
+    size = os.path.getsize(path)
+    try:
+        with open(path + META_SUFFIX, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('bytes') == size:
+            return meta
+    except (OSError, ValueError):
+        pass
+    meta = scan_meta(path)
+    try:
+        write_meta(path, meta)
+    except OSError:
+        pass
+    return meta
+
+
+def matches(entry, event_type=None, user_id=None, date_from=None, date_to=None, status=None):
+    """هل يطابق الحدث المرشحات (نفس دلالة استعلام الفهرس)"""
+    if event_type and entry.get('event_type') != event_type:
+        return False
+    if user_id is not None and entry.get('user_id') != int(user_id):
+        return False
+    if status and entry.get('status') != status:
+        return False
+    start, end = _day_bounds(date_from, date_to)
+    timestamp = entry.get('timestamp') or ''
+    if start and timestamp < start:
+        return False
+    if end and timestamp >= end:
+        return False
+    return True
+
+
+def highlight_spans(original, marked):
+    """
+    مواضع الكلمات المطابقة في النص الأصلي
+
+    highlight() يعيد النص الموحد بعلامات؛ المواضع تُحوّل للنص الأصلي عبر
+    خريطة التوحيد (الحذف فقط يغير المواضع).
+
+    Returns:
+        list: قائمة (بداية، نهاية) في النص الأصلي
+    """
+    if not original or not marked or _MARK_START not in marked:
+        return []
+    normalized, positions = TextNormalizer.normalize_with_map(original)
+    spans = []
+    index = 0
+    start = None
+    for char in marked:
+        if char == _MARK_START:
+            start = index
+        elif char == _MARK_END:
+            if start is not None and index > start:
+                # النهاية تشمل التشكيل المحذوف الملاصق لآخر حرف
+                end = positions[index] if index < len(positions) else len(original)
+                spans.append((positions[start], end))
+            start = None
+        else:
+            index += 1
+    if index != len(normalized):
+        # النص المخزن لا يطابق توحيد النص الأصلي (لا يُفترض أن يحدث)
+        return []
+    return spans
+
+
+def _day_bounds(date_from, date_to):
+    """حدود الفترة كنصوص قابلة للمقارنة مع الطوابع الزمنية (النهاية غير شاملة)"""
+    start = date_from[:10] if date_from else None
+    end = None
+    if date_to:
+        end = (datetime.strptime(date_to[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    return start, end
+
+
+class AuditStore:
+    """
+    مخزن أحداث التدقيق: ملفات JSONL يُلحق بها فقط (المصدر الأساسي للبيانات)
+    مع فهرس SQLite جانبي بأعمدة محددة الأنواع للاستعلام السريع
+
+    الملف النشط audit.jsonl يُدوّر إلى logs/segments/ عند تجاوز حجمه
+    max_segment_bytes أو عند بداية شهر جديد. لكل مقطع ملف جانبي .meta.json
+    بأقدم وأحدث طابع زمني وعدد الأسطر وعدد كل نوع حدث وحالة.
+
+    الفهرس يمكن حذفه في أي وقت: يعاد بناؤه من المقاطع عند الفتح التالي.
+    كل سطر مربوط بما قبله في سلسلة بصمات (AuditChain)
+    """
+
+    def __init__(self, logs_dir, max_segment_bytes=16 * 1024 * 1024):
+        self.logs_dir = logs_dir
+        self.segments_dir = os.path.join(logs_dir, 'segments')
+        self.events_file = os.path.join(logs_dir, 'audit.jsonl')
+        self.index_file = os.path.join(logs_dir, 'audit_index.db')
+        self.segment = os.path.basename(self.events_file)
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.RLock()
+        self._conn = None
+        self._meta = None
+        self.chain = AuditChain(logs_dir)
+
+    def _connection(self):
+        """اتصال الفهرس (واحد مشترك بين الخيوط ومحمي بالقفل)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.index_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.create_function('arabic_normalize', 1, TextNormalizer.normalize, deterministic=True)
+            self._conn.executescript(INDEX_SCHEMA)
+            has_fts = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'audit_fts'"
+            ).fetchone()
+            if not has_fts:
+                # فهرس أُنشئ قبل البحث النصي: تُملأ جداوله من الأحداث الموجودة
+                with self._conn:
+                    self._conn.executescript(FTS_SCHEMA)
+                    self._index_text(self._conn, 0)
+            # المقاطع المؤرشفة لا تتغير: تُفهرس مرة عند فتح الفهرس إن لزم
+            for path in self.segment_files():
+                self._sync_segment(self._conn, os.path.basename(path), path)
+        return self._conn
+
+    def close(self):
+        """إغلاق اتصال الفهرس"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def encode(entry):
+        """سطر JSONL واحد للحدث (مع حقول الربط إن وُجدت)"""
+        record = {field: entry.get(field) for field in EVENT_FIELDS}
+        for field in CHAIN_FIELDS:
+            if field in entry:
+                record[field] = entry[field]
+        return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    # ------------------------------------------------------------------
+    # المقاطع والبيانات الوصفية
+    # ------------------------------------------------------------------
+
+    def segment_path(self, name):
+        """المسار الكامل لمقطع من اسمه"""
+        if name == self.segment:
+            return self.events_file
+        return os.path.join(self.segments_dir, name)
+
+    def segment_files(self):
+        """مسارات المقاطع المؤرشفة مرتبة زمنياً (الاسم يبدأ بتاريخ أول حدث)"""
+        if not os.path.isdir(self.segments_dir):
+            return []
+        return [
+            os.path.join(self.segments_dir, name)
+            for name in sorted(os.listdir(self.segments_dir))
+            if name.endswith('.jsonl')
+        ]
+
+    def _active_meta(self):
+        """البيانات الوصفية للملف النشط (في الذاكرة بعد أول قراءة)"""
+        if self._meta is None:
+            if os.path.exists(self.events_file):
+                self._meta = read_segment_meta(self.events_file)
+                self._meta['segment'] = self.segment
+            else:
+                self._meta = empty_meta(self.segment)
+        return self._meta
+
+    def segments(self, date_from=None, date_to=None):
+        """
+        البيانات الوصفية للمقاطع التي تتقاطع مع الفترة (من الملفات الجانبية فقط)
+
+        Args:
+            date_from (str): بداية الفترة (YYYY-MM-DD)
+            date_to (str): نهاية الفترة (YYYY-MM-DD، شاملة)
+
+        Returns:
+            list: قواميس البيانات الوصفية من الأقدم للأحدث
+        """
+        start, end = _day_bounds(date_from, date_to)
+        with self._lock:
+            metas = [read_segment_meta(path) for path in self.segment_files()]
+            active = self._active_meta()
+            if active['lines']:
+                metas.append(dict(active))
+
+        # مقطع بلا طابع زمني صالح في أي سطر (حدود None) لا يُستبعد: يُقرأ من الفهرس
+        return [
+            meta for meta in metas
+            if meta['lines']
+            and (not start or meta['max_timestamp'] is None or meta['max_timestamp'] >= start)
+            and (not end or meta['min_timestamp'] is None or meta['min_timestamp'] < end)
+        ]
+
+    def _should_rotate(self, meta, entry):
+        """هل يبدأ الحدث مقطعاً جديداً"""
+        if not meta['lines']:
+            return False
+        if meta['bytes'] >= self.max_segment_bytes:
+            return True
+        # مقطع لكل شهر على الأكثر
+        return (entry.get('timestamp') or '')[:7] != (meta['min_timestamp'] or '')[:7]
+
+    def _rotate(self, conn):
+        """نقل الملف النشط إلى مجلد المقاطع مع ملفه الجانبي وتحديث الفهرس"""
+        meta = self._active_meta()
+        os.makedirs(self.segments_dir, exist_ok=True)
+
+        stamp = re.sub(r'\D', '', meta['min_timestamp'] or datetime.now().strftime('%Y%m%d%H%M%S'))
+        # الرقم التسلسلي يحفظ ترتيب المقاطع التي تبدأ في نفس الثانية
+        suffix = 1
+        name = f"audit-{stamp}-{suffix:03d}.jsonl"
+        while os.path.exists(os.path.join(self.segments_dir, name)):
+            suffix += 1
+            name = f"audit-{stamp}-{suffix:03d}.jsonl"
+        target = os.path.join(self.segments_dir, name)
+
+        meta = dict(meta, segment=name)
+        os.replace(self.events_file, target)
+        write_meta(target, meta)
+        if os.path.exists(self.events_file + META_SUFFIX):
+            os.remove(self.events_file + META_SUFFIX)
+
+        with conn:
+            conn.execute("UPDATE audit_events SET segment = ? WHERE segment = ?", (name, self.segment))
+            conn.execute("UPDATE index_state SET segment = ? WHERE segment = ?", (name, self.segment))
+        self._meta = empty_meta(self.segment)
+
+    # ------------------------------------------------------------------
+    # الكتابة والفهرسة
+    # ------------------------------------------------------------------
+
+    def append(self, entries):
+        """
+        إلحاق أحداث بالملف النشط ثم فهرستها (مع التدوير عند الحاجة)
+
+        Args:
+            entries (list): قائمة الأحداث (قواميس بحقول EVENT_FIELDS)
+        """
+        if not entries:
+            return
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            if self.chain.head is None:
+                self.chain.recover(self._all_files())
+
+            pending = []
+            for entry in entries:
+                if self._should_rotate(self._active_meta(), entry):
+                    self._write(conn, pending)
+                    pending = []
+                    self._rotate(conn)
+                record = self.chain.seal(entry, EVENT_FIELDS)
+                line = self.encode(record)
+                add_to_meta(self._active_meta(), record, len(line))
+                pending.append((record, line))
+            self._write(conn, pending)
+
+    def _write(self, conn, pending):
+        """كتابة أسطر في الملف النشط وفهرستها وحفظ ملفه الجانبي"""
+        if not pending:
+            return
+        try:
+            rows = []
+            checkpoints = []
+            with open(self.events_file, 'ab') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                for entry, line in pending:
+                    rows.append(self._row(entry, self.segment, f.tell()))
+                    f.write(line)
+                    if self.chain.due(entry['seq']):
+                        checkpoints.append((entry['seq'], entry['hash'], inode, f.tell()))
+                end = f.tell()
+
+            # نقاط التحقق تُكتب بعد أن تصل أسطرها للملف
+            for checkpoint in checkpoints:
+                self.chain.checkpoint(*checkpoint)
+            with conn:
+                self._insert(conn, self.segment, rows, end)
+            write_meta(self.events_file, self._active_meta())
+        except Exception:
+            # البيانات الوصفية ورأس السلسلة في الذاكرة قد لا تطابق الملف: تُقرأ من جديد
+            self._meta = None
+            self.chain.head = None
+            raise
+
+    @staticmethod
+    def _row(entry, segment, offset):
+        """صف الفهرس المقابل لحدث"""
+        return (
+            entry.get('timestamp'), entry.get('user_id'), entry.get('username'),
+            entry.get('event_type'), entry.get('description'), entry.get('status'),
+            segment, offset
+        )
+
+    @staticmethod
+    def _index_text(conn, after_id):
+        """إضافة نصوص الأحداث بعد after_id إلى فهرس البحث (بعد توحيدها)"""
+        conn.execute("""
+            INSERT INTO audit_fts (rowid, username, description, event_type)
+            SELECT id, arabic_normalize(username), arabic_normalize(description),
+                   arabic_normalize(event_type)
+            FROM audit_events
+            WHERE id > ?
+        """, (after_id,))
+
+    @classmethod
+    def _insert(cls, conn, segment, rows, end):
+        """إضافة صفوف للفهرس وحفظ آخر موضع مفهرس"""
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_events").fetchone()[0]
+        conn.executemany("""
+            INSERT INTO audit_events (
+                timestamp, user_id, username, event_type,
+                description, status, segment, offset
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        cls._index_text(conn, last_id)
+        conn.execute("""
+            INSERT INTO index_state (segment, offset) VALUES (?, ?)
+            ON CONFLICT (segment) DO UPDATE SET offset = excluded.offset
+        """, (segment, end))
+
+    def sync(self):
+        """استكمال الفهرس من الملف النشط (بعد انقطاع أو حذف الفهرس)"""
+        with self._lock:
+            self._sync(self._connection())
+
+    def _sync(self, conn):
+        """فهرسة أسطر الملف النشط المكتوبة بعد آخر موضع مفهرس فقط"""
+        self._sync_segment(conn, self.segment, self.events_file)
+
+    def _sync_segment(self, conn, segment, path):
+        """فهرسة ما لم يُفهرس بعد من مقطع واحد"""
+        row = conn.execute(
+            "SELECT offset FROM index_state WHERE segment = ?", (segment,)
+        ).fetchone()
+        indexed = row[0] if row else 0
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        if size < indexed:
+            # الملف استُبدل (مسح أو استرجاع): الفهرس القديم لم يعد صالحاً
+            with conn:
+                conn.execute("""
+                    DELETE FROM audit_fts
+                    WHERE rowid IN (SELECT id FROM audit_events WHERE segment = ?)
+                """, (segment,))
+                conn.execute("DELETE FROM audit_events WHERE segment = ?", (segment,))
+                conn.execute("DELETE FROM index_state WHERE segment = ?", (segment,))
+            indexed = 0
+        if size == indexed:
+            return
+
+        rows = []
+        with open(path, 'rb') as f:
+            f.seek(indexed)
+            offset = indexed
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # سطر لم يكتمل بعد
+                    break
+                entry = parse_line(line)
+                if entry:
+                    rows.append(self._row(entry, segment, offset))
+                offset += len(line)
+
+        with conn:
+            self._insert(conn, segment, rows, offset)
+
+    def rebuild(self):
+        """إعادة بناء الفهرس بالكامل من المقاطع"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM audit_fts")
+                conn.execute("DELETE FROM audit_events")
+                conn.execute("DELETE FROM index_state")
+            for path in self.segment_files():
+                self._sync_segment(conn, os.path.basename(path), path)
+            self._meta = None
+            self._sync(conn)
+
+    def _all_files(self):
+        """كل المقاطع بالترتيب، والملف النشط في النهاية"""
+        files = self.segment_files()
+        if os.path.exists(self.events_file):
+            files.append(self.events_file)
+        return files
+
+    def archive(self, target):
+        """
+        دمج كل المقاطع في ملف واحد target (مع ملفه الجانبي) والبدء بسجل فارغ
+
+        Returns:
+            dict: البيانات الوصفية لملف النسخة مع بصمته (sha256)
+        """
+        with self._lock:
+            meta = empty_meta(os.path.basename(target))
+            digest = hashlib.sha256()
+            with open(target, 'wb') as dst:
+                # بترتيب الكتابة حتى تبقى السلسلة متصلة في ملف النسخة
+                for path in chain_order(self._all_files()):
+                    with open(path, 'rb') as src:
+                        for line in src:
+                            dst.write(line)
+                            digest.update(line)
+                    part = read_segment_meta(path)
+                    meta['lines'] += part['lines']
+                    meta['bytes'] += part['bytes']
+                    for key in ('event_types', 'statuses'):
+                        for name, count in part[key].items():
+                            meta[key][name] = meta[key].get(name, 0) + count
+                    for key, pick in (('min_timestamp', min), ('max_timestamp', max)):
+                        values = [v for v in (meta[key], part[key]) if v]
+                        meta[key] = pick(values) if values else None
+            write_meta(target, meta)
+
+            # نقطة أرشفة موقعة: السلسلة تستمر بعدها في السجل الفارغ
+            if self.chain.head is None:
+                self.chain.recover(self._all_files())
+            seq, head_hash = self.chain.head
+            checkpoints = self.chain.checkpoints()
+            already = checkpoints and checkpoints[-1]['seq'] == seq and checkpoints[-1].get('archived')
+            if seq and not already:
+                self.chain.checkpoint(seq, head_hash, archived=True)
+
+            for path in self._all_files():
+                os.remove(path)
+                if os.path.exists(path + META_SUFFIX):
+                    os.remove(path + META_SUFFIX)
+            self.rebuild()
+
+            meta['sha256'] = digest.hexdigest()
+            return meta
+
+    def load(self, source, batch_size=5000):
+        """
+        تحميل أحداث نسخة احتياطية في سجل فارغ (بعد archive) مع التدوير المعتاد
+
+        يقبل الصيغتين: أسطر JSONL أو أسطر audit.log النصية القديمة. الأحداث
+        تُربط من جديد في نهاية السلسلة الحالية (حقول الربط في النسخة تُفحص
+        قبل الاسترجاع عبر check_file)
+        """
+        with self._lock:
+            batch = []
+            with open(source, 'rb') as src:
+                for line in src:
+                    entry = parse_line(line)
+                    if not entry:
+                        continue
+                    batch.append(entry)
+                    if len(batch) >= batch_size:
+                        self.append(batch)
+                        batch = []
+            self.append(batch)
+
+    def import_legacy(self, legacy_file):
+        """
+        نقل أحداث ملف audit.log النصي القديم إلى المخزن
+
+        Returns:
+            int: عدد الأحداث المنقولة
+        """
+        with open(legacy_file, 'r', encoding='utf-8', errors='replace') as f:
+            entries = [entry for entry in map(parse_legacy_line, f) if entry]
+        self.append(entries)
+        return len(entries)
+
+    # ------------------------------------------------------------------
+    # سلامة السلسلة
+    # ------------------------------------------------------------------
+
+    def checkpoint(self):
+        """نقطة تحقق موقعة عند رأس السلسلة الحالي (عند إغلاق البرنامج)"""
+        with self._lock:
+            if self.chain.head is None:
+                return
+            seq, head_hash = self.chain.head
+            checkpoints = self.chain.checkpoints()
+            if not seq or (checkpoints and checkpoints[-1]['seq'] >= seq):
+                return
+            # آخر سجل في آخر ملف غير فارغ
+            for path in reversed(chain_order(self._all_files())):
+                stat = os.stat(path)
+                if stat.st_size:
+                    self.chain.checkpoint(seq, head_hash, stat.st_ino, stat.st_size)
+                    return
+
+    def verify(self, full=False):
+        """
+        التحقق من سلسلة البصمات (تزايدياً من آخر نقطة معتمدة ما لم يُطلب full)
+
+        Returns:
+            dict: تقرير AuditChain.verify (ok و broken لأول رابط مكسور)
+        """
+        with self._lock:
+            return self.chain.verify(self._all_files(), EVENT_FIELDS, full=full)
+
+    def check_file(self, path):
+        """فحص ربط ملف نسخة احتياطية قبل استرجاعه (أول رابط مكسور أو None)"""
+        return self.chain.check_file(path, EVENT_FIELDS)
+
+    # ------------------------------------------------------------------
+    # الاستعلام
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filter_conditions(event_type=None, user_id=None, date_from=None,
+                           date_to=None, status=None):
+        """شروط WHERE ومعاملاتها لمرشحات الاستعلام"""
+        conditions = []
+        params = []
+        if event_type:
+            conditions.append("event_type = ?")
+            params.append(event_type)
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(int(user_id))
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        start, end = _day_bounds(date_from, date_to)
+        if start:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            # نهاية اليوم شاملة: أقل من بداية اليوم التالي
+            conditions.append("timestamp < ?")
+            params.append(end)
+        return conditions, params
+
+    def _select(self, conditions, params, limit=None):
+        """تنفيذ استعلام الأحداث (الأحدث أولاً)"""
+        query = "SELECT id, timestamp, user_id, username, event_type, description, status FROM audit_events"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params = params + [int(limit)]
+
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            rows = conn.execute(query, params).fetchall()
+
+        columns = ('id',) + EVENT_FIELDS
+        return [dict(zip(columns, row)) for row in rows]
+
+    def query(self, limit=None, event_type=None, user_id=None,
+              date_from=None, date_to=None, status=None):
+        """
+        استعلام الأحداث عبر الفهرس
+
+        Args:
+            limit (int): أحدث عدد من الأحداث (اختياري)
+            event_type (str): نوع الحدث (مطابقة تامة)
+            user_id (int): معرف المستخدم (مطابقة تامة)
+            date_from (str): بداية الفترة (YYYY-MM-DD)
+            date_to (str): نهاية الفترة (YYYY-MM-DD، شاملة)
+            status (str): حالة الحدث
+
+        Returns:
+            list: قواميس الأحداث مرتبة من الأقدم للأحدث
+        """
+        conditions, params = self._filter_conditions(event_type, user_id, date_from, date_to, status)
+        return list(reversed(self._select(conditions, params, limit)))
+
+    def page(self, before=None, limit=500, max_id=None, **filters):
+        """
+        صفحة من الأحداث، الأحدث أولاً (ترقيم بالمفتاح لا بالإزاحة)
+
+        Args:
+            before (tuple): (timestamp, id) لآخر حدث في الصفحة السابقة
+            limit (int): حجم الصفحة
+            max_id (int): تجاهل الأحداث المفهرسة بعد هذا المعرف
+            **filters: event_type, user_id, date_from, date_to, status
+
+        Returns:
+            list: قواميس الأحداث
+        """
+        conditions, params = self._filter_conditions(**filters)
+        if before:
+            # الصفحة التالية تبدأ بعد آخر صف مباشرة عبر نفس الفهرس
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        if max_id is not None:
+            conditions.append("id <= ?")
+            params.append(max_id)
+        return self._select(conditions, params, limit)
+
+    def search(self, text, limit=200, offset=0, max_id=None, **filters):
+        """
+        بحث نصي في أسماء المستخدمين ووصف الأحداث وأنواعها مرتب حسب الصلة (bm25)
+
+        Args:
+            text (str): نص البحث (يوحّد كما توحّد النصوص المفهرسة)
+            limit (int): عدد النتائج
+            offset (int): تخطي أول offset نتيجة
+            max_id (int): تجاهل الأحداث المفهرسة بعد هذا المعرف
+            **filters: event_type, user_id, date_from, date_to, status
+
+        Returns:
+            list: قواميس الأحداث مع rank و highlights {username, description}
+                  (قوائم (بداية، نهاية) في النص الأصلي)
+        """
+        match = TextNormalizer.fts_query(text)
+        if not match:
+            return []
+        conditions, params = self._filter_conditions(**filters)
+        conditions = [f"e.{condition}" for condition in conditions]
+        if max_id is not None:
+            conditions.append("e.id <= ?")
+            params.append(max_id)
+
+        query = f"""
+            SELECT e.id, e.timestamp, e.user_id, e.username, e.event_type,
+                   e.description, e.status,
+                   bm25(audit_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS rank,
+                   highlight(audit_fts, 0, ?, ?),
+                   highlight(audit_fts, 1, ?, ?)
+            FROM audit_fts
+            CROSS JOIN audit_events e ON e.id = audit_fts.rowid
+            WHERE audit_fts MATCH ?
+            {''.join(' AND ' + condition for condition in conditions)}
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        """
+        marks = [_MARK_START, _MARK_END]
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            rows = conn.execute(
+                query, marks + marks + [match] + params + [int(limit), int(offset)]
+            ).fetchall()
+
+        results = []
+        columns = ('id',) + EVENT_FIELDS + ('rank',)
+        for row in rows:
+            event = dict(zip(columns, row[:8]))
+            event['highlights'] = {
+                'username': highlight_spans(event['username'], row[8]),
+                'description': highlight_spans(event['description'], row[9])
+            }
+            results.append(event)
+        return results
+
+    def search_count(self, text, **filters):
+        """عدد نتائج البحث النصي"""
+        match = TextNormalizer.fts_query(text)
+        if not match:
+            return 0
+        conditions, params = self._filter_conditions(**filters)
+        # CROSS JOIN يثبت ترتيب الجدولين: المطابقة النصية أولاً ثم المرشحات،
+        # وإلا قد يختار المخطط فهرس المرشح ويعيد تنفيذ MATCH لكل صف
+        query = """
+            SELECT COUNT(*) FROM audit_fts
+            CROSS JOIN audit_events e ON e.id = audit_fts.rowid
+            WHERE audit_fts MATCH ?
+        """ + ''.join(f" AND e.{condition}" for condition in conditions)
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            return conn.execute(query, [match] + params).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # المتابعة المباشرة
+    # ------------------------------------------------------------------
+
+    def tail_position(self):
+        """
+        موضع نهاية السجل الآن: ما بعده يُقرأ عبر read_since
+
+        Returns:
+            dict: {inode, offset, max_id} حيث max_id آخر حدث مفهرس حتى هذا الموضع
+        """
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            max_id = conn.execute("SELECT MAX(id) FROM audit_events").fetchone()[0] or 0
+            if os.path.exists(self.events_file):
+                stat = os.stat(self.events_file)
+                return {'inode': stat.st_ino, 'offset': stat.st_size, 'max_id': max_id}
+            return {'inode': None, 'offset': 0, 'max_id': max_id}
+
+    @staticmethod
+    def _read_from(path, offset):
+        """الأسطر المكتملة في ملف بعد موضع معين"""
+        entries = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                entry = parse_line(line)
+                if entry:
+                    entries.append(entry)
+                offset += len(line)
+        return entries, offset
+
+    def read_since(self, position):
+        """
+        الأحداث المكتوبة بعد موضع سابق (بقراءة الملف من الموضع فقط)
+
+        إذا دُوِّر الملف النشط منذ الموضع السابق تُقرأ بقية المقطع المؤرشف
+        (يُعرف بنفس inode) ثم الملف الجديد من بدايته.
+
+        Returns:
+            tuple: (قائمة الأحداث من الأقدم للأحدث، الموضع الجديد)
+        """
+        entries = []
+        inode, offset = position['inode'], position['offset']
+        try:
+            stat = os.stat(self.events_file)
+        except FileNotFoundError:
+            stat = None
+
+        if inode is not None and (stat is None or stat.st_ino != inode):
+            # بقية المقطع الذي كان نشطاً، ثم أي مقاطع دُوِّرت بعده بالكامل
+            found = False
+            for path in self.segment_files():
+                if found:
+                    entries.extend(self._read_from(path, 0)[0])
+                elif os.stat(path).st_ino == inode:
+                    found = True
+                    entries.extend(self._read_from(path, offset)[0])
+            offset = 0
+        if stat is None:
+            return entries, dict(position, inode=None, offset=0)
+
+        if stat.st_size < offset:
+            # الملف استُبدل بملف أصغر (مسح السجلات)
+            offset = 0
+        if stat.st_size > offset:
+            new_entries, offset = self._read_from(self.events_file, offset)
+            entries.extend(new_entries)
+        return entries, dict(position, inode=stat.st_ino, offset=offset)
+
+    def count(self, date_from=None, date_to=None, event_type=None, status=None):
+        """
+        عدد الأحداث في فترة من البيانات الوصفية للمقاطع
+
+        المقاطع الواقعة بالكامل داخل الفترة تُحسب من ملفاتها الجانبية دون
+        قراءة أي سطر؛ فقط المقاطع على حدود الفترة تُحسب من الفهرس.
+
+        Returns:
+            int: عدد الأحداث
+        """
+        start, end = _day_bounds(date_from, date_to)
+        total = 0
+        partial = []
+        for meta in self.segments(date_from, date_to):
+            bounded = meta['min_timestamp'] is not None
+            inside = bounded and ((not start or meta['min_timestamp'] >= start)
+                                  and (not end or meta['max_timestamp'] < end))
+            if inside and not (event_type and status):
+                if event_type:
+                    total += meta['event_types'].get(event_type, 0)
+                elif status:
+                    total += meta['statuses'].get(status, 0)
+                else:
+                    total += meta['lines']
+            else:
+                partial.append(meta['segment'])
+
+        if partial:
+            conditions = [f"segment IN ({', '.join('?' * len(partial))})"]
+            params = list(partial)
+            for column, value in (('event_type', event_type), ('status', status)):
+                if value:
+                    conditions.append(f"{column} = ?")
+                    params.append(value)
+            if start:
+                conditions.append("timestamp >= ?")
+                params.append(start)
+            if end:
+                conditions.append("timestamp < ?")
+                params.append(end)
+            with self._lock:
+                conn = self._connection()
+                self._sync(conn)
+                total += conn.execute(
+                    "SELECT COUNT(*) FROM audit_events WHERE " + " AND ".join(conditions),
+                    params
+                ).fetchone()[0]
+        return total
@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+
+# سياسات امتلاء الطابور
+OVERFLOW_BLOCK = 'block'              # الانتظار حتى block_timeout ثم إسقاط الحدث الجديد
+OVERFLOW_DROP_NEW = 'drop_new'        # إسقاط الحدث الجديد فوراً
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # إسقاط أقدم حدث في الطابور لإفساح المجال
+
+
+class _FlushRequest:
+    """علامة تُوضع في الطابور: تكتمل عندما يُكتب كل ما قبلها"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _StopRequest:
+    """علامة تُوضع في الطابور: ينهي خيط الكتابة عملها بعد كتابة ما قبلها"""
+
+
+# علامات التحكم لا تُسقط عند امتلاء الطابور
+_CONTROL = (_FlushRequest, _StopRequest)
+
+
+class AuditWriter:
+    """
+    كاتب أحداث التدقيق في الخلفية (على نمط QueueHandler/QueueListener)
+
+    log_event يضع الحدث في طابور محدود الحجم ويعود فوراً، وخيط الكتابة
+    يجمع الأحداث في دفعات ويكتب كل دفعة في المخزن بعملية واحدة.
+    عند الامتلاء يُسقط أقدم حدث افتراضياً ولا يُنتظر: عدد المسقط يُسجل
+    في حدث "أحداث_مفقودة" مع الدفعة التالية.
+    """
+
+    def __init__(self, store, fallback_logger, max_queue=10000, batch_size=500,
+                 flush_interval=0.5, overflow=OVERFLOW_DROP_OLDEST, block_timeout=0.5):
+        """
+        تهيئة الكاتب
+
+        Args:
+            store (AuditStore): مخزن الأحداث
+            fallback_logger (Logger): يُكتب فيه الحدث نصياً إذا فشلت الكتابة في المخزن
+            max_queue (int): أقصى عدد أحداث معلقة في الذاكرة
+            batch_size (int): أقصى عدد أحداث في الدفعة الواحدة
+            flush_interval (float): أقصى زمن (ثوان) يبقى فيه حدث معلقاً
+            overflow (str): سياسة الامتلاء (block / drop_new / drop_oldest)
+            block_timeout (float): مدة الانتظار في سياسة block
+        """
+        self.store = store
+        self.fallback_logger = fallback_logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._dropped_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        """تشغيل خيط الكتابة عند أول حدث"""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name='audit-writer', daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, entry):
+        """
+        وضع حدث في الطابور (لا يرفع استثناء أبداً)
+
+        Returns:
+            bool: هل قُبل الحدث
+        """
+        try:
+            if self._closed:
+                # بعد الإغلاق (نهاية البرنامج): كتابة مباشرة
+                self._write([entry])
+                return True
+
+            self._ensure_started()
+            if self.overflow == OVERFLOW_BLOCK:
+                self._queue.put(entry, timeout=self.block_timeout)
+                return True
+
+            try:
+                self._queue.put_nowait(entry)
+                return True
+            except queue.Full:
+                if self.overflow != OVERFLOW_DROP_OLDEST:
+                    raise
+                # إفساح مكان بإسقاط أقدم حدث
+                try:
+                    oldest = self._queue.get_nowait()
+                except queue.Empty:
+                    oldest = None
+                if isinstance(oldest, _CONTROL):
+                    # طلب التفريغ أو الإيقاف يعود للطابور ويُسقط الحدث الجديد بدلاً منه
+                    self._queue.put(oldest)
+                    raise
+                if oldest is not None:
+                    self._count_dropped()
+                self._queue.put_nowait(entry)
+                return True
+
+        except queue.Full:
+            self._count_dropped()
+            return False
+        except Exception as e:
+            self.fallback_logger.error(f"خطأ في إضافة حدث للطابور: {str(e)}")
+            return False
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def pending(self):
+        """عدد الأحداث المعلقة تقريباً"""
+        return self._queue.qsize()
+
+    def flush(self, timeout=5.0):
+        """
+        الانتظار حتى تُكتب كل الأحداث المرسلة قبل الاستدعاء
+
+        Returns:
+            bool: هل اكتملت الكتابة خلال المهلة
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        try:
+            request = _FlushRequest()
+            self._queue.put(request, timeout=timeout)
+            return request.done.wait(timeout)
+        except Exception:
+            return False
+
+    def close(self, timeout=5.0):
+        """
+        كتابة المتبقي وإيقاف الخيط وانتظار انتهائه (يُستدعى عند الخروج)
+
+        الأحداث المرسلة بعد الإغلاق تُكتب مباشرة في المخزن.
+
+        Returns:
+            bool: هل انتهى الخيط خلال المهلة
+        """
+        with self._start_lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return True
+        try:
+            self._queue.put(_StopRequest(), timeout=timeout)
+        except queue.Full:
+            return False
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def _run(self):
+        """حلقة الكتابة: تجميع دفعة حتى batch_size أو flush_interval ثم كتابتها"""
+        stopping = False
+        while not stopping:
+            batch = []
+            flushes = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, _StopRequest):
+                    stopping = True
+                    break
+                if isinstance(item, _FlushRequest):
+                    flushes.append(item)
+                    # طلب التفريغ يعني كتابة ما تجمع الآن
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # ما وصل بعد علامة الإيقاف (إرسال تزامن مع الإغلاق) يُكتب معها
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, _FlushRequest):
+                        flushes.append(item)
+                    elif not isinstance(item, _StopRequest):
+                        batch.append(item)
+
+            self._write(batch)
+            for request in flushes:
+                request.done.set()
+
+    def _write(self, batch):
+        """كتابة دفعة في المخزن (مع تسجيل الأحداث المسقطة والرجوع للسجل النصي عند الفشل)"""
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch = batch + [{
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'user_id': None,
+                'username': 'النظام',
+                'event_type': 'أحداث_مفقودة',
+                'description': f"تم إسقاط {dropped} حدث بسبب امتلاء طابور السجل",
+                'status': 'فشل'
+            }]
+        if not batch:
+            return
+        try:
+            self.store.append(batch)
+        except Exception as e:
+            self.fallback_logger.error(f"خطأ في كتابة أحداث التدقيق: {str(e)}")
+            for entry in batch:
+                self.fallback_logger.error(f"حدث لم يُحفظ: {entry}")
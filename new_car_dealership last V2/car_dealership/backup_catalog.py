@@ -0,0 +1,287 @@
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+from contextlib import contextmanager
+from .audit_store import read_segment_meta
+from .chunk_store import ChunkStore, MANIFEST_SUFFIX
+from .db_backup import table_counts
+from .file_snapshot import FileSnapshots
+
+# مجلد النسخ الاحتياطية في نفس مستوى مجلد التطبيق
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backups')
+CATALOG_FILE = 'backup_catalog.db'
+LOG_SUFFIX = '_audit.log.backup'
+# نسخ قاعدة البيانات الكاملة القديمة (قبل التخزين بالقطع)
+DB_SUFFIX = '_database.db.backup'
+
+# حالات التحقق من النسخة
+VERIFY_OK = 'ok'
+VERIFY_FAILED = 'failed'
+
+# مصدر نسخة قاعدة البيانات: المجدولة وحدها تخضع لسياسة الاحتفاظ
+ORIGIN_MANUAL = 'manual'
+ORIGIN_SCHEDULED = 'scheduled'
+
+CATALOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS backups (
+        timestamp TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        log_file TEXT,
+        log_bytes INTEGER,
+        log_records INTEGER,
+        log_sha256 TEXT,
+        db_file TEXT,
+        db_format TEXT,
+        db_bytes INTEGER,
+        stored_bytes INTEGER,
+        db_sha256 TEXT,
+        table_counts TEXT,
+        verify_status TEXT,
+        verified_at TEXT,
+        verify_error TEXT,
+        origin TEXT,
+        fk_violations INTEGER,
+        files_count INTEGER,
+        files_bytes INTEGER,
+        files_new_bytes INTEGER,
+        files_missing TEXT,
+        journal_id INTEGER
+    )
+"""
+
+# أعمدة أُضيفت بعد إنشاء الفهرس (تُضاف لفهارس النسخ الأقدم)
+ADDED_COLUMNS = {
+    'origin': 'TEXT',
+    'fk_violations': 'INTEGER',
+    'files_count': 'INTEGER',
+    'files_bytes': 'INTEGER',
+    'files_new_bytes': 'INTEGER',
+    'files_missing': 'TEXT',
+    'journal_id': 'INTEGER'
+}
+
+COLUMNS = (
+    'timestamp', 'created_at', 'log_file', 'log_bytes', 'log_records', 'log_sha256',
+    'db_file', 'db_format', 'db_bytes', 'stored_bytes', 'db_sha256', 'table_counts',
+    'verify_status', 'verified_at', 'verify_error', 'origin', 'fk_violations',
+    'files_count', 'files_bytes', 'files_new_bytes', 'files_missing', 'journal_id'
+)
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """بصمة sha256 لملف"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupCatalog:
+    """
+    فهرس النسخ الاحتياطية (backups/backup_catalog.db)
+
+    يُكتب عند إنشاء كل نسخة (أحجامها، عدد سجلاتها، بصماتها، عدد صفوف كل
+    جدول وحالة التحقق)، فعرض النسخ قراءة واحدة من الفهرس بدل فحص ملفات
+    النسخ نفسها. النسخة الواحدة (نفس الطابع الزمني) قد تضم قاعدة البيانات
+    أو السجلات أو كليهما.
+
+    كل عملية تفتح اتصالاً قصيراً خاصاً بها، فيمكن الكتابة من خيوط العمل.
+    """
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.path = os.path.join(backup_dir, CATALOG_FILE)
+        os.makedirs(backup_dir, exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        with self._connect() as conn:
+            conn.execute(CATALOG_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(backups)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE backups ADD COLUMN {column} {column_type}")
+        if is_new:
+            # أول تشغيل: تسجيل النسخ الموجودة قبل الفهرس مرة واحدة
+            self.rebuild()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _upsert(self, timestamp, values):
+        """إضافة أو تحديث أعمدة جزء من النسخة دون المساس بالجزء الآخر"""
+        values = dict(values)
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in values)
+        with self._connect() as conn:
+            conn.execute(f"""
+                INSERT INTO backups (timestamp, created_at, {columns})
+                VALUES (?, ?, {placeholders})
+                ON CONFLICT(timestamp) DO UPDATE SET {updates}
+            """, (timestamp, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), *values.values()))
+
+    def record_database(self, timestamp, db_file, db_format, db_bytes, stored_bytes,
+                        db_sha256, counts, verify_status=None, verify_error=None, origin=ORIGIN_MANUAL,
+                        journal_id=None):
+        """
+        تسجيل نسخة قاعدة بيانات
+
+        Args:
+            timestamp (str): الطابع الزمني للنسخة (YYYYmmdd_HHMMSS)
+            db_file (str): اسم ملف النسخة (manifest أو ملف كامل) داخل مجلد النسخ
+            db_format (str): 'chunks' أو 'full'
+            db_bytes (int): حجم قاعدة البيانات
+            stored_bytes (int): ما أضافته النسخة فعلاً إلى مجلد النسخ
+            db_sha256 (str): بصمة ملف قاعدة البيانات
+            counts (dict): عدد صفوف كل جدول
+            verify_status (str): VERIFY_OK / VERIFY_FAILED / None (لم يُتحقق)
+            verify_error (str): سبب فشل التحقق
+            origin (str): ORIGIN_MANUAL / ORIGIN_SCHEDULED
+            journal_id (int): آخر سجل row_changes في اللقطة (موضع إعادة تطبيق التغييرات)
+        """
+        self._upsert(timestamp, {
+            'db_file': db_file,
+            'db_format': db_format,
+            'db_bytes': db_bytes,
+            'stored_bytes': stored_bytes,
+            'db_sha256': db_sha256,
+            'table_counts': json.dumps(counts, ensure_ascii=False) if counts is not None else None,
+            'verify_status': verify_status,
+            'verified_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S') if verify_status else None,
+            'verify_error': verify_error,
+            'origin': origin,
+            'journal_id': journal_id
+        })
+
+    def record_log(self, timestamp, log_file, log_bytes, log_records, log_sha256):
+        """تسجيل نسخة من سجل التدقيق"""
+        self._upsert(timestamp, {
+            'log_file': log_file,
+            'log_bytes': log_bytes,
+            'log_records': log_records,
+            'log_sha256': log_sha256
+        })
+
+    def record_files(self, timestamp, files_count, files_bytes, files_new_bytes, missing):
+        """
+        تسجيل لقطة ملفات العقود والفواتير المرافقة لنسخة قاعدة البيانات
+
+        Args:
+            timestamp (str): الطابع الزمني للنسخة
+            files_count (int): عدد الملفات في اللقطة
+            files_bytes (int): حجمها الكلي
+            files_new_bytes (int): ما نُسخ فعلاً (الباقي روابط صلبة)
+            missing (list): ملفات تشير إليها قاعدة البيانات ولم توجد
+        """
+        self._upsert(timestamp, {
+            'files_count': files_count,
+            'files_bytes': files_bytes,
+            'files_new_bytes': files_new_bytes,
+            'files_missing': json.dumps(missing, ensure_ascii=False)
+        })
+
+    def set_verification(self, timestamp, status, error=None, counts=None, fk_violations=None):
+        """
+        تحديث نتيجة التحقق من نسخة
+
+        Args:
+            timestamp (str): الطابع الزمني للنسخة
+            status (str): VERIFY_OK / VERIFY_FAILED
+            error (str): سبب الفشل
+            counts (dict): عدد صفوف كل جدول (يُحفظ إن لم يكن مسجلاً)
+            fk_violations (int): عدد مخالفات المفاتيح الأجنبية
+        """
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE backups SET verify_status = ?, verified_at = ?, verify_error = ?,
+                       table_counts = COALESCE(table_counts, ?), fk_violations = ?
+                WHERE timestamp = ?
+            """, (
+                status, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), error,
+                json.dumps(counts, ensure_ascii=False) if counts is not None else None,
+                fk_violations, timestamp
+            ))
+
+    def remove(self, timestamp):
+        """حذف نسخة من الفهرس"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM backups WHERE timestamp = ?", (timestamp,))
+
+    def remove_database(self, timestamp):
+        """حذف جزء قاعدة البيانات من نسخة (تبقى نسخة السجلات إن وُجدت)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM backups WHERE timestamp = ? AND log_file IS NULL", (timestamp,))
+            conn.execute("""
+                UPDATE backups SET db_file = NULL, db_format = NULL, db_bytes = NULL,
+                       stored_bytes = NULL, db_sha256 = NULL, table_counts = NULL,
+                       verify_status = NULL, verified_at = NULL, verify_error = NULL, origin = NULL,
+                       fk_violations = NULL, files_count = NULL, files_bytes = NULL,
+                       files_new_bytes = NULL, files_missing = NULL, journal_id = NULL
+                WHERE timestamp = ?
+            """, (timestamp,))
+
+    @staticmethod
+    def _to_dict(row):
+        entry = dict(zip(COLUMNS, row))
+        entry['table_counts'] = json.loads(entry['table_counts']) if entry['table_counts'] else None
+        entry['files_missing'] = json.loads(entry['files_missing']) if entry['files_missing'] else []
+        return entry
+
+    def list(self):
+        """كل النسخ من الأحدث للأقدم (قراءة واحدة من الفهرس)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM backups ORDER BY timestamp DESC"
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def get(self, timestamp):
+        """نسخة واحدة أو None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM backups WHERE timestamp = ?", (timestamp,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def rebuild(self):
+        """
+        إعادة بناء الفهرس بفحص ملفات مجلد النسخ
+
+        تُستخدم مرة واحدة للنسخ التي سبقت الفهرس أو إذا حُذف ملف الفهرس؛
+        حالة التحقق لهذه النسخ تبقى فارغة حتى تُفحص.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM backups")
+
+        for name in sorted(os.listdir(self.backup_dir)):
+            path = os.path.join(self.backup_dir, name)
+            try:
+                if name.endswith(LOG_SUFFIX):
+                    meta = read_segment_meta(path)
+                    self.record_log(name[:-len(LOG_SUFFIX)], name, os.path.getsize(path),
+                                    meta['lines'], file_sha256(path))
+                elif name.endswith(MANIFEST_SUFFIX):
+                    manifest = ChunkStore.load_manifest(path)
+                    self.record_database(name[:-len(MANIFEST_SUFFIX)], name, 'chunks', manifest['size'],
+                                         manifest['new_bytes'], manifest['sha256'], None)
+                elif name.endswith(DB_SUFFIX):
+                    size = os.path.getsize(path)
+                    self.record_database(name[:-len(DB_SUFFIX)], name, 'full', size, size,
+                                         file_sha256(path), table_counts(path))
+            except Exception as e:
+                print(f"Error cataloging backup {name}: {str(e)}")
+
+        snapshots = FileSnapshots(self.backup_dir)
+        for timestamp in snapshots.timestamps():
+            manifest = snapshots.load(timestamp)
+            files = manifest['files'].values()
+            self.record_files(timestamp, len(files), sum(entry['size'] for entry in files),
+                              None, manifest['missing'])
@@ -5,23 +5,180 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QTextEdit,
     QTableWidget, QTableWidgetItem, QHeaderView,
-    QMessageBox
+    QMessageBox, QProgressBar
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt6.QtGui import QFont
 from .utils import UIHelper
 from .audit_log import audit_logger
+from .audit_store import META_SUFFIX
+from .chunk_store import ChunkStore, MANIFEST_SUFFIX
+from .backup_catalog import (
+    BackupCatalog, BACKUP_DIR, LOG_SUFFIX, DB_SUFFIX,
+    VERIFY_OK, VERIFY_FAILED, ORIGIN_SCHEDULED
+)
+from .backup_scheduler import backup_lock, take_backup, load_schedule
+from .backup_verifier import run_verifier, check_database_file
+from .db_backup import table_counts
+from .file_snapshot import FileSnapshots
+from .change_journal import ChangeJournal
 from datetime import datetime
 
+VERIFY_LABELS = {VERIFY_OK: 'سليمة', VERIFY_FAILED: 'تالفة', None: 'لم يُتحقق'}
+
+
+def _archive_changes(backup_dir, db_path):
+    """أرشفة تغييرات الصفوف الجديدة (فشلها لا يوقف الاسترجاع)"""
+    try:
+        ChangeJournal(backup_dir).archive(db_path)
+    except Exception as e:
+        print(f"Error archiving change journal: {str(e)}")
+
+
+class _BackupSignals(QObject):
+    """إشارات تنقل تقدم النسخ ونتيجته إلى خيط الواجهة"""
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class _BackupTask(QRunnable):
+    """نسخ قاعدة البيانات في خيط عمل (الواجهة والكتابة تستمران أثناء النسخ)"""
+
+    def __init__(self, db_path, backup_dir):
+        super().__init__()
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.signals = _BackupSignals()
+
+    def run(self):
+        try:
+            # انتظار النسخة المجدولة إن كانت جارية
+            with backup_lock:
+                result = take_backup(
+                    self.db_path, self.backup_dir,
+                    progress=lambda done, total: self.signals.progress.emit(done, total)
+                )
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class _VerifyTask(QRunnable):
+    """تشغيل التحقق من النسخ (عملية مستقلة) وانتظارها في خيط عمل"""
+
+    def __init__(self, backup_dir, timestamps=None, force=False):
+        super().__init__()
+        self.backup_dir = backup_dir
+        self.timestamps = timestamps
+        self.force = force
+        self.signals = _BackupSignals()
+
+    def run(self):
+        try:
+            result = run_verifier(self.backup_dir, self.timestamps, self.force)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class _RestoreTask(QRunnable):
+    """
+    تجهيز الاسترجاع في خيط عمل: إعادة تجميع ملف النسخة في ملف مؤقت وفحصه،
+    ثم نسخة احتياطية من الوضع الحالي وأرشفة آخر تغييراته. الاستبدال نفسه
+    يتم في خيط الواجهة. يجب تشغيلها مع الاحتفاظ بـ backup_lock.
+    """
+
+    def __init__(self, db_path, backup_dir, source, temp_path, expected_counts=None):
+        super().__init__()
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.source = source
+        self.temp_path = temp_path
+        self.expected_counts = expected_counts
+        self.signals = _BackupSignals()
+
+    def run(self):
+        try:
+            # إعادة تجميع ملف قاعدة البيانات من القطع (أو نسخه للنسخ الكاملة القديمة)
+            if self.source.endswith(MANIFEST_SUFFIX):
+                ChunkStore(self.backup_dir).restore(self.source, self.temp_path)
+            else:
+                shutil.copy2(self.source, self.temp_path)
+            
+            # فحص الملف قبل أن يحل محل القاعدة الحالية
+            problems, _, _ = check_database_file(self.temp_path, self.expected_counts)
+            if problems:
+                raise ValueError("\n".join(problems))
+            
+            # الوضع الحالي يُحفظ قبل الكتابة فوقه
+            result = take_backup(
+                self.db_path, self.backup_dir,
+                progress=lambda done, total: self.signals.progress.emit(done, total)
+            )
+            
+            # آخر التغييرات تُؤرشف قبل الاستبدال
+            _archive_changes(self.backup_dir, self.db_path)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class _RestoreFilesTask(QRunnable):
+    """
+    إكمال الاسترجاع بعد استبدال القاعدة في خيط عمل: تسجيل تفرع سجل التغييرات
+    واسترجاع العقود والفواتير ثم عد صفوف القاعدة المسترجعة.
+    يجب تشغيلها مع الاحتفاظ بـ backup_lock.
+    """
+
+    def __init__(self, db_path, backup_dir, file_snapshots, timestamp):
+        super().__init__()
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.file_snapshots = file_snapshots
+        self.timestamp = timestamp
+        self.signals = _BackupSignals()
+
+    def run(self):
+        try:
+            # تفرع السجل يُسجل فوراً: التاريخ المتروك يبقى متاحاً للاسترجاع إلى لحظة فيه
+            _archive_changes(self.backup_dir, self.db_path)
+            
+            # استرجاع العقود والفواتير التي تشير إليها القاعدة المسترجعة
+            if self.file_snapshots.load(self.timestamp) is not None:
+                self.file_snapshots.restore(self.timestamp)
+            
+            # تأكيد نجاح استرجاع قاعدة البيانات
+            counts = table_counts(self.db_path)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(counts)
+
+
 class BackupManagerDialog(QDialog):
+    # الاسترجاع يرفض افتراضياً النسخ التي لم يُتحقق منها أو فشل التحقق منها
+    allow_unverified_restore = False
+
     def __init__(self, database, current_user_id, current_username):
         super().__init__()
         self.database = database
         self.current_user_id = current_user_id
         self.current_username = current_username
         # تحديد مجلد النسخ الاحتياطية في نفس مستوى مجلد التطبيق
-        self.backup_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backups')
+        self.backup_dir = BACKUP_DIR
         os.makedirs(self.backup_dir, exist_ok=True)
+        self.chunk_store = ChunkStore(self.backup_dir)
+        self.file_snapshots = FileSnapshots(self.backup_dir, self.database.db_dir)
+        self.catalog = BackupCatalog(self.backup_dir)
+        self.backups = {}
+        self.backup_task = None
+        self.verify_task = None
+        self.restore_task = None
+        self.restore_files_task = None
         self.init_ui()
 
     def init_ui(self):
@@ -39,13 +196,14 @@ class BackupManagerDialog(QDialog):
 
         # جدول النسخ الاحتياطية
         self.table = QTableWidget()
-        self.table.setColumnCount(5)
+        self.table.setColumnCount(6)
         self.table.setHorizontalHeaderLabels([
             "تاريخ النسخة", 
             "حجم السجلات", 
             "حجم قاعدة البيانات",
             "عدد السجلات",
-            "حالة النسخة"
+            "حالة النسخة",
+            "التحقق"
         ])
         
         # تنسيق رأس الجدول
@@ -73,6 +231,7 @@ class BackupManagerDialog(QDialog):
             }
         """)
         
+        self.table.itemSelectionChanged.connect(self.show_backup_details)
         layout.addWidget(self.table)
 
         # منطقة عرض التفاصيل
@@ -90,10 +249,15 @@ class BackupManagerDialog(QDialog):
         """)
         layout.addWidget(self.details_text)
 
+        # تقدم النسخ الجاري في الخلفية
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
         # أزرار التحكم
         button_layout = QHBoxLayout()
         
-        create_button = QPushButton("إنشاء نسخة احتياطية")
+        self.create_button = create_button = QPushButton("إنشاء نسخة احتياطية")
         create_button.clicked.connect(self.create_backup)
         create_button.setStyleSheet("""
             QPushButton {
@@ -109,7 +273,7 @@ class BackupManagerDialog(QDialog):
             }
         """)
         
-        restore_button = QPushButton("استرجاع النسخة المحددة")
+        self.restore_button = restore_button = QPushButton("استرجاع النسخة المحددة")
         restore_button.clicked.connect(self.restore_backup)
         restore_button.setStyleSheet("""
             QPushButton {
@@ -141,6 +305,22 @@ class BackupManagerDialog(QDialog):
             }
         """)
         
+        self.verify_button = verify_button = QPushButton("التحقق من النسخة المحددة")
+        verify_button.clicked.connect(self.verify_selected)
+        verify_button.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 4px;
+                min-width: 150px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        
         refresh_button = QPushButton("تحديث القائمة")
         refresh_button.clicked.connect(self.load_backups)
         refresh_button.setStyleSheet("""
@@ -160,6 +340,7 @@ class BackupManagerDialog(QDialog):
         button_layout.addWidget(create_button)
         button_layout.addWidget(restore_button)
         button_layout.addWidget(delete_button)
+        button_layout.addWidget(verify_button)
         button_layout.addWidget(refresh_button)
         
         layout.addLayout(button_layout)
@@ -168,66 +349,121 @@ class BackupManagerDialog(QDialog):
         
         # تحميل النسخ الاحتياطية عند فتح النافذة
         self.load_backups()
+        
+        # التحقق في الخلفية من النسخ التي لم تُفحص بعد
+        if any(backup['verify_status'] is None for backup in self.backups.values()):
+            self.start_verification()
 
     def load_backups(self):
-        """تحميل قائمة النسخ الاحتياطية"""
+        """تحميل قائمة النسخ الاحتياطية من فهرس النسخ (قراءة واحدة)"""
         try:
-            if not os.path.exists(self.backup_dir):
-                return
+            backups = self.catalog.list()
+            self.backups = {backup['timestamp']: backup for backup in backups}
             
-            # جمع معلومات النسخ الاحتياطية
-            backups = []
-            for item in os.listdir(self.backup_dir):
-                if item.endswith('_audit.log.backup'):
-                    timestamp = item.split('_audit.log.backup')[0]
-                    log_file = os.path.join(self.backup_dir, item)
-                    db_file = os.path.join(self.backup_dir, f"{timestamp}_database.db.backup")
-                    
-                    # حساب الأحجام
-                    log_size = os.path.getsize(log_file) / 1024  # KB
-                    db_size = os.path.getsize(db_file) / 1024 if os.path.exists(db_file) else 0
-                    
-                    # حساب عدد السجلات
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        log_count = sum(1 for line in f if line.strip() and not line.startswith('#'))
-                    
-                    backup_date = datetime.strptime(timestamp, '%Y%m%d_%H%M%S')
-                    backups.append({
-                        'timestamp': timestamp,
-                        'date': backup_date.strftime('%Y-%m-%d %H:%M:%S'),
-                        'log_size': f"{log_size:.1f} KB",
-                        'db_size': f"{db_size:.1f} KB",
-                        'log_count': log_count,
-                        'status': 'كاملة' if os.path.exists(db_file) else 'جزئية'
-                    })
-            
-            # ترتيب النسخ حسب التاريخ (الأحدث أولاً)
-            backups.sort(key=lambda x: x['timestamp'], reverse=True)
-            
-            # عرض النسخ في الجدول
+            # عرض النسخ في الجدول (الفهرس مرتب: الأحدث أولاً)
             self.table.setRowCount(len(backups))
             for i, backup in enumerate(backups):
-                self.table.setItem(i, 0, QTableWidgetItem(backup['date']))
-                self.table.setItem(i, 1, QTableWidgetItem(backup['log_size']))
-                self.table.setItem(i, 2, QTableWidgetItem(backup['db_size']))
-                self.table.setItem(i, 3, QTableWidgetItem(str(backup['log_count'])))
-                self.table.setItem(i, 4, QTableWidgetItem(backup['status']))
+                try:
+                    date = datetime.strptime(backup['timestamp'], '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
+                except ValueError:
+                    date = backup['timestamp']
+                
+                # للنسخ المقسمة: حجم القاعدة وما أضافته النسخة فعلاً
+                if backup['db_file'] is None:
+                    db_size = "0.0 KB"
+                elif backup['db_format'] == 'chunks':
+                    db_size = f"{backup['db_bytes'] / 1024:.1f} KB (جديد {backup['stored_bytes'] / 1024:.1f} KB)"
+                else:
+                    db_size = f"{backup['db_bytes'] / 1024:.1f} KB"
+                
+                if backup['log_file'] and backup['db_file']:
+                    status = 'كاملة'
+                elif backup['db_file']:
+                    status = 'قاعدة البيانات'
+                else:
+                    status = 'السجلات'
+                if backup['origin'] == ORIGIN_SCHEDULED:
+                    status += ' (تلقائية)'
+                
+                self.table.setItem(i, 0, QTableWidgetItem(date))
+                self.table.setItem(i, 1, QTableWidgetItem(f"{(backup['log_bytes'] or 0) / 1024:.1f} KB"))
+                self.table.setItem(i, 2, QTableWidgetItem(db_size))
+                self.table.setItem(i, 3, QTableWidgetItem(str(backup['log_records'] or 0)))
+                self.table.setItem(i, 4, QTableWidgetItem(status))
+                if backup['verify_status'] is None and self.verify_task is not None:
+                    verify_label = 'جاري التحقق...'
+                else:
+                    verify_label = VERIFY_LABELS.get(backup['verify_status'], backup['verify_status'])
+                self.table.setItem(i, 5, QTableWidgetItem(verify_label))
+                self.table.item(i, 0).setData(Qt.ItemDataRole.UserRole, backup['timestamp'])
             
             # تحديث منطقة التفاصيل
             self.details_text.clear()
+            schedule = load_schedule(self.backup_dir)
+            if schedule['enabled']:
+                keep = schedule['keep']
+                schedule_text = (
+                    f"النسخ التلقائي: كل {schedule['interval_minutes']} دقيقة "
+                    f"(الاحتفاظ: {keep['hourly']} ساعة، {keep['daily']} يوم، "
+                    f"{keep['weekly']} أسبوع، {keep['monthly']} شهر)"
+                )
+            else:
+                schedule_text = "النسخ التلقائي: متوقف"
             if backups:
                 self.details_text.setPlainText(
                     f"عدد النسخ الاحتياطية: {len(backups)}\n"
-                    f"آخر نسخة: {backups[0]['date']}\n"
+                    f"آخر نسخة: {self.table.item(0, 0).text()}\n"
+                    f"{schedule_text}\n"
                     f"مجلد النسخ الاحتياطية: {self.backup_dir}"
                 )
+            else:
+                self.details_text.setPlainText(schedule_text)
             
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"فشل في تحميل النسخ الاحتياطية: {str(e)}")
 
+    def show_backup_details(self):
+        """عرض تفاصيل النسخة المحددة من الفهرس"""
+        selected_items = self.table.selectedItems()
+        if not selected_items:
+            return
+        backup = self.backups.get(self.table.item(selected_items[0].row(), 0).data(Qt.ItemDataRole.UserRole))
+        if not backup:
+            return
+        
+        lines = [f"النسخة: {backup['timestamp']} (سُجلت {backup['created_at']})"]
+        if backup['db_file']:
+            lines.append(f"قاعدة البيانات: {backup['db_file']}")
+            lines.append(f"  sha256: {backup['db_sha256']}")
+            if backup['table_counts']:
+                lines.append("  " + " | ".join(
+                    f"{table}: {count}" for table, count in backup['table_counts'].items()
+                ))
+        if backup['files_count'] is not None:
+            files_line = f"العقود والفواتير: {backup['files_count']} ملف ({(backup['files_bytes'] or 0) / 1024:.1f} KB"
+            if backup['files_new_bytes'] is not None:
+                files_line += f"، جديد {backup['files_new_bytes'] / 1024:.1f} KB"
+            lines.append(files_line + ")")
+            if backup['files_missing']:
+                lines.append("  ملفات مفقودة: " + "، ".join(backup['files_missing']))
+        if backup['log_file']:
+            lines.append(f"السجلات: {backup['log_file']}")
+            lines.append(f"  sha256: {backup['log_sha256']}")
+        status = VERIFY_LABELS.get(backup['verify_status'], backup['verify_status'])
+        if backup['verified_at']:
+            status += f" ({backup['verified_at']})"
+        if backup['verify_error']:
+            status += f": {backup['verify_error']}"
+        lines.append(f"التحقق: {status}")
+        if backup['fk_violations']:
+            lines.append(f"  مراجع معلقة (مفاتيح أجنبية): {backup['fk_violations']}")
+        self.details_text.setPlainText("\n".join(lines))
+
     def create_backup(self):
-        """إنشاء نسخة احتياطية جديدة"""
+        """إنشاء نسخة احتياطية جديدة من قاعدة البيانات في الخلفية (السجلات لا تُمسح)"""
         try:
+            if self.backup_task is not None:
+                return
             if not UIHelper.confirm_action(
                 self,
                 "تأكيد",
@@ -235,84 +471,266 @@ class BackupManagerDialog(QDialog):
             ):
                 return
             
-            result, message = audit_logger.clear_logs()  # سيقوم بإنشاء نسخة احتياطية
+            self.backup_task = _BackupTask(self.database.db_path, self.backup_dir)
+            self.backup_task.signals.progress.connect(self.on_backup_progress)
+            self.backup_task.signals.finished.connect(self.on_backup_finished)
+            self.backup_task.signals.failed.connect(self.on_backup_failed)
             
-            if result:
-                audit_logger.log_event(
-                    user_id=self.current_user_id,
-                    username=self.current_username,
-                    event_type="إنشاء_نسخة_احتياطية",
-                    description="تم إنشاء نسخة احتياطية جديدة"
-                )
-                
-                UIHelper.show_success(self, "نجاح", message)
-                self.load_backups()
-            else:
-                UIHelper.show_error(self, "خطأ", message)
+            self.create_button.setEnabled(False)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setVisible(True)
+            QThreadPool.globalInstance().start(self.backup_task)
                 
         except Exception as e:
+            self.backup_task = None
             UIHelper.show_error(self, "خطأ", f"فشل في إنشاء النسخة الاحتياطية: {str(e)}")
 
+    def on_backup_progress(self, done, total):
+        """تحديث شريط التقدم"""
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def _backup_done(self):
+        """إعادة الواجهة لحالتها بعد انتهاء النسخ"""
+        self.backup_task = None
+        self.progress_bar.setVisible(False)
+        self.create_button.setEnabled(True)
+
+    def on_backup_finished(self, result):
+        """اكتمال النسخ"""
+        self._backup_done()
+        audit_logger.log_event(
+            user_id=self.current_user_id,
+            username=self.current_username,
+            event_type="إنشاء_نسخة_احتياطية",
+            description=f"تم إنشاء نسخة احتياطية من قاعدة البيانات: {os.path.basename(result['path'])}"
+        )
+        self.start_verification([result['timestamp']])
+        UIHelper.show_success(
+            self,
+            "نجاح",
+            f"تم إنشاء النسخة الاحتياطية ({result['size'] / 1024:.1f} KB) في {result['seconds']:.1f} ثانية\n"
+            f"القطع الجديدة: {result['new_chunks']} من {result['chunks']} ({result['new_bytes'] / 1024:.1f} KB)\n"
+            f"العقود والفواتير: {result['files']['files']} ملف، منها {result['files']['copied']} جديد "
+            f"({result['files']['copied_bytes'] / 1024:.1f} KB)"
+        )
+        if result['files']['missing']:
+            UIHelper.show_warning(
+                self,
+                "تنبيه",
+                "ملفات تشير إليها قاعدة البيانات وغير موجودة:\n" + "\n".join(result['files']['missing'])
+            )
+        self.load_backups()
+
+    def on_backup_failed(self, error):
+        """فشل النسخ"""
+        self._backup_done()
+        audit_logger.log_event(
+            user_id=self.current_user_id,
+            username=self.current_username,
+            event_type="إنشاء_نسخة_احتياطية",
+            description=f"فشل إنشاء نسخة احتياطية: {error}",
+            status="فشل"
+        )
+        UIHelper.show_error(self, "خطأ", f"فشل في إنشاء النسخة الاحتياطية: {error}")
+
+    def start_verification(self, timestamps=None, force=False):
+        """التحقق من النسخ في عملية مستقلة؛ النتيجة تُقرأ من الفهرس عند انتهائها"""
+        if self.verify_task is not None:
+            return
+        self.verify_task = _VerifyTask(self.backup_dir, timestamps, force)
+        self.verify_task.signals.finished.connect(self.on_verification_finished)
+        self.verify_task.signals.failed.connect(self.on_verification_failed)
+        self.verify_button.setEnabled(False)
+        QThreadPool.globalInstance().start(self.verify_task)
+        self.load_backups()
+
+    def on_verification_finished(self, all_ok):
+        """انتهاء التحقق"""
+        self.verify_task = None
+        self.verify_button.setEnabled(True)
+        self.load_backups()
+
+    def on_verification_failed(self, error):
+        """تعذر تشغيل التحقق"""
+        self.verify_task = None
+        self.verify_button.setEnabled(True)
+        self.load_backups()
+        UIHelper.show_error(self, "خطأ", f"فشل في التحقق من النسخ الاحتياطية: {error}")
+
+    def verify_selected(self):
+        """إعادة التحقق من النسخة المحددة"""
+        selected_items = self.table.selectedItems()
+        if not selected_items:
+            UIHelper.show_warning(self, "تنبيه", "الرجاء اختيار نسخة احتياطية للتحقق")
+            return
+        timestamp = self.table.item(selected_items[0].row(), 0).data(Qt.ItemDataRole.UserRole)
+        self.start_verification([timestamp], force=True)
+
     def restore_backup(self):
         """استرجاع النسخة الاحتياطية المحددة"""
         try:
+            if self.restore_task is not None:
+                return
             selected_items = self.table.selectedItems()
             if not selected_items:
                 UIHelper.show_warning(self, "تنبيه", "الرجاء اختيار نسخة احتياطية للاسترجاع")
                 return
             
-            backup_date = selected_items[0].text()
+            date_item = self.table.item(selected_items[0].row(), 0)
+            backup_date = date_item.text()
+            
+            # لا استرجاع لنسخة لم يثبت التحقق أنها سليمة (قبل الكتابة فوق القاعدة الحالية)
+            backup = self.catalog.get(date_item.data(Qt.ItemDataRole.UserRole))
+            if not self.allow_unverified_restore and (not backup or backup['verify_status'] != VERIFY_OK):
+                if backup and backup['verify_status'] == VERIFY_FAILED:
+                    reason = f"فشل التحقق من هذه النسخة:\n{backup['verify_error']}"
+                else:
+                    reason = "لم يتم التحقق من هذه النسخة بعد. استخدم زر التحقق ثم أعد المحاولة."
+                UIHelper.show_warning(self, "تنبيه", reason)
+                return
             
             if not UIHelper.confirm_action(
                 self,
                 "تأكيد",
                 f"هل أنت متأكد من استرجاع النسخة الاحتياطية المؤرخة {backup_date}؟\n"
-                "سيتم إنشاء نسخة احتياطية من الوضع الحالي قبل الاسترجاع.\n"
-                "يجب إغلاق التطبيق وإعادة تشغيله بعد الاسترجاع."
+                "سيتم إنشاء نسخة احتياطية من الوضع الحالي قبل الاسترجاع."
             ):
                 return
             
             # تحديد ملف النسخة الاحتياطية
-            timestamp = datetime.strptime(backup_date, '%Y-%m-%d %H:%M:%S').strftime('%Y%m%d_%H%M%S')
-            backup_file = os.path.join(self.backup_dir, f"{timestamp}_audit.log.backup")
-            db_backup = os.path.join(self.backup_dir, f"{timestamp}_database.db.backup")
+            timestamp = date_item.data(Qt.ItemDataRole.UserRole)
+            backup_file = os.path.join(self.backup_dir, f"{timestamp}{LOG_SUFFIX}")
+            manifest_file = os.path.join(self.backup_dir, f"{timestamp}{MANIFEST_SUFFIX}")
+            db_backup = os.path.join(self.backup_dir, f"{timestamp}{DB_SUFFIX}")
+            has_db = os.path.exists(manifest_file) or os.path.exists(db_backup)
             
-            if not os.path.exists(backup_file):
+            if not os.path.exists(backup_file) and not has_db:
                 UIHelper.show_error(self, "خطأ", "لم يتم العثور على ملف النسخة الاحتياطية")
                 return
+            
+            if not has_db:
+                self._restore_logs(timestamp, backup_date)
+                return
+            
+            if not backup_lock.acquire(blocking=False):
+                # النسخ الجاري يقرأ ملف قاعدة البيانات الذي سيُستبدل
+                UIHelper.show_warning(self, "تنبيه", "الرجاء الانتظار حتى اكتمال النسخ الجاري")
+                return
+            # القفل يبقى محجوزاً حتى الاستبدال: لا نسخة مجدولة بين التجهيز والاستبدال
+            try:
+                self.restore_task = _RestoreTask(
+                    self.database.db_path, self.backup_dir,
+                    manifest_file if os.path.exists(manifest_file) else db_backup,
+                    os.path.join(self.database.db_dir, f".restore_{timestamp}.db"),
+                    backup['table_counts'] if backup else None
+                )
+                self.restore_task.signals.progress.connect(self.on_backup_progress)
+                self.restore_task.signals.finished.connect(
+                    lambda result: self.on_restore_prepared(result, timestamp, backup_date)
+                )
+                self.restore_task.signals.failed.connect(self.on_restore_failed)
+                
+                self.create_button.setEnabled(False)
+                self.restore_button.setEnabled(False)
+                # إعادة التجميع والفحص بلا تقدم معروف، ثم تقدم نسخة الوضع الحالي
+                self.progress_bar.setMaximum(0)
+                self.progress_bar.setVisible(True)
+                QThreadPool.globalInstance().start(self.restore_task)
+            except Exception:
+                self.restore_task = None
+                backup_lock.release()
+                raise
+                
+        except Exception as e:
+            UIHelper.show_error(self, "خطأ", f"فشل في استرجاع النسخة الاحتياطية: {str(e)}")
 
-            # استرجاع قاعدة البيانات أولاً
-            if os.path.exists(db_backup):
-                try:
-                    # إغلاق الاتصال بقاعدة البيانات الحالي
-                    self.database.close()
-                    
-                    # نسخ ملف قاعدة البيانات
-                    shutil.copy2(db_backup, self.database.db_path)
-                    
-                    # إعادة فتح الاتصال بقاعدة البيانات
-                    self.database.conn = sqlite3.connect(self.database.db_path)
-                    self.database.cursor = self.database.conn.cursor()
-                    
-                    # إعادة إنشاء الجداول للتأكد من تطابق الهيكل
-                    self.database.create_tables()
-                    
-                    # تأكيد نجاح استرجاع قاعدة البيانات
-                    self.database.cursor.execute("SELECT COUNT(*) FROM clients")
-                    clients_count = self.database.cursor.fetchone()[0]
-                    self.database.cursor.execute("SELECT COUNT(*) FROM cars")
-                    cars_count = self.database.cursor.fetchone()[0]
-                    
-                except Exception as e:
-                    UIHelper.show_error(
-                        self, 
-                        "خطأ", 
-                        f"فشل في استرجاع قاعدة البيانات: {str(e)}"
-                    )
-                    return
+    def _restore_done(self):
+        """إعادة الواجهة لحالتها وتحرير القفل بعد انتهاء الاسترجاع"""
+        task, self.restore_task = self.restore_task, None
+        self.restore_files_task = None
+        if task is not None and os.path.exists(task.temp_path):
+            os.remove(task.temp_path)
+        backup_lock.release()
+        self.progress_bar.setVisible(False)
+        self.create_button.setEnabled(True)
+        self.restore_button.setEnabled(True)
 
-            # ثم استرجاع ملف السجلات
-            result, message = audit_logger.restore_backup(backup_file)
+    def on_restore_prepared(self, result, timestamp, backup_date):
+        """
+        استبدال القاعدة الحية بالملف المُجهز (في خيط الواجهة: التوقف هو مدة
+        الاستبدال وحدها) ثم استرجاع الملفات في خيط عمل
+        """
+        task = self.restore_task
+        try:
+            audit_logger.log_event(
+                user_id=self.current_user_id,
+                username=self.current_username,
+                event_type="إنشاء_نسخة_احتياطية",
+                description=f"تم إنشاء نسخة احتياطية قبل الاسترجاع: {os.path.basename(result['path'])}"
+            )
+            
+            # استبدال القاعدة الحية وإعادة فتح الاتصالات وتحديث الصفحات
+            downtime = self.database.replace_database(task.temp_path)
+            
+        except Exception as e:
+            self._restore_done()
+            self.load_backups()
+            UIHelper.show_error(self, "خطأ", f"فشل في استرجاع قاعدة البيانات: {str(e)}")
+            return
+        
+        self.restore_files_task = _RestoreFilesTask(
+            self.database.db_path, self.backup_dir, self.file_snapshots, timestamp
+        )
+        self.restore_files_task.signals.finished.connect(
+            lambda counts: self.on_restore_finished(counts, result, timestamp, backup_date, downtime)
+        )
+        self.restore_files_task.signals.failed.connect(
+            lambda error: self.on_restore_files_failed(error, result)
+        )
+        self.progress_bar.setMaximum(0)
+        QThreadPool.globalInstance().start(self.restore_files_task)
+
+    def on_restore_finished(self, counts, result, timestamp, backup_date, downtime):
+        """اكتمال الاسترجاع: التحقق من نسخة الوضع السابق وعرض النتيجة"""
+        self._restore_done()
+        self.start_verification([result['timestamp']])
+        self._restore_logs(
+            timestamp, backup_date,
+            (counts.get('clients', 0), counts.get('cars', 0), downtime)
+        )
+
+    def on_restore_files_failed(self, error, result):
+        """فشل ما بعد الاستبدال (القاعدة الحية استُبدلت بالفعل)"""
+        self._restore_done()
+        self.start_verification([result['timestamp']])
+        self.load_backups()
+        UIHelper.show_error(
+            self, "خطأ",
+            f"تم استرجاع قاعدة البيانات لكن فشل استرجاع ملفات العقود والفواتير: {error}"
+        )
+
+    def on_restore_failed(self, error):
+        """فشل تجهيز الاسترجاع (القاعدة الحية لم تُمس)"""
+        self._restore_done()
+        self.load_backups()
+        UIHelper.show_error(self, "خطأ", f"فشل في استرجاع قاعدة البيانات: {error}")
+
+    def _restore_logs(self, timestamp, backup_date, database_result=None):
+        """
+        استرجاع ملف السجلات إن كان جزءاً من النسخة وعرض النتيجة
+
+        Args:
+            timestamp (str): الطابع الزمني للنسخة
+            backup_date (str): تاريخ النسخة كما يُعرض
+            database_result (tuple): (عدد العملاء، عدد السيارات، مدة التوقف) إذا استُرجعت القاعدة
+        """
+        try:
+            backup_file = os.path.join(self.backup_dir, f"{timestamp}{LOG_SUFFIX}")
+            if os.path.exists(backup_file):
+                result, message = audit_logger.restore_backup(backup_file)
+            else:
+                result, message = True, None
             
             if result:
                 audit_logger.log_event(
@@ -322,12 +740,14 @@ class BackupManagerDialog(QDialog):
                     description=f"تم استرجاع النسخة الاحتياطية المؤرخة {backup_date}"
                 )
                 
-                success_message = (
-                    "تم استرجاع النسخة الاحتياطية بنجاح:\n"
-                    f"- عدد العملاء: {clients_count}\n"
-                    f"- عدد السيارات: {cars_count}\n\n"
-                    "يجب إغلاق التطبيق وإعادة تشغيله لتطبيق التغييرات."
-                )
+                success_message = "تم استرجاع النسخة الاحتياطية بنجاح:\n"
+                if database_result is not None:
+                    clients_count, cars_count, downtime = database_result
+                    success_message += (
+                        f"- عدد العملاء: {clients_count}\n"
+                        f"- عدد السيارات: {cars_count}\n"
+                        f"- مدة توقف قاعدة البيانات: {downtime:.2f} ثانية\n"
+                    )
                 
                 UIHelper.show_success(self, "نجاح", success_message)
             else:
@@ -335,6 +755,7 @@ class BackupManagerDialog(QDialog):
                 
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"فشل في استرجاع النسخة الاحتياطية: {str(e)}")
+        self.load_backups()
 
     def delete_backup(self):
         """حذف النسخة الاحتياطية المحددة"""
@@ -344,7 +765,8 @@ class BackupManagerDialog(QDialog):
                 UIHelper.show_warning(self, "تنبيه", "الرجاء اختيار نسخة احتياطية للحذف")
                 return
             
-            backup_date = selected_items[0].text()
+            date_item = self.table.item(selected_items[0].row(), 0)
+            backup_date = date_item.text()
             
             if not UIHelper.confirm_action(
                 self,
@@ -354,16 +776,33 @@ class BackupManagerDialog(QDialog):
             ):
                 return
             
-            # تحديد ملفات النسخة الاحتياطية
-            timestamp = datetime.strptime(backup_date, '%Y-%m-%d %H:%M:%S').strftime('%Y%m%d_%H%M%S')
-            log_file = os.path.join(self.backup_dir, f"{timestamp}_audit.log.backup")
-            db_file = os.path.join(self.backup_dir, f"{timestamp}_database.db.backup")
-            
-            # حذف الملفات
-            if os.path.exists(log_file):
-                os.remove(log_file)
-            if os.path.exists(db_file):
-                os.remove(db_file)
+            if not backup_lock.acquire(blocking=False):
+                # القطع التي كتبها النسخ الجاري لم تُسجل بعد وقد يحذفها تنظيف القطع
+                UIHelper.show_warning(self, "تنبيه", "الرجاء الانتظار حتى اكتمال النسخ الجاري")
+                return
+            try:
+                # تحديد ملفات النسخة الاحتياطية
+                timestamp = date_item.data(Qt.ItemDataRole.UserRole)
+                log_file = os.path.join(self.backup_dir, f"{timestamp}{LOG_SUFFIX}")
+                manifest_file = os.path.join(self.backup_dir, f"{timestamp}{MANIFEST_SUFFIX}")
+                db_file = os.path.join(self.backup_dir, f"{timestamp}{DB_SUFFIX}")
+                
+                # حذف الملفات
+                if os.path.exists(log_file):
+                    os.remove(log_file)
+                if os.path.exists(log_file + META_SUFFIX):
+                    os.remove(log_file + META_SUFFIX)
+                if os.path.exists(db_file):
+                    os.remove(db_file)
+                removed_chunks = freed = 0
+                if os.path.exists(manifest_file):
+                    os.remove(manifest_file)
+                    # حذف القطع التي لم تعد أي نسخة تشير إليها
+                    removed_chunks, freed = self.chunk_store.gc()
+                self.file_snapshots.remove(timestamp)
+                self.catalog.remove(timestamp)
+            finally:
+                backup_lock.release()
             
             audit_logger.log_event(
                 user_id=self.current_user_id,
@@ -372,7 +811,10 @@ class BackupManagerDialog(QDialog):
                 description=f"تم حذف النسخة الاحتياطية المؤرخة {backup_date}"
             )
             
-            UIHelper.show_success(self, "نجاح", "تم حذف النسخة الاحتياطية بنجاح")
+            message = "تم حذف النسخة الاحتياطية بنجاح"
+            if removed_chunks:
+                message += f"\nتم تحرير {freed / 1024:.1f} KB ({removed_chunks} قطعة)"
+            UIHelper.show_success(self, "نجاح", message)
             self.load_backups()
             
         except Exception as e:
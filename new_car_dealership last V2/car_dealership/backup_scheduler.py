@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from .chunk_store import ChunkStore, MANIFEST_SUFFIX
+from .db_backup import incremental_backup, BackupCancelled
+from .file_snapshot import FileSnapshots, file_references
+from .backup_catalog import BackupCatalog, ORIGIN_MANUAL, ORIGIN_SCHEDULED
+from .backup_verifier import run_verifier
+from .change_journal import ChangeJournal, journal_position
+
+SCHEDULE_FILE = 'backup_schedule.json'
+
+# الإعدادات الافتراضية (تُكتب في backups/backup_schedule.json عند أول تشغيل)
+DEFAULT_SCHEDULE = {
+    'enabled': True,
+    'interval_minutes': 60,
+    # عدد النسخ المحتفظ بها في كل مستوى (الأحدث في كل ساعة/يوم/أسبوع/شهر)
+    'keep': {
+        'hourly': 24,
+        'daily': 7,
+        'weekly': 4,
+        'monthly': 12
+    }
+}
+
+# مفتاح الفترة لكل مستوى من مستويات الاحتفاظ
+GFS_PERIODS = {
+    'hourly': lambda d: d.strftime('%Y%m%d%H'),
+    'daily': lambda d: d.strftime('%Y%m%d'),
+    'weekly': lambda d: '%04d-%02d' % d.isocalendar()[:2],
+    'monthly': lambda d: d.strftime('%Y%m')
+}
+
+# نسخة واحدة في كل مرة داخل البرنامج (الجدولة أو النافذة)، ولا تنظيف
+# للقطع أثناء نسخ جارٍ لم يُكتب الـ manifest الخاص به بعد
+backup_lock = threading.Lock()
+
+
+def load_schedule(backup_dir):
+    """
+    قراءة إعدادات النسخ التلقائي (مع القيم الافتراضية لما لم يُحدد)
+
+    Returns:
+        dict: {enabled, interval_minutes, keep}
+    """
+    path = os.path.join(backup_dir, SCHEDULE_FILE)
+    schedule = json.loads(json.dumps(DEFAULT_SCHEDULE))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        schedule['enabled'] = bool(saved.get('enabled', schedule['enabled']))
+        schedule['interval_minutes'] = max(1, int(saved.get('interval_minutes', schedule['interval_minutes'])))
+        schedule['keep'].update({
+            tier: max(0, int(count))
+            for tier, count in saved.get('keep', {}).items() if tier in GFS_PERIODS
+        })
+    except FileNotFoundError:
+        os.makedirs(backup_dir, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(schedule, f, ensure_ascii=False, indent=2)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        print(f"Error reading backup schedule, using defaults: {str(e)}")
+    return schedule
+
+
+def gfs_keep(timestamps, keep):
+    """
+    النسخ المحتفظ بها وفق سياسة الجد-الأب-الابن
+
+    لكل مستوى تُؤخذ أحدث نسخة في كل فترة (ساعة/يوم/أسبوع/شهر) لأحدث
+    keep[tier] فترة فيها نسخ، والمحتفظ به هو اتحاد المستويات.
+
+    Args:
+        timestamps (list): الطوابع الزمنية للنسخ المجدولة (YYYYmmdd_HHMMSS)
+        keep (dict): {hourly, daily, weekly, monthly}
+
+    Returns:
+        set: الطوابع الزمنية المحتفظ بها
+    """
+    kept = set()
+    ordered = sorted(timestamps, reverse=True)
+    for tier, period in GFS_PERIODS.items():
+        limit = keep.get(tier, 0)
+        seen = set()
+        for timestamp in ordered:
+            if len(seen) >= limit:
+                break
+            key = period(datetime.strptime(timestamp, '%Y%m%d_%H%M%S'))
+            if key not in seen:
+                seen.add(key)
+                kept.add(timestamp)
+    return kept
+
+
+def take_backup(db_path, backup_dir, origin=ORIGIN_MANUAL, progress=None, cancelled=None):
+    """
+    نسخة احتياطية من قاعدة البيانات (مقسمة إلى قطع) ومجلدي العقود والفواتير
+    بجوارها، مع تسجيلها في الفهرس
+
+    لقطة الملفات تُؤخذ بعد لقطة قاعدة البيانات وتُفحص مقابل ما تشير إليه
+    تلك اللقطة (contract_filename و file_path)، ويُسجل موضع سجل التغييرات
+    فيها ليبدأ منه الاسترجاع إلى لحظة لاحقة. النسخة تُسجل دون حالة تحقق
+    حتى يفحصها backup_verifier. لا تمس سجل التدقيق. يجب استدعاؤها مع
+    الاحتفاظ بـ backup_lock.
+
+    Returns:
+        dict: نتيجة incremental_backup مع timestamp و files (نتيجة FileSnapshots.create)
+    """
+    # الطابع الزمني هو مفتاح النسخة: لا تُنشأ نسختان في نفس الثانية
+    while True:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        manifest_path = os.path.join(backup_dir, f"{timestamp}{MANIFEST_SUFFIX}")
+        if not os.path.exists(manifest_path):
+            break
+        time.sleep(1)
+    chunk_store = ChunkStore(backup_dir)
+    result = incremental_backup(
+        db_path, chunk_store, manifest_path, progress=progress, cancelled=cancelled,
+        on_snapshot=lambda snapshot: (file_references(snapshot), journal_position(snapshot))
+    )
+    references, journal_id = result['snapshot']
+    try:
+        files = FileSnapshots(backup_dir, os.path.dirname(db_path)).create(timestamp, references)
+    except BaseException:
+        # نسخة بلا ملفاتها ناقصة: تُحذف (قطعها اليتيمة يحذفها gc لاحقاً)
+        os.remove(manifest_path)
+        raise
+
+    catalog = BackupCatalog(backup_dir)
+    catalog.record_database(
+        timestamp, os.path.basename(manifest_path), 'chunks',
+        result['size'], result['new_bytes'], result['sha256'],
+        result['table_counts'], origin=origin, journal_id=journal_id
+    )
+    catalog.record_files(timestamp, files['files'], files['bytes'], files['copied_bytes'], files['missing'])
+    result['timestamp'] = timestamp
+    result['files'] = files
+    return result
+
+
+def prune_backups(backup_dir, keep):
+    """
+    حذف النسخ المجدولة التي انتهت مدة الاحتفاظ بها ثم القطع غير المستخدمة
+
+    النسخ اليدوية ونسخ السجلات لا تُحذف. يجب استدعاؤها مع الاحتفاظ بـ backup_lock.
+
+    Returns:
+        list: الطوابع الزمنية للنسخ المحذوفة
+    """
+    catalog = BackupCatalog(backup_dir)
+    scheduled = [
+        backup for backup in catalog.list()
+        if backup['origin'] == ORIGIN_SCHEDULED and backup['db_format'] == 'chunks'
+    ]
+    kept = gfs_keep([backup['timestamp'] for backup in scheduled], keep)
+
+    snapshots = FileSnapshots(backup_dir)
+    pruned = []
+    for backup in scheduled:
+        if backup['timestamp'] in kept:
+            continue
+        manifest_path = os.path.join(backup_dir, backup['db_file'])
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        snapshots.remove(backup['timestamp'])
+        catalog.remove_database(backup['timestamp'])
+        pruned.append(backup['timestamp'])
+
+    if pruned:
+        ChunkStore(backup_dir).gc()
+        # سجل التغييرات قبل أقدم نسخة أساسية لم يعد يلزم للاسترجاع
+        positions = [
+            backup['journal_id'] for backup in catalog.list()
+            if backup['db_file'] and backup['journal_id'] is not None
+        ]
+        if positions:
+            ChangeJournal(backup_dir).prune(min(positions))
+    return pruned
+
+
+class BackupScheduler:
+    """
+    النسخ الاحتياطي التلقائي في خيط خلفي
+
+    كل interval_minutes (من backup_schedule.json) تُؤخذ لقطة متسقة من
+    قاعدة البيانات دون إيقافها ثم تُطبق سياسة الاحتفاظ على النسخ المجدولة.
+    الموعد يُحسب من آخر نسخة مجدولة في الفهرس، فإعادة تشغيل البرنامج لا
+    تنشئ نسخاً زائدة. مع كل فحص تُؤرشف تغييرات الصفوف الجديدة (row_changes)
+    للاسترجاع إلى لحظة محددة بين النسخ. الخيط لا يمس واجهة المستخدم ولا سجل
+    التدقيق.
+    """
+
+    def __init__(self, db_path, backup_dir, startup_delay=60, poll_seconds=60):
+        """
+        Args:
+            db_path (str): قاعدة البيانات
+            backup_dir (str): مجلد النسخ الاحتياطية
+            startup_delay (float): مهلة قبل أول فحص (لا تنافس بدء البرنامج)
+            poll_seconds (float): أقصى مدة بين فحصين للموعد
+        """
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.startup_delay = startup_delay
+        self.poll_seconds = poll_seconds
+        self.last_result = None
+        self.last_error = None
+        self.journal = ChangeJournal(backup_dir)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """تشغيل خيط الجدولة"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='backup-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """إيقاف الخيط (النسخ الجاري يُلغى ولا يترك ملفات ناقصة)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+            # آخر التغييرات قبل إغلاق البرنامج
+            self.archive_changes()
+
+    def archive_changes(self):
+        """أرشفة تغييرات الصفوف الجديدة (لا تتأخر أكثر من poll_seconds)"""
+        try:
+            self.journal.archive(self.db_path)
+        except Exception as e:
+            print(f"Error archiving change journal: {str(e)}")
+
+    def _last_scheduled(self):
+        """وقت آخر نسخة مجدولة من الفهرس"""
+        for backup in BackupCatalog(self.backup_dir).list():
+            if backup['origin'] == ORIGIN_SCHEDULED and backup['db_file']:
+                return datetime.strptime(backup['timestamp'], '%Y%m%d_%H%M%S')
+        return None
+
+    def next_run(self, schedule):
+        """موعد النسخة المجدولة التالية"""
+        last = self._last_scheduled()
+        if last is None:
+            return datetime.now()
+        return last + timedelta(minutes=schedule['interval_minutes'])
+
+    def run_once(self):
+        """
+        تنفيذ نسخة مجدولة وتطبيق الاحتفاظ (تتخطى إذا كان نسخ آخر جارياً)
+
+        Returns:
+            bool: هل أُخذت نسخة
+        """
+        schedule = load_schedule(self.backup_dir)
+        if not backup_lock.acquire(blocking=False):
+            return False
+        try:
+            self.last_result = take_backup(
+                self.db_path, self.backup_dir, ORIGIN_SCHEDULED, cancelled=self._stop.is_set
+            )
+            self.last_result['pruned'] = prune_backups(self.backup_dir, schedule['keep'])
+            self.last_error = None
+        finally:
+            backup_lock.release()
+
+        # التحقق من النسخة الجديدة (وأي نسخة لم يُتحقق منها) في عملية مستقلة
+        run_verifier(self.backup_dir)
+        return True
+
+    def _run(self):
+        if self._stop.wait(self.startup_delay):
+            return
+        while not self._stop.is_set():
+            wait = self.poll_seconds
+            self.archive_changes()
+            try:
+                schedule = load_schedule(self.backup_dir)
+                if schedule['enabled']:
+                    due = self.next_run(schedule)
+                    if datetime.now() >= due:
+                        self.run_once()
+                    else:
+                        wait = min(wait, (due - datetime.now()).total_seconds())
+            except BackupCancelled:
+                return
+            except Exception as e:
+                # لا إعادة محاولة فورية لنسخة فاشلة (قرص ممتلئ مثلاً)
+                self.last_error = str(e)
+                wait = max(wait, 300)
+                print(f"Error in scheduled backup: {str(e)}")
+            self._stop.wait(max(wait, 1))
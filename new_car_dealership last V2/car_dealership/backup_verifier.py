@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+التحقق من قابلية استرجاع النسخ الاحتياطية في عملية مستقلة
+
+لكل نسخة يُعاد تجميع ملف قاعدة البيانات (أو يُقرأ الملف الكامل للنسخ
+القديمة) في ملف مؤقت ثم يُفحص بـ integrity_check و foreign_key_check
+وعدد صفوف كل جدول، وتُفحص بصمات ملفات العقود والفواتير المرافقة، وتُحفظ
+النتيجة في فهرس النسخ. نافذة النسخ الاحتياطي
+تعرض النتيجة من الفهرس مباشرة والاسترجاع يرفض النسخ غير المتحقق منها.
+
+الاستخدام (من مجلد التطبيق):
+    python -m car_dealership.backup_verifier            # النسخ التي لم يُتحقق منها
+    python -m car_dealership.backup_verifier --all      # إعادة التحقق من كل النسخ
+    python -m car_dealership.backup_verifier 20240101_120000
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+import subprocess
+from pathlib import Path
+from .chunk_store import ChunkStore
+from .file_snapshot import FileSnapshots
+from .db_backup import table_counts
+from .backup_catalog import BackupCatalog, BACKUP_DIR, VERIFY_OK, VERIFY_FAILED, file_sha256
+
+# مجلد التطبيق: تُشغل منه عملية التحقق (python -m car_dealership...)
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def check_database_file(path, expected_counts=None):
+    """
+    فحص ملف قاعدة بيانات
+
+    Args:
+        path (str): ملف قاعدة البيانات
+        expected_counts (dict): عدد الصفوف المسجل عند إنشاء النسخة
+
+    Returns:
+        tuple: (قائمة المشاكل، عدد الصفوف لكل جدول، عدد مخالفات المفاتيح الأجنبية)
+    """
+    problems = []
+    conn = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ['ok']:
+            problems.append("integrity_check: " + "; ".join(result[:5]))
+
+        # التطبيق لا يفعّل foreign_keys، فالمراجع المعلقة قد توجد في القاعدة
+        # نفسها: تُحصى ولا تُعد تلفاً في النسخة
+        try:
+            fk_violations = len(conn.execute("PRAGMA foreign_key_check").fetchall())
+        except sqlite3.Error as e:
+            fk_violations = None
+            problems.append(f"foreign_key_check: {str(e)}")
+    finally:
+        conn.close()
+
+    counts = table_counts(path)
+    if expected_counts is not None:
+        for table in sorted(set(expected_counts) | set(counts)):
+            if expected_counts.get(table) != counts.get(table):
+                problems.append(
+                    f"عدد صفوف {table}: {counts.get(table)} بدلاً من {expected_counts.get(table)}"
+                )
+    return problems, counts, fk_violations
+
+
+def verify_backup(backup_dir, backup):
+    """
+    التحقق من نسخة واحدة من الفهرس
+
+    Returns:
+        tuple: (الحالة، سبب الفشل، عدد الصفوف، مخالفات المفاتيح الأجنبية)
+               أو None إذا حُذفت النسخة أثناء التحقق
+    """
+    problems = []
+    counts = None
+    fk_violations = None
+
+    if backup['log_file']:
+        log_path = os.path.join(backup_dir, backup['log_file'])
+        if not os.path.exists(log_path):
+            problems.append("ملف السجلات غير موجود")
+        elif backup['log_sha256'] and file_sha256(log_path) != backup['log_sha256']:
+            problems.append("بصمة ملف السجلات لا تطابق الفهرس")
+
+    if backup['db_file']:
+        db_path = os.path.join(backup_dir, backup['db_file'])
+        temp_path = os.path.join(backup_dir, f".verify_{backup['timestamp']}.db")
+        try:
+            if backup['db_format'] == 'chunks':
+                # إعادة التجميع تتحقق من بصمة كل قطعة والبصمة الكاملة
+                ChunkStore(backup_dir).restore(db_path, temp_path)
+                check_path = temp_path
+            else:
+                if backup['db_sha256'] and file_sha256(db_path) != backup['db_sha256']:
+                    problems.append("بصمة ملف قاعدة البيانات لا تطابق الفهرس")
+                check_path = db_path
+            db_problems, counts, fk_violations = check_database_file(check_path, backup['table_counts'])
+            problems.extend(db_problems)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            if not os.path.exists(db_path):
+                # حُذفت النسخة (يدوياً أو بسياسة الاحتفاظ) أثناء التحقق
+                return None
+            problems.append(str(e))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    if backup['files_count'] is not None:
+        problems.extend(FileSnapshots(backup_dir).verify(backup['timestamp']))
+
+    status = VERIFY_FAILED if problems else VERIFY_OK
+    return status, "\n".join(problems) or None, counts, fk_violations
+
+
+def verify_backups(backup_dir, timestamps=None, force=False):
+    """
+    التحقق من النسخ وحفظ النتائج في الفهرس
+
+    Args:
+        backup_dir (str): مجلد النسخ الاحتياطية
+        timestamps (list): نسخ محددة (الكل إذا لم تُحدد)
+        force (bool): إعادة التحقق من النسخ المتحقق منها سابقاً
+
+    Returns:
+        dict: {timestamp: الحالة}
+    """
+    catalog = BackupCatalog(backup_dir)
+    results = {}
+    for backup in catalog.list():
+        if timestamps and backup['timestamp'] not in timestamps:
+            continue
+        if not force and not timestamps and backup['verify_status'] is not None:
+            continue
+        outcome = verify_backup(backup_dir, backup)
+        if outcome is None:
+            continue
+        status, error, counts, fk_violations = outcome
+        catalog.set_verification(backup['timestamp'], status, error, counts, fk_violations)
+        results[backup['timestamp']] = status
+    return results
+
+
+def verifier_command(backup_dir, timestamps=None, force=False):
+    """أمر تشغيل التحقق في عملية مستقلة (يُشغل من APP_DIR)"""
+    command = [sys.executable, '-m', 'car_dealership.backup_verifier', '--backup-dir', backup_dir]
+    if force:
+        command.append('--all')
+    return command + list(timestamps or [])
+
+
+def run_verifier(backup_dir, timestamps=None, force=False, timeout=3600):
+    """
+    تشغيل التحقق في عملية مستقلة وانتظارها (من خيوط الخلفية فقط)
+
+    Returns:
+        bool: هل كانت كل النسخ المفحوصة سليمة
+    """
+    completed = subprocess.run(
+        verifier_command(backup_dir, timestamps, force),
+        cwd=APP_DIR, timeout=timeout, capture_output=True
+    )
+    return completed.returncode == 0
+
+
+def main():
+    """التحقق من النسخ الاحتياطية من سطر الأوامر"""
+    parser = argparse.ArgumentParser(description="التحقق من قابلية استرجاع النسخ الاحتياطية")
+    parser.add_argument('timestamps', nargs='*', help="الطوابع الزمنية للنسخ (YYYYmmdd_HHMMSS)")
+    parser.add_argument('--all', action='store_true', help="إعادة التحقق من كل النسخ")
+    parser.add_argument('--backup-dir', default=BACKUP_DIR, help="مجلد النسخ الاحتياطية")
+    args = parser.parse_args()
+
+    results = verify_backups(args.backup_dir, args.timestamps, args.all)
+    failed = [timestamp for timestamp, status in results.items() if status != VERIFY_OK]
+    print(f"تم التحقق من {len(results)} نسخة، الفاشلة: {len(failed)}")
+    for timestamp in failed:
+        print(f"    {timestamp}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
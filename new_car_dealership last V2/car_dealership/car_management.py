@@ -13,11 +13,13 @@ import subprocess
 import sys
 import pandas as pd
 from .utils import Validator, UIHelper, Constants
+from .query_executor import QueryExecutor
 
 class CarManagement(QWidget):
     def __init__(self, database, parent=None):
         super().__init__(parent)
         self.database = database
+        self.executor = QueryExecutor(database, self)
         self.selected_car_id = None
         self.contract_filename = None
         self.user_id = None
@@ -320,34 +322,36 @@ class CarManagement(QWidget):
             if not self.user_id or not self.username:
                 raise ValueError("معلومات المستخدم غير متوفرة")
 
-            # حفظ بيانات العميل أولاً
-            client_data = (
-                self.client_name.text().strip(),
-                self.client_phone.text().strip(),
-                self.client_address.text().strip(),
-                client_status
-            )
-            self.database.add_client(client_data, self.user_id, self.username)
-            
-            # حفظ بيانات السيارة
-            if self.selected_car_id:  # تعديل سيارة موجودة
-                self.database.cursor.execute("""
-                    UPDATE cars 
-                    SET brand = ?, model = ?, year = ?, chassis = ?, 
-                        engine = ?, condition = ?, transaction_type = ?,
-                        price = ?, purchase_date = ?, license_expiry = ?,
-                        contract_filename = ?, client_name = ?, client_phone = ?,
-                        client_address = ?, client_status = ?
-                    WHERE id = ?
-                """, (*car_data, self.selected_car_id))
-                self.database.conn.commit()
-                UIHelper.show_success(self, "نجاح", "تم تحديث بيانات السيارة بنجاح")
-            else:  # إضافة سيارة جديدة
-                if self.database.add_car(car_data, self.user_id, self.username):
-                    UIHelper.show_success(self, "نجاح", "تمت إضافة السيارة بنجاح")
-                else:
-                    UIHelper.show_error(self, "خطأ", "فشل في إضافة السيارة")
-            
+            # العميل والسيارة في معاملة واحدة: إما أن يُحفظا معاً أو لا يُحفظ أي منهما
+            with self.database.transaction():
+                # حفظ بيانات العميل أولاً
+                client_data = (
+                    self.client_name.text().strip(),
+                    self.client_phone.text().strip(),
+                    self.client_address.text().strip(),
+                    client_status
+                )
+                if not self.database.add_client(client_data, self.user_id, self.username):
+                    raise ValueError("فشل في حفظ بيانات العميل")
+                
+                # حفظ بيانات السيارة
+                if self.selected_car_id:  # تعديل سيارة موجودة
+                    self.database.cursor.execute("""
+                        UPDATE cars 
+                        SET brand = ?, model = ?, year = ?, chassis = ?, 
+                            engine = ?, condition = ?, transaction_type = ?,
+                            price = ?, purchase_date = ?, license_expiry = ?,
+                            contract_filename = ?, client_name = ?, client_phone = ?,
+                            client_address = ?, client_status = ?
+                        WHERE id = ?
+                    """, (*car_data, self.selected_car_id))
+                    message = "تم تحديث بيانات السيارة بنجاح"
+                else:  # إضافة سيارة جديدة
+                    if not self.database.add_car(car_data, self.user_id, self.username):
+                        raise ValueError("فشل في إضافة السيارة")
+                    message = "تمت إضافة السيارة بنجاح"
+            
+            UIHelper.show_success(self, "نجاح", message)
             self.clear_fields()
             self.load_cars()
             
@@ -355,17 +359,31 @@ class CarManagement(QWidget):
             UIHelper.show_error(self, "خطأ", f"حدث خطأ: {str(e)}")
 
     def load_cars(self):
-        """تحميل بيانات السيارات"""
+        """تحميل بيانات السيارات في الخلفية"""
+        self.executor.submit(
+            'cars',
+            self.fetch_cars,
+            on_result=self.populate_cars,
+            on_error=lambda error: UIHelper.show_error(
+                self, "خطأ", f"فشل في تحميل بيانات السيارات: {error}"
+            )
+        )
+
+    def fetch_cars(self):
+        """جلب بيانات السيارات (تعمل على خيط عمل)"""
+        cursor = self.database.read_cursor()
+        cursor.execute("""
+            SELECT id, brand, model, year, chassis, engine,
+                   condition, transaction_type, price,
+                   purchase_date, license_expiry,
+                   contract_filename, contract_upload_date
+            FROM cars
+        """)
+        return cursor.fetchall()
+
+    def populate_cars(self, cars):
+        """عرض بيانات السيارات في الجدول"""
         try:
-            self.database.cursor.execute("""
-                SELECT id, brand, model, year, chassis, engine,
-                       condition, transaction_type, price,
-                       purchase_date, license_expiry,
-                       contract_filename, contract_upload_date
-                FROM cars
-            """)
-            cars = self.database.cursor.fetchall()
-            
             self.table.setRowCount(len(cars))
             for i, car in enumerate(cars):
                 for j, value in enumerate(car):
@@ -393,15 +411,16 @@ class CarManagement(QWidget):
     def export_to_excel(self):
         """تصدير بيانات السيارات إلى ملف Excel"""
         try:
-            # الحصول على البيانات من قاعدة البيانات
-            self.database.cursor.execute("""
+            # الحصول على البيانات عبر اتصال القراءة
+            cursor = self.database.read_cursor()
+            cursor.execute("""
                 SELECT id, brand, model, year, chassis, engine,
                        condition, transaction_type, price,
                        purchase_date, license_expiry,
                        client_name, client_phone, client_address
                 FROM cars
             """)
-            cars = self.database.cursor.fetchall()
+            cars = cursor.fetchall()
             
             # إنشاء DataFrame
             columns = [
@@ -524,18 +543,18 @@ class CarManagement(QWidget):
                 contract_filename = result[0] if result else None
                 
                 # حذف السيارة من قاعدة البيانات
-                self.database.cursor.execute(
-                    "DELETE FROM cars WHERE id = ?", 
-                    (self.selected_car_id,)
-                )
+                with self.database.transaction():
+                    self.database.cursor.execute(
+                        "DELETE FROM cars WHERE id = ?", 
+                        (self.selected_car_id,)
+                    )
                 
-                # محاولة حذف ملف العقد
+                # حذف ملف العقد بعد نجاح حذف السجل
                 if contract_filename:
                     contract_path = self.database.get_contract_path(contract_filename)
                     if contract_path and os.path.exists(contract_path):
                         os.remove(contract_path)
                 
-                self.database.conn.commit()
                 self.load_cars()
                 self.clear_fields()
                 UIHelper.show_success(self, "نجاح", "تم حذف السيارة بنجاح")
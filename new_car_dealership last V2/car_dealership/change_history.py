@@ -0,0 +1,151 @@
+import json
+from .migrations import CAPTURED_TABLES, table_columns
+
+
+class ChangeHistory:
+    """
+    قراءة سجل تغييرات الصفوف (row_changes) الذي تملؤه مشغلات قاعدة البيانات
+
+    كل تغيير يُعاد كقاموس {column: (القيمة القديمة، القيمة الجديدة)}؛ الإضافة
+    قيمها القديمة None والحذف قيمه الجديدة None.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    @staticmethod
+    def _check_table(table):
+        """منع أسماء الجداول غير المسجلة (تُستخدم في نص الاستعلام)"""
+        if table not in CAPTURED_TABLES:
+            raise ValueError(f"الجدول {table} لا تُسجل تغييراته")
+
+    @staticmethod
+    def decode(operation, changes):
+        """
+        تحويل JSON المخزن إلى {column: (قديمة، جديدة)}
+
+        Args:
+            operation (str): INSERT / UPDATE / DELETE
+            changes (str): نص JSON كما كتبه المشغل
+
+        Returns:
+            dict: الأعمدة المتغيرة
+        """
+        values = json.loads(changes)
+        if operation == 'UPDATE':
+            return {column: (pair[0], pair[1]) for column, pair in values.items()}
+        if operation == 'INSERT':
+            return {column: (None, value) for column, value in values.items()}
+        return {column: (value, None) for column, value in values.items()}
+
+    def _rows(self, query, params):
+        cursor = self.database.read_cursor()
+        cursor.execute(query, params)
+        results = []
+        for change_id, table, row_id, operation, changes, user_id, username, changed_at in cursor.fetchall():
+            results.append({
+                'id': change_id,
+                'table': table,
+                'row_id': row_id,
+                'operation': operation,
+                'changes': self.decode(operation, changes),
+                'user_id': user_id,
+                'username': username,
+                'changed_at': changed_at
+            })
+        return results
+
+    def get_history(self, table, row_id):
+        """
+        التاريخ الكامل لصف واحد من الأقدم للأحدث
+
+        لكل تغيير تُضاف حالة الصف الكاملة بعده ('row'، أو None بعد الحذف).
+        الحالات تُحسب رجوعاً من الصف الحالي، فتصح أيضاً للصفوف التي
+        أُنشئت قبل تفعيل تسجيل التغييرات.
+
+        Args:
+            table (str): اسم الجدول (من CAPTURED_TABLES)
+            row_id (int): معرف الصف
+
+        Returns:
+            list: قواميس التغييرات {id, operation, changes, user_id, username, changed_at, row}
+        """
+        try:
+            self._check_table(table)
+            history = self._rows("""
+                SELECT rc.id, rc.table_name, rc.row_id, rc.operation, rc.changes,
+                       rc.user_id, u.username, rc.changed_at
+                FROM row_changes rc
+                LEFT JOIN users u ON u.id = rc.user_id
+                WHERE rc.table_name = ? AND rc.row_id = ?
+                ORDER BY rc.id
+            """, (table, row_id))
+
+            columns = table_columns(self.database.read_connection(), table)
+            cursor = self.database.read_cursor()
+            cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,))
+            current = cursor.fetchone()
+            state = dict(zip(columns, current)) if current else None
+
+            # من الأحدث للأقدم: حالة ما قبل كل تغيير هي حالة ما بعد سابقه
+            for change in reversed(history):
+                change['row'] = dict(state) if state is not None else None
+                if change['operation'] == 'INSERT':
+                    state = None
+                elif change['operation'] == 'DELETE':
+                    state = {column: None for column in columns}
+                    state.update({column: old for column, (old, _) in change['changes'].items()})
+                else:
+                    state = dict(state or {column: None for column in columns})
+                    state.update({column: old for column, (old, _) in change['changes'].items()})
+            return history
+
+        except Exception as e:
+            print(f"Error in get_history: {str(e)}")
+            return []
+
+    def get_changes(self, table=None, start_date=None, end_date=None, user_id=None, limit=500):
+        """
+        أحدث التغييرات عبر كل الجداول المسجلة أو جدول واحد
+
+        Args:
+            table (str): اسم الجدول (اختياري)
+            start_date (str): بداية الفترة (YYYY-MM-DD)
+            end_date (str): نهاية الفترة (YYYY-MM-DD، شاملة)
+            user_id (int): المستخدم الذي أجرى التغيير
+            limit (int): أقصى عدد
+
+        Returns:
+            list: قواميس التغييرات من الأحدث للأقدم
+        """
+        try:
+            query = """
+                SELECT rc.id, rc.table_name, rc.row_id, rc.operation, rc.changes,
+                       rc.user_id, u.username, rc.changed_at
+                FROM row_changes rc
+                LEFT JOIN users u ON u.id = rc.user_id
+            """
+            conditions = []
+            params = []
+            if table:
+                self._check_table(table)
+                conditions.append("rc.table_name = ?")
+                params.append(table)
+            if start_date and end_date:
+                # changed_at يشمل الوقت: نهاية اليوم شاملة
+                conditions.append("rc.changed_at >= ? AND rc.changed_at < date(?, '+1 day')")
+                params.extend([start_date, end_date])
+            if user_id is not None:
+                conditions.append("rc.user_id = ?")
+                params.append(user_id)
+
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY rc.id DESC LIMIT ?"
+            params.append(limit)
+
+            return self._rows(query, params)
+
+        except Exception as e:
+            print(f"Error in get_changes: {str(e)}")
+            return []
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+أرشيف سجل تغييرات الصفوف والاسترجاع إلى لحظة محددة
+
+مشغلات row_changes تسجل كل إضافة وتعديل وحذف في الجداول المسجلة داخل
+معاملة التعديل نفسها. خيط النسخ التلقائي ينسخ السجلات الجديدة باستمرار
+إلى ملفات backups/journal/*.jsonl (تُكتب إضافةً فقط)، فتبقى التغييرات بين
+نسختين احتياطيتين محفوظة خارج قاعدة البيانات.
+
+الاسترجاع يأخذ أحدث نسخة احتياطية قبل اللحظة المطلوبة ثم يعيد تطبيق
+التغييرات المسجلة بعدها حتى تلك اللحظة. الجداول غير المسجلة (المستخدمون
+وبنود الفواتير) تبقى كما في النسخة الأساسية.
+
+الاستخدام (من مجلد التطبيق):
+    python -m car_dealership.change_journal "2024-05-01 14:59"
+    python -m car_dealership.change_journal "2024-05-01 14:59:30" --output /tmp/aboraaya.db
+    python -m car_dealership.change_journal "2024-05-01 14:59" --replace
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from .chunk_store import ChunkStore
+from .migrations import CAPTURED_TABLES, apply_migrations, create_change_triggers
+from .backup_catalog import BackupCatalog, BACKUP_DIR, VERIFY_FAILED
+from .backup_verifier import check_database_file
+
+JOURNAL_DIR = 'journal'
+ABANDONED_DIR = 'abandoned'
+BRANCH_FILE = 'branch.json'
+SEGMENT_SUFFIX = '.jsonl'
+
+# قاعدة البيانات الحية (بجوار هذا الملف)
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aboraaya.db')
+
+# أعمدة row_changes بترتيبها في سطر الأرشيف
+JOURNAL_COLUMNS = ('id', 'table_name', 'row_id', 'operation', 'changes', 'user_id', 'changed_at')
+_SELECT_CHANGES = f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM row_changes"
+# أرشفة واحدة في كل مرة داخل البرنامج (خيط الجدولة ونافذة النسخ)
+journal_lock = threading.Lock()
+
+_INSERT_CHANGES = f"INSERT INTO row_changes ({', '.join(JOURNAL_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def _connect_readonly(db_path):
+    return sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
+
+
+def _has_journal(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'row_changes'"
+    ).fetchone() is not None
+
+
+def journal_position(db_path):
+    """
+    آخر تغيير مسجل في قاعدة بيانات (لقطة نسخة عادةً)
+
+    Returns:
+        int: معرف آخر سجل في row_changes (0 إذا لم يوجد)
+    """
+    conn = _connect_readonly(db_path)
+    try:
+        if not _has_journal(conn):
+            return 0
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM row_changes").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def to_journal_time(moment):
+    """
+    تحويل وقت محلي إلى صيغة changed_at (UTC كما تكتبه المشغلات)
+
+    Args:
+        moment (datetime): وقت محلي
+
+    Returns:
+        str: YYYY-mm-dd HH:MM:SS.fff
+    """
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+def parse_moment(text):
+    """قراءة اللحظة المطلوبة (YYYY-mm-dd HH:MM أو YYYY-mm-dd HH:MM:SS بالوقت المحلي)"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            moment = datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+        # "14:59" تشمل كل ثواني الدقيقة و "14:59:30" كل أجزاء الثانية
+        if fmt.endswith('%M'):
+            moment = moment.replace(second=59)
+        return moment.replace(microsecond=999999)
+    raise ValueError(f"صيغة الوقت غير صحيحة: {text} (المطلوب YYYY-mm-dd HH:MM[:SS])")
+
+
+class ChangeJournal:
+    """
+    أرشيف سجل التغييرات (backups/journal)
+
+    كل ملف يبدأ اسمه بمعرف أول سجل فيه، وكل سطر مصفوفة JSON بأعمدة
+    row_changes. الملف الأخير وحده يُضاف إليه، والسطر الناقص في آخره
+    (انقطاع أثناء الكتابة) يُحذف عند الفتح التالي.
+
+    بعد استرجاع نسخة أقدم تعيد قاعدة البيانات ترقيم التغييرات من موضع
+    النسخة، فالسجلات المؤرشفة بعد ذلك الموضع تُنقل إلى فرع في
+    journal/abandoned (مع موضع التفرع ووقت الترك) ويستمر الأرشيف من تاريخ
+    القاعدة الحالية. الاسترجاع إلى لحظة كان فيها الفرع هو التاريخ الحي
+    يطبق تغييراته هو.
+    """
+
+    def __init__(self, backup_dir, max_segment_entries=100000):
+        """
+        Args:
+            backup_dir (str): مجلد النسخ الاحتياطية
+            max_segment_entries (int): عدد السجلات الذي يُبدأ بعده ملف جديد
+        """
+        self.root = os.path.join(backup_dir, JOURNAL_DIR)
+        self.max_segment_entries = max_segment_entries
+        os.makedirs(self.root, exist_ok=True)
+        self._state = None
+
+    def segments(self):
+        """أسماء ملفات الأرشيف بترتيب معرفاتها"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.endswith(SEGMENT_SUFFIX) and os.path.isfile(os.path.join(self.root, name))
+        )
+
+    @staticmethod
+    def first_id(segment):
+        return int(segment[:-len(SEGMENT_SUFFIX)])
+
+    def _segment_path(self, segment, directory=None):
+        return os.path.join(directory or self.root, segment)
+
+    @staticmethod
+    def _read_lines(path):
+        """سجلات ملف (يتوقف عند أول سطر ناقص)"""
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                entries.append(json.loads(line))
+        return entries
+
+    def _load_state(self):
+        """آخر موضع في الأرشيف (مع حذف السطر الناقص في آخر ملف)"""
+        segments = self.segments()
+        state = {'segment': None, 'size': 0, 'entries': 0, 'last': None, 'last_id': 0}
+        if segments:
+            segment = segments[-1]
+            path = self._segment_path(segment)
+            with open(path, 'rb') as f:
+                data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete != len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(complete)
+            entries = [json.loads(line) for line in data[:complete].decode('utf-8').splitlines()]
+            state.update({
+                'segment': segment,
+                'size': complete,
+                'entries': len(entries),
+                'last': entries[-1] if entries else None,
+                'last_id': entries[-1][0] if entries else self.first_id(segment) - 1
+            })
+        self._state = state
+        return state
+
+    def _current_state(self):
+        """الموضع المحفوظ، أو إعادة قراءته إذا كتب كائن آخر في الأرشيف"""
+        state = self._state
+        if state is not None:
+            segments = self.segments()
+            current = segments[-1] if segments else None
+            if (current == state['segment']
+                    and (current is None or os.path.getsize(self._segment_path(current)) == state['size'])):
+                return state
+        return self._load_state()
+
+    @property
+    def last_id(self):
+        """معرف آخر سجل مؤرشف"""
+        return self._current_state()['last_id']
+
+    def branches(self):
+        """
+        التواريخ المتروكة بعد استرجاع نسخ أقدم
+
+        Returns:
+            list: قواميس {directory, fork, first_changed_at, abandoned_at}
+        """
+        root = os.path.join(self.root, ABANDONED_DIR)
+        result = []
+        for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+            try:
+                with open(os.path.join(root, name, BRANCH_FILE), 'r', encoding='utf-8') as f:
+                    branch = json.load(f)
+            except (OSError, ValueError):
+                continue
+            branch['directory'] = os.path.join(root, name)
+            result.append(branch)
+        return result
+
+    def branch_at(self, until):
+        """
+        التاريخ الذي كانت عليه القاعدة في لحظة (None للتاريخ الحالي)
+
+        Args:
+            until (str): اللحظة بصيغة changed_at
+
+        Returns:
+            dict: فرع من branches() بدأت تغييراته قبل اللحظة وتُرك بعدها
+        """
+        candidates = [
+            branch for branch in self.branches()
+            if branch['first_changed_at'] <= until < branch['abandoned_at']
+        ]
+        return min(candidates, key=lambda branch: branch['abandoned_at']) if candidates else None
+
+    def _entries_in(self, directory, after_id, until, last_id=None):
+        names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+        for index, segment in enumerate(names):
+            if index + 1 < len(names) and self.first_id(names[index + 1]) <= after_id + 1:
+                continue
+            for entry in self._read_lines(self._segment_path(segment, directory)):
+                if entry[0] <= after_id:
+                    continue
+                if (last_id is not None and entry[0] > last_id) or (until is not None and entry[6] > until):
+                    return
+                yield entry
+
+    def entries(self, after_id=0, until=None, branch=None):
+        """
+        السجلات المؤرشفة بعد موضع معين بالترتيب
+
+        Args:
+            after_id (int): تُتخطى السجلات حتى هذا المعرف
+            until (str): آخر changed_at مطلوب (يتوقف عند أول سجل بعده)
+            branch (dict): تاريخ متروك (من branch_at) بدل التاريخ الحالي
+
+        Yields:
+            list: سجل بأعمدة JOURNAL_COLUMNS
+        """
+        if branch is None:
+            yield from self._entries_in(self.root, after_id, until)
+            return
+        # الفرع يشارك التاريخ الحالي حتى موضع تفرعه
+        yield from self._entries_in(self.root, after_id, until, branch['fork'])
+        yield from self._entries_in(branch['directory'], max(after_id, branch['fork']), until)
+
+    def get(self, change_id, branch=None):
+        """سجل واحد بمعرفه أو None"""
+        for entry in self.entries(change_id - 1, branch=branch):
+            return entry if entry[0] == change_id else None
+        return None
+
+    def archive(self, db_path, batch_size=10000):
+        """
+        نسخ سجلات row_changes الجديدة من قاعدة البيانات إلى الأرشيف
+
+        Returns:
+            int: عدد السجلات المؤرشفة
+        """
+        if not os.path.exists(db_path):
+            return 0
+        with journal_lock:
+            conn = _connect_readonly(db_path)
+            try:
+                if not _has_journal(conn):
+                    return 0
+                self._reconcile(conn)
+                archived = 0
+                while True:
+                    rows = conn.execute(
+                        f"{_SELECT_CHANGES} WHERE id > ? ORDER BY id LIMIT ?", (self.last_id, batch_size)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    self._append([list(row) for row in rows])
+                    archived += len(rows)
+                return archived
+            finally:
+                conn.close()
+
+    def _append(self, entries):
+        state = self._state
+        while entries:
+            if state['segment'] is None or state['entries'] >= self.max_segment_entries:
+                state['segment'] = f"{entries[0][0]:012d}{SEGMENT_SUFFIX}"
+                state['entries'] = 0
+            batch = entries[:self.max_segment_entries - state['entries']]
+            entries = entries[len(batch):]
+            with open(self._segment_path(state['segment']), 'a', encoding='utf-8', newline='\n') as f:
+                f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch)
+                f.flush()
+                os.fsync(f.fileno())
+                state['size'] = f.tell()
+            state['entries'] += len(batch)
+            state['last'] = batch[-1]
+            state['last_id'] = batch[-1][0]
+
+    @staticmethod
+    def _live_entry(conn, change_id):
+        row = conn.execute(f"{_SELECT_CHANGES} WHERE id = ?", (change_id,)).fetchone()
+        return list(row) if row else None
+
+    def _reconcile(self, conn):
+        """نقل السجلات المؤرشفة التي لم تعد في تاريخ القاعدة (بعد استرجاع نسخة)"""
+        state = self._current_state()
+        if state['last'] is None or self._live_entry(conn, state['last_id']) == state['last']:
+            return
+
+        # آخر سجل يتفق فيه الأرشيف مع القاعدة
+        live_max = conn.execute("SELECT COALESCE(MAX(id), 0) FROM row_changes").fetchone()[0]
+        fork = 0
+        for segment in reversed(self.segments()):
+            for entry in reversed(self._read_lines(self._segment_path(segment))):
+                if entry[0] <= live_max and self._live_entry(conn, entry[0]) == entry:
+                    fork = entry[0]
+                    break
+            if fork:
+                break
+
+        now = datetime.now()
+        target_dir = os.path.join(self.root, ABANDONED_DIR, now.strftime('%Y%m%d_%H%M%S_%f'))
+        os.makedirs(target_dir)
+        first = None
+        for segment in reversed(self.segments()):
+            path = self._segment_path(segment)
+            if self.first_id(segment) > fork:
+                first = self._read_lines(path)[:1] or first
+                shutil.move(path, os.path.join(target_dir, segment))
+                continue
+            entries = self._read_lines(path)
+            abandoned = [entry for entry in entries if entry[0] > fork]
+            if abandoned:
+                first = abandoned[:1]
+                with open(os.path.join(target_dir, f"{abandoned[0][0]:012d}{SEGMENT_SUFFIX}"),
+                          'w', encoding='utf-8', newline='\n') as f:
+                    f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in abandoned)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+                    f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries
+                                 if entry[0] <= fork)
+                os.replace(temp_path, path)
+            break
+
+        # الفرع كان تاريخ القاعدة من أول تغيير فيه حتى الآن (لحظة الاسترجاع تقريباً)
+        with open(os.path.join(target_dir, BRANCH_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'fork': fork,
+                'first_changed_at': first[0][6],
+                'abandoned_at': to_journal_time(now)
+            }, f)
+        print(f"Change journal diverged after change {fork}, moved later entries to {target_dir}")
+        self._load_state()
+
+    def prune(self, oldest_id):
+        """
+        حذف الملفات التي لا تلزم أي نسخة أساسية
+
+        Args:
+            oldest_id (int): أصغر موضع سجل لنسخة احتياطية محتفظ بها
+
+        Returns:
+            int: عدد الملفات المحذوفة
+        """
+        segments = self.segments()
+        removed = 0
+        # الملف يُحذف إذا كانت كل سجلاته حتى oldest_id (والملف الأخير لا يُحذف)
+        for segment, following in zip(segments, segments[1:]):
+            if self.first_id(following) - 1 > oldest_id:
+                break
+            os.remove(self._segment_path(segment))
+            removed += 1
+        return removed
+
+
+def _live_tail(db_path, anchor, until):
+    """
+    سجلات القاعدة الحية بعد آخر سجل متاح (ما لم يُؤرشف بعد)
+
+    تُستخدم فقط إذا كانت القاعدة على نفس التاريخ: سجلها بمعرف anchor يطابقه.
+    """
+    if not db_path or not os.path.exists(db_path):
+        return []
+    conn = _connect_readonly(db_path)
+    try:
+        if not _has_journal(conn):
+            return []
+        after_id = anchor[0] if anchor else 0
+        if anchor and ChangeJournal._live_entry(conn, after_id) != anchor:
+            return []
+        return [
+            list(row) for row in conn.execute(
+                f"{_SELECT_CHANGES} WHERE id > ? AND changed_at <= ? ORDER BY id", (after_id, until)
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def replay(conn, entries, batch_size=10000):
+    """
+    إعادة تطبيق سجلات التغيير على قاعدة بيانات في معاملة واحدة
+
+    مشغلات التسجيل تُحذف أثناء التطبيق وتُنسخ السجلات نفسها إلى row_changes
+    (بمعرفاتها وأوقاتها)، فتطابق القاعدة الناتجة الأصل. المشغلات الأخرى
+    (المجاميع المالية) تعمل كالمعتاد. السجلات يجب أن تكون متتالية.
+
+    Args:
+        conn (sqlite3.Connection): اتصال بلا معاملة ضمنية (isolation_level=None)
+        entries (iterable): سجلات بأعمدة JOURNAL_COLUMNS
+        batch_size (int): عدد سجلات row_changes المكتوبة دفعة واحدة
+
+    Returns:
+        int: عدد السجلات المطبقة
+    """
+    expected = conn.execute("SELECT COALESCE(MAX(id), 0) FROM row_changes").fetchone()[0] + 1
+    columns = {}
+    for table in CAPTURED_TABLES:
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        # الأعمدة الغائبة من سجل الإضافة كانت NULL، إلا أعمدة NOT NULL التي
+        # أُضيفت بعد السجل (تأخذ قيمتها الافتراضية)
+        columns[table] = ({row[1] for row in info}, [row[1] for row in info if not row[3]])
+    statements = {}
+    pending = []
+    applied = 0
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in CAPTURED_TABLES:
+            for operation in ('insert', 'update', 'delete'):
+                conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_capture_{operation}")
+
+        for entry in entries:
+            change_id, table, row_id, operation, changes = entry[:5]
+            if change_id != expected:
+                raise ValueError(f"سجل التغييرات ناقص: المتوقع {expected} ووُجد {change_id}")
+            if table not in columns:
+                raise ValueError(f"الجدول {table} لا تُسجل تغييراته")
+            known, nullable = columns[table]
+            values = json.loads(changes)
+            if not known.issuperset(values):
+                raise ValueError(f"أعمدة غير معروفة في {table}: {sorted(set(values) - known)}")
+
+            if operation == 'INSERT':
+                row = {column: None for column in nullable}
+                row.update(values)
+                names = tuple(row)
+                key = (table, operation, names)
+                if key not in statements:
+                    statements[key] = (f"INSERT INTO {table} ({', '.join(names)}) "
+                                       f"VALUES ({', '.join('?' for _ in names)})")
+                params = tuple(row.values())
+            elif operation == 'UPDATE':
+                names = tuple(values)
+                key = (table, operation, names)
+                if key not in statements:
+                    statements[key] = (f"UPDATE {table} SET {', '.join(f'{name} = ?' for name in names)} "
+                                       f"WHERE id = ?")
+                old_id = values['id'][0] if 'id' in values else row_id
+                params = tuple(pair[1] for pair in values.values()) + (old_id,)
+            elif operation == 'DELETE':
+                key = (table, operation)
+                if key not in statements:
+                    statements[key] = f"DELETE FROM {table} WHERE id = ?"
+                params = (row_id,)
+            else:
+                raise ValueError(f"عملية غير معروفة: {operation}")
+
+            conn.execute(statements[key], params)
+            pending.append(entry)
+            if len(pending) >= batch_size:
+                conn.executemany(_INSERT_CHANGES, pending)
+                pending = []
+            expected += 1
+            applied += 1
+
+        if pending:
+            conn.executemany(_INSERT_CHANGES, pending)
+        for table in CAPTURED_TABLES:
+            create_change_triggers(conn, table)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return applied
+
+
+def recover(moment, output_path, backup_dir=BACKUP_DIR, db_path=DB_PATH):
+    """
+    بناء قاعدة البيانات كما كانت في لحظة محددة
+
+    تُجرب النسخ الاحتياطية من الأحدث للأقدم: أول نسخة أُخذت قبل اللحظة
+    وعلى نفس تاريخ الأرشيف تُعاد تجميعها في ملف مؤقت، ثم تُطبق عليها
+    التغييرات المؤرشفة (وما لم يُؤرشف بعد من القاعدة الحية) حتى اللحظة،
+    ويُفحص الناتج قبل نقله إلى output_path.
+
+    Args:
+        moment (datetime): اللحظة المطلوبة (وقت محلي)
+        output_path (str): ملف الناتج
+        backup_dir (str): مجلد النسخ الاحتياطية
+        db_path (str): القاعدة الحية (مصدر آخر التغييرات، اختيارية)
+
+    Returns:
+        dict: {base, replayed, last_change, seconds}
+    """
+    start = time.perf_counter()
+    until = to_journal_time(moment)
+    journal = ChangeJournal(backup_dir)
+    chunk_store = ChunkStore(backup_dir)
+    temp_path = f"{output_path}.pitr.tmp"
+    # لحظة سبقت استرجاع نسخة أقدم: تغييراتها في التاريخ المتروك
+    branch = journal.branch_at(until)
+
+    for backup in BackupCatalog(backup_dir).list():
+        if not backup['db_file'] or backup['verify_status'] == VERIFY_FAILED:
+            continue
+        if datetime.strptime(backup['timestamp'], '%Y%m%d_%H%M%S') > moment:
+            continue
+        try:
+            source = os.path.join(backup_dir, backup['db_file'])
+            if backup['db_format'] == 'chunks':
+                chunk_store.restore(source, temp_path)
+            else:
+                shutil.copy2(source, temp_path)
+
+            conn = sqlite3.connect(temp_path, isolation_level=None)
+            try:
+                apply_migrations(conn)
+                base = conn.execute(f"{_SELECT_CHANGES} ORDER BY id DESC LIMIT 1").fetchone()
+                base = list(base) if base else None
+                # لقطة أُخذت بعد اللحظة (الطابع الزمني يسبق اللقطة بقليل)
+                # أو نسخة من تاريخ تُرك بعد استرجاع أقدم
+                if base and (base[6] > until or journal.get(base[0], branch) not in (None, base)):
+                    continue
+                entries = list(journal.entries(base[0] if base else 0, until, branch))
+                anchor = entries[-1] if entries else base
+                if branch is None and (anchor[0] if anchor else 0) >= journal.last_id:
+                    # الأرشيف انتهى قبل اللحظة: الباقي من القاعدة الحية
+                    entries.extend(_live_tail(db_path, anchor, until))
+                replayed = replay(conn, entries)
+            finally:
+                conn.close()
+
+            problems, _, _ = check_database_file(temp_path)
+            if problems:
+                raise ValueError("\n".join(problems))
+            os.replace(temp_path, output_path)
+            return {
+                'base': backup['timestamp'],
+                'replayed': replayed,
+                'last_change': entries[-1][6] if entries else (base[6] if base else None),
+                'seconds': round(time.perf_counter() - start, 3)
+            }
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    raise ValueError("لا توجد نسخة احتياطية صالحة قبل هذه اللحظة")
+
+
+def main():
+    """الاسترجاع إلى لحظة محددة من سطر الأوامر"""
+    parser = argparse.ArgumentParser(description="بناء قاعدة البيانات كما كانت في لحظة محددة")
+    parser.add_argument('moment', help="اللحظة بالوقت المحلي (YYYY-mm-dd HH:MM[:SS])")
+    parser.add_argument('--output', help="ملف الناتج (افتراضياً بجوار aboraaya.db)")
+    parser.add_argument('--replace', action='store_true',
+                        help="استبدال محتوى aboraaya.db بالناتج (أغلق البرنامج أولاً)")
+    parser.add_argument('--backup-dir', default=BACKUP_DIR, help="مجلد النسخ الاحتياطية")
+    parser.add_argument('--db', default=DB_PATH, help="قاعدة البيانات الحية")
+    args = parser.parse_args()
+
+    moment = parse_moment(args.moment)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(args.db)), f"aboraaya_{moment.strftime('%Y%m%d_%H%M%S')}.db"
+    )
+    try:
+        result = recover(moment, output, args.backup_dir, args.db)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"فشل الاسترجاع: {str(e)}")
+        return 1
+    print(f"النسخة الأساسية: {result['base']}، التغييرات المطبقة: {result['replayed']:,}، "
+          f"آخر تغيير (UTC): {result['last_change']}، المدة: {result['seconds']} ثانية")
+
+    if args.replace:
+        # واجهة النسخ في SQLite تكتب المحتوى في معاملة واحدة (لا إعادة تسمية فوق ملف مفتوح)
+        source = _connect_readonly(output)
+        target = sqlite3.connect(args.db)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        os.remove(output)
+        print(f"تم استبدال {args.db}")
+    else:
+        print(f"تم حفظ القاعدة في: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
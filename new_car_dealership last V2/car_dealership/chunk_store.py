@@ -0,0 +1,192 @@
+import os
+import json
+import zlib
+import hashlib
+from datetime import datetime
+
+# حجم القطعة: 16 صفحة من صفحات SQLite (4 KB). SQLite تعدل الصفحات في
+# مكانها ولا تزيح ما بعدها، فالتقسيم الثابت المحاذي للصفحات يكفي لتتطابق
+# القطع التي لم تتغير بين نسختين
+CHUNK_SIZE = 64 * 1024
+MANIFEST_SUFFIX = '_database.manifest.json'
+MANIFEST_VERSION = 1
+
+
+class ChunkStore:
+    """
+    تخزين نسخ قاعدة البيانات كقطع مميزة بالبصمة (sha256)
+
+    كل قطعة فريدة تُحفظ مرة واحدة (مضغوطة) في backups/chunks، وكل نسخة
+    احتياطية هي ملف manifest يسرد بصمات قطعها بالترتيب. النسخة الجديدة لا
+    تكتب إلا القطع التي تغيرت منذ النسخ السابقة، والاسترجاع يعيد تجميع
+    الملف من القطع ويتحقق من بصمته الكاملة.
+    """
+
+    def __init__(self, backup_dir, chunk_size=CHUNK_SIZE):
+        self.backup_dir = backup_dir
+        self.chunks_dir = os.path.join(backup_dir, 'chunks')
+        self.chunk_size = chunk_size
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+    def chunk_path(self, digest):
+        """مسار القطعة (مجلد فرعي بأول حرفين لتجنب المجلدات الضخمة)"""
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def put(self, data):
+        """
+        حفظ قطعة إن لم تكن موجودة
+
+        Returns:
+            tuple: (البصمة، عدد البايتات المكتوبة فعلاً)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, 1)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(packed)
+        os.replace(temp_path, path)
+        return digest, len(packed)
+
+    def get(self, digest):
+        """قراءة قطعة والتحقق من بصمتها"""
+        with open(self.chunk_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"القطعة {digest} تالفة")
+        return data
+
+    def store(self, source_path, manifest_path):
+        """
+        تقسيم ملف إلى قطع وكتابة manifest النسخة
+
+        الـ manifest يُكتب آخراً (ملف مؤقت ثم إعادة تسمية): نسخة بلا
+        manifest مكتمل لا وجود لها، وقطعها اليتيمة يحذفها gc.
+
+        Args:
+            source_path (str): لقطة قاعدة البيانات
+            manifest_path (str): ملف الـ manifest
+
+        Returns:
+            dict: {size, sha256, chunks, new_chunks, new_bytes}
+        """
+        file_hash = hashlib.sha256()
+        chunks = []
+        new_chunks = 0
+        new_bytes = 0
+        size = 0
+        with open(source_path, 'rb') as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                size += len(data)
+                file_hash.update(data)
+                digest, written = self.put(data)
+                chunks.append(digest)
+                if written:
+                    new_chunks += 1
+                    new_bytes += written
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'size': size,
+            'sha256': file_hash.hexdigest(),
+            'chunk_size': self.chunk_size,
+            'new_chunks': new_chunks,
+            'new_bytes': new_bytes,
+            'chunks': chunks
+        }
+        temp_path = f"{manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, manifest_path)
+
+        return {
+            'size': size,
+            'sha256': manifest['sha256'],
+            'chunks': len(chunks),
+            'new_chunks': new_chunks,
+            'new_bytes': new_bytes
+        }
+
+    @staticmethod
+    def load_manifest(manifest_path):
+        """قراءة manifest نسخة"""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"إصدار manifest غير مدعوم: {manifest.get('version')}")
+        return manifest
+
+    def restore(self, manifest_path, target_path):
+        """
+        إعادة تجميع ملف قاعدة البيانات من قطعه
+
+        الملف يُجمع في ملف مؤقت ويُنقل إلى target_path فقط إذا طابقت بصمته
+        البصمة المسجلة في الـ manifest.
+
+        Returns:
+            int: حجم الملف المسترجع
+        """
+        manifest = self.load_manifest(manifest_path)
+        file_hash = hashlib.sha256()
+        temp_path = f"{target_path}.restore.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                for digest in manifest['chunks']:
+                    data = self.get(digest)
+                    file_hash.update(data)
+                    f.write(data)
+            if file_hash.hexdigest() != manifest['sha256']:
+                raise ValueError("بصمة الملف المسترجع لا تطابق النسخة")
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, target_path)
+        return manifest['size']
+
+    def manifests(self):
+        """مسارات كل ملفات الـ manifest في مجلد النسخ"""
+        return [
+            os.path.join(self.backup_dir, name)
+            for name in os.listdir(self.backup_dir)
+            if name.endswith(MANIFEST_SUFFIX)
+        ]
+
+    def gc(self):
+        """
+        حذف القطع التي لا يشير إليها أي manifest
+
+        لا تُستدعى أثناء نسخ جارٍ: قطع النسخة الجارية لم تُسجل بعد في manifest.
+
+        Returns:
+            tuple: (عدد القطع المحذوفة، البايتات المحررة)
+        """
+        referenced = set()
+        for manifest_path in self.manifests():
+            referenced.update(self.load_manifest(manifest_path)['chunks'])
+
+        removed = 0
+        freed = 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name in referenced:
+                    continue
+                path = os.path.join(prefix_dir, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+        return removed, freed
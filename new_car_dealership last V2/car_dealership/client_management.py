@@ -146,12 +146,12 @@ class ClientManagement(QWidget):
         
         try:
             if self.selected_client_id:  # تعديل عميل موجود
-                self.database.cursor.execute("""
-                    UPDATE clients 
-                    SET name = ?, phone = ?, address = ?, status = ?
-                    WHERE id = ?
-                """, (*client_data, self.selected_client_id))
-                self.database.conn.commit()
+                with self.database.transaction():
+                    self.database.cursor.execute("""
+                        UPDATE clients 
+                        SET name = ?, phone = ?, address = ?, status = ?
+                        WHERE id = ?
+                    """, (*client_data, self.selected_client_id))
                 UIHelper.show_success(self, "نجاح", "تم تحديث بيانات العميل بنجاح")
             else:  # إضافة عميل جديد
                 if not self.user_id or not self.username:
@@ -214,11 +214,11 @@ class ClientManagement(QWidget):
         
         if UIHelper.confirm_action(self, "تأكيد", "هل أنت متأكد من حذف هذا العميل؟"):
             try:
-                self.database.cursor.execute(
-                    "DELETE FROM clients WHERE id = ?",
-                    (self.selected_client_id,)
-                )
-                self.database.conn.commit()
+                with self.database.transaction():
+                    self.database.cursor.execute(
+                        "DELETE FROM clients WHERE id = ?",
+                        (self.selected_client_id,)
+                    )
                 self.load_clients()
                 self.clear_fields()
                 UIHelper.show_success(self, "نجاح", "تم حذف العميل بنجاح")
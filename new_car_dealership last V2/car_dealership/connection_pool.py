@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class ConnectionPool:
+    """مجمع اتصالات SQLite: اتصال كتابة واتصال قراءة مستقل لكل خيط"""
+
+    def __init__(self, db_path, busy_timeout=5000, factory=sqlite3.Connection, on_connect=None):
+        """
+        تهيئة المجمع
+
+        Args:
+            db_path (str): مسار ملف قاعدة البيانات
+            busy_timeout (int): مدة انتظار القفل بالمللي ثانية قبل رفع "database is locked"
+            factory (type): صنف الاتصال المستخدم (مثل الاتصال المقاس للتوقيتات)
+            on_connect (callable): تُستدعى بكل اتصال جديد (تسجيل دوال SQL)
+        """
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.factory = factory
+        self.on_connect = on_connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+
+    def _open(self, readonly):
+        """فتح اتصال جديد مع إعدادات WAL"""
+        if readonly:
+            # اتصال للقراءة فقط لا يمكنه أخذ قفل الكتابة
+            uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro"
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                timeout=self.busy_timeout / 1000,
+                check_same_thread=False,
+                factory=self.factory
+            )
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            # المعاملات تُدار صراحة عبر Database.transaction
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout / 1000,
+                isolation_level=None,
+                check_same_thread=False,
+                factory=self.factory
+            )
+            # وضع WAL يسمح للقراء بالعمل بالتوازي مع الكاتب
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        # القراءة أيضاً: تحضير UPDATE/DELETE (EXPLAIN مثلاً) يترجم المشغلات ودوالها
+        if self.on_connect:
+            self.on_connect(conn)
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _slot(self, readonly):
+        """الحصول على خانة الاتصال الخاصة بالخيط الحالي"""
+        name = 'reader' if readonly else 'writer'
+        slot = getattr(self._local, name, None)
+        if slot is None or slot['generation'] != self._generation:
+            if slot is not None:
+                # اتصال قديم (بعد recycle) يغلقه الخيط المالك له فقط
+                self._discard(slot['conn'])
+            conn = self._open(readonly)
+            slot = {
+                'generation': self._generation,
+                'conn': conn,
+                'cursor': conn.cursor()
+            }
+            setattr(self._local, name, slot)
+        return slot
+
+    def get_connection(self, readonly=False):
+        """اتصال الخيط الحالي (كتابة افتراضياً، أو قراءة فقط)"""
+        return self._slot(readonly)['conn']
+
+    def get_cursor(self):
+        """المؤشر المشترك لاتصال الكتابة في الخيط الحالي"""
+        return self._slot(False)['cursor']
+
+    def reset_current(self):
+        """إعادة فتح اتصالات الخيط الحالي فقط"""
+        for name in ('writer', 'reader'):
+            slot = getattr(self._local, name, None)
+            if slot is not None:
+                self._discard(slot['conn'])
+                setattr(self._local, name, None)
+
+    def _discard(self, conn):
+        """إغلاق اتصال وإزالته من القائمة"""
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """إغلاق جميع الاتصالات في كل الخيوط"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            # أي خيط يطلب اتصالاً بعد ذلك سيحصل على اتصال جديد
+            self._generation += 1
+
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def recycle(self):
+        """
+        تجديد اتصالات كل الخيوط دون إغلاقها من خارجها
+
+        كل خيط يغلق اتصاله القديم ويفتح اتصالاً جديداً عند طلبه التالي،
+        فلا يُغلق اتصال يستخدمه خيط آخر أثناء استعلام جارٍ.
+        """
+        with self._lock:
+            self._generation += 1
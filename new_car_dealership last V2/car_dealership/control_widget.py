@@ -5,6 +5,7 @@ from PyQt6.QtGui import QFont
 from .user_management import UserManagementDialog
 from .log_viewer import LogViewerDialog
 from .backup_manager import BackupManagerDialog
+from .query_stats_viewer import QueryStatsDialog
 from .utils import UIHelper
 from .audit_log import audit_logger
 
@@ -92,6 +93,24 @@ class ControlWidget(QWidget):
                 }
             """)
             layout.addWidget(backup_button)
+            
+            # أداء الاستعلامات (للمدير فقط)
+            stats_button = QPushButton("أداء الاستعلامات")
+            stats_button.clicked.connect(self.show_query_stats)
+            stats_button.setStyleSheet("""
+                QPushButton {
+                    background-color: #6c757d;
+                    color: white;
+                    border: none;
+                    padding: 10px;
+                    border-radius: 5px;
+                    margin: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #5a6268;
+                }
+            """)
+            layout.addWidget(stats_button)
         
         layout.addStretch()
         self.setLayout(layout)
@@ -110,3 +129,8 @@ class ControlWidget(QWidget):
         """عرض نافذة إدارة النسخ الاحتياطي"""
         dialog = BackupManagerDialog(self.database, self.user_id, self.username)
         dialog.exec()
+
+    def show_query_stats(self):
+        """عرض نافذة إحصائيات الاستعلامات"""
+        dialog = QueryStatsDialog(self.database, self.user_id, self.username)
+        dialog.exec()
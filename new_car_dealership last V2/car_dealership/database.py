@@ -1,13 +1,19 @@
 import sqlite3
 import os
-import shutil
+import time
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from .security import Security
 from .audit_log import audit_logger
+from .connection_pool import ConnectionPool
+from .query_stats import InstrumentedConnection, query_stats
+from .migrations import apply_migrations, register_change_user
+from .db_backup import online_backup
 
 class Database:
-    def __init__(self, db_name="aboraaya.db"):
+    def __init__(self, db_name="aboraaya.db", busy_timeout=5000, slow_query_ms=200):
         """تهيئة قاعدة البيانات"""
         # تحديد مسار قاعدة البيانات
         self.db_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,9 +25,21 @@ class Database:
         os.makedirs(self.contracts_dir, exist_ok=True)
         os.makedirs(self.backups_dir, exist_ok=True)
         
-        # تهيئة متغيرات الاتصال
-        self.conn = None
-        self.cursor = None
+        # تهيئة مجمع الاتصالات
+        self.busy_timeout = busy_timeout
+        self.pool = None
+        
+        # كل استعلام يُقاس، وما يتجاوز الحد يُكتب في سجل الاستعلامات البطيئة
+        query_stats.configure(slow_threshold_ms=slow_query_ms)
+        
+        # حالة المعاملات الجارية لكل خيط (مكدس نقاط الحفظ)
+        self._tx_local = threading.local()
+        
+        # إجراءات تُستدعى بعد استبدال ملف قاعدة البيانات (إعادة تحميل الصفحات)
+        self._reload_listeners = []
+        
+        # المستخدم الذي تُنسب إليه تغييرات الصفوف (خاص بهذه النسخة من البرنامج)
+        self.change_user_id = None
         
         # الاتصال بقاعدة البيانات
         db_exists = os.path.exists(self.db_path)
@@ -35,150 +53,171 @@ class Database:
             self.create_default_users()
 
     def connect(self):
-        """إنشاء اتصال جديد بقاعدة البيانات"""
+        """إنشاء مجمع الاتصالات بقاعدة البيانات"""
         try:
-            if self.conn is None or self.cursor is None:
-                self.conn = sqlite3.connect(self.db_path)
-                self.cursor = self.conn.cursor()
+            if self.pool is None:
+                self.pool = ConnectionPool(
+                    self.db_path,
+                    self.busy_timeout,
+                    factory=InstrumentedConnection,
+                    on_connect=lambda conn: register_change_user(conn, lambda: self.change_user_id)
+                )
+                # فتح اتصال الكتابة مبكراً لتفعيل وضع WAL
+                self.pool.get_connection()
         except Exception as e:
             print(f"Error connecting to database: {str(e)}")
             raise
 
+    @property
+    def conn(self):
+        """اتصال الكتابة الخاص بالخيط الحالي"""
+        self.connect()
+        return self.pool.get_connection()
+
+    @property
+    def cursor(self):
+        """مؤشر اتصال الكتابة الخاص بالخيط الحالي"""
+        self.connect()
+        return self.pool.get_cursor()
+
+    def read_connection(self):
+        """اتصال قراءة فقط للخيط الحالي (للتقارير والتصدير والنسخ الاحتياطي)"""
+        self.connect()
+        return self.pool.get_connection(readonly=True)
+
+    def read_cursor(self):
+        """مؤشر جديد على اتصال القراءة الخاص بالخيط الحالي"""
+        return self.read_connection().cursor()
+
+    def _transaction_stack(self):
+        """مكدس المعاملات المفتوحة في الخيط الحالي"""
+        stack = getattr(self._tx_local, 'stack', None)
+        if stack is None:
+            stack = self._tx_local.stack = []
+        return stack
+
+    def in_transaction(self):
+        """هل توجد معاملة مفتوحة في الخيط الحالي"""
+        return bool(self._transaction_stack())
+
+    @contextmanager
+    def transaction(self):
+        """
+        وحدة عمل ذرية: المعاملة الخارجية تبدأ بـ BEGIN IMMEDIATE وتنتهي بـ COMMIT واحد،
+        والمعاملات المتداخلة تستخدم نقاط حفظ (SAVEPOINT) يمكن التراجع عنها وحدها
+        """
+        conn = self.conn
+        stack = self._transaction_stack()
+        depth = len(stack)
+        savepoint = f"sp_{depth}"
+
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        stack.append([])
+
+        try:
+            yield conn
+        except BaseException:
+            stack.pop()
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+
+        callbacks = stack.pop()
+        if depth > 0:
+            conn.execute(f"RELEASE {savepoint}")
+            # تنفيذ الإجراءات مؤجل حتى تنجح المعاملة الخارجية
+            stack[-1].extend(callbacks)
+            return
+
+        try:
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in commit callback: {str(e)}")
+
+    def on_commit(self, callback):
+        """تنفيذ إجراء (مثل تسجيل حدث) بعد نجاح المعاملة الحالية فقط"""
+        stack = self._transaction_stack()
+        if stack:
+            stack[-1].append(callback)
+        else:
+            callback()
+
     def ensure_connection(self):
         """التأكد من وجود اتصال نشط بقاعدة البيانات"""
         try:
             # محاولة تنفيذ استعلام بسيط للتحقق من الاتصال
             self.cursor.execute("SELECT 1")
         except (sqlite3.OperationalError, sqlite3.ProgrammingError, AttributeError):
-            # إعادة الاتصال إذا كان مغلقاً
-            self.connect()
+            # إعادة فتح اتصالات الخيط الحالي إذا كانت مغلقة
+            self.pool.reset_current()
+
+    def add_reload_listener(self, callback):
+        """تسجيل إجراء يُستدعى بعد استبدال قاعدة البيانات (مثل إعادة تحميل صفحة)"""
+        self._reload_listeners.append(callback)
+
+    def replace_database(self, source_path):
+        """
+        استبدال محتوى قاعدة البيانات الحية بملف آخر (نسخة مسترجعة) دون إعادة تشغيل البرنامج
+        
+        الصفحات تُنسخ بواجهة النسخ في SQLite داخل معاملة كتابة واحدة على
+        aboraaya.db نفسها: القراء يرون القاعدة القديمة كاملة ثم الجديدة كاملة،
+        ولا يُغلق اتصال خيط آخر أثناء استعلامه (ولا يمكن على Windows إعادة
+        تسمية ملف مفتوح). بعدها تُجدد اتصالات المجمع ويُرقى المخطط ويُطلب من
+        الصفحات المسجلة إعادة التحميل.
+        
+        Args:
+            source_path (str): الملف الجديد (تم التحقق منه)
+        
+        Returns:
+            float: مدة توقف الكتابة على القاعدة بالثواني (مدة النسخ)
+        """
+        if self.in_transaction():
+            raise RuntimeError("لا يمكن استبدال قاعدة البيانات أثناء معاملة مفتوحة")
+        source = sqlite3.connect(f"{Path(source_path).absolute().as_uri()}?mode=ro", uri=True)
+        try:
+            start = time.perf_counter()
+            source.backup(self.conn)
+            downtime = time.perf_counter() - start
+        finally:
+            source.close()
+        
+        self.pool.recycle()
+        # نسخة أقدم من المخطط الحالي تُرقى كما عند بدء البرنامج
+        self.create_tables()
+        
+        for callback in self._reload_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in reload listener: {str(e)}")
+        return downtime
+
+    def set_change_user(self, user_id):
+        """
+        المستخدم الذي تُنسب إليه التغييرات التالية (None عند الخروج)
+
+        يُقرأ عبر current_user_id() في كل اتصال كتابة من المجمع، فلا يُحفظ في
+        ملف القاعدة ولا يتأثر باستبدالها
+        """
+        self.change_user_id = user_id
 
     def create_tables(self):
-        """إنشاء جداول قاعدة البيانات"""
-        self.cursor.executescript("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL,
-                last_login TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                active INTEGER DEFAULT 1
-            );
-
-            CREATE TABLE IF NOT EXISTS clients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL UNIQUE,
-                address TEXT NOT NULL,
-                status TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS cars (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                year INTEGER NOT NULL,
-                chassis TEXT NOT NULL UNIQUE,
-                engine TEXT NOT NULL UNIQUE,
-                condition TEXT NOT NULL,
-                transaction_type TEXT NOT NULL,
-                price REAL NOT NULL,
-                purchase_date TEXT NOT NULL,
-                license_expiry TEXT NOT NULL,
-                contract_filename TEXT,
-                contract_upload_date TEXT,
-                client_name TEXT NOT NULL,
-                client_phone TEXT NOT NULL,
-                client_address TEXT NOT NULL,
-                client_status TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                name TEXT NOT NULL,
-                date TEXT NOT NULL,
-                amount REAL NOT NULL,
-                related_to_car INTEGER DEFAULT 0,
-                car_engine TEXT,
-                FOREIGN KEY(car_engine) REFERENCES cars(engine)
-            );
-
-            -- جداول النظام المالي
-            CREATE TABLE IF NOT EXISTS financial_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                entry_type TEXT NOT NULL,  -- إيراد/مصروف
-                category TEXT NOT NULL,     -- فئة الإيراد/المصروف
-                date TEXT NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                created_by INTEGER,
-                FOREIGN KEY(created_by) REFERENCES users(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS installments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                car_id INTEGER NOT NULL,
-                client_id INTEGER NOT NULL,
-                total_amount REAL NOT NULL,    -- إجمالي مبلغ التقسيط
-                paid_amount REAL DEFAULT 0,    -- المبلغ المدفوع
-                remaining_amount REAL,         -- المبلغ المتبقي
-                installment_count INTEGER,     -- عدد الأقساط
-                start_date TEXT NOT NULL,      -- تاريخ بداية التقسيط
-                next_payment_date TEXT,        -- تاريخ القسط القادم
-                status TEXT NOT NULL,          -- حالة التقسيط (جاري، منتهي، متأخر)
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                created_by INTEGER,
-                FOREIGN KEY(car_id) REFERENCES cars(id),
-                FOREIGN KEY(client_id) REFERENCES clients(id),
-                FOREIGN KEY(created_by) REFERENCES users(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS installment_payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                installment_id INTEGER NOT NULL,
-                payment_date TEXT NOT NULL,
-                amount REAL NOT NULL,
-                payment_method TEXT NOT NULL,  -- نقدي، شيك، تحويل بنكي
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                created_by INTEGER,
-                FOREIGN KEY(installment_id) REFERENCES installments(id),
-                FOREIGN KEY(created_by) REFERENCES users(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS invoices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                invoice_number TEXT UNIQUE NOT NULL,  -- رقم الفاتورة المميز
-                car_id INTEGER NOT NULL,
-                client_id INTEGER NOT NULL,
-                invoice_date TEXT NOT NULL,
-                total_amount REAL NOT NULL,
-                payment_method TEXT NOT NULL,  -- نقدي، تقسيط
-                payment_status TEXT NOT NULL,  -- مدفوع، غير مدفوع، تقسيط
-                notes TEXT,
-                file_path TEXT,               -- مسار ملف الفاتورة PDF
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                created_by INTEGER,
-                FOREIGN KEY(car_id) REFERENCES cars(id),
-                FOREIGN KEY(client_id) REFERENCES clients(id),
-                FOREIGN KEY(created_by) REFERENCES users(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS invoice_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                invoice_id INTEGER NOT NULL,
-                description TEXT NOT NULL,
-                quantity INTEGER NOT NULL DEFAULT 1,
-                unit_price REAL NOT NULL,
-                total_price REAL NOT NULL,
-                FOREIGN KEY(invoice_id) REFERENCES invoices(id)
-            );
-        """)
-        self.conn.commit()
+        """إنشاء جداول قاعدة البيانات وترقية المخطط إلى أحدث إصدار"""
+        # تطبيق ترحيلات المخطط حسب PRAGMA user_version
+        apply_migrations(self.conn)
 
     def create_default_users(self):
         """إنشاء المستخدمين الافتراضيين"""
@@ -188,14 +227,13 @@ class Database:
             ('accountant', 'accountant123', 'محاسب')
         ]
         
-        for username, password, role in default_users:
-            hashed_password = Security.hash_password(password)
-            self.cursor.execute("""
-                INSERT OR IGNORE INTO users (username, password, role, active)
-                VALUES (?, ?, ?, 1)
-            """, (username, hashed_password, role))
-        
-        self.conn.commit()
+        with self.transaction():
+            for username, password, role in default_users:
+                hashed_password = Security.hash_password(password)
+                self.cursor.execute("""
+                    INSERT OR IGNORE INTO users (username, password, role, active)
+                    VALUES (?, ?, ?, 1)
+                """, (username, hashed_password, role))
 
     def verify_login(self, username, password):
         """التحقق من صحة بيانات تسجيل الدخول"""
@@ -214,12 +252,16 @@ class Database:
             
             if Security.verify_password(password, stored_password):
                 # تحديث آخر تسجيل دخول
-                self.cursor.execute("""
-                    UPDATE users 
-                    SET last_login = CURRENT_TIMESTAMP 
-                    WHERE id = ?
-                """, (user_id,))
-                self.conn.commit()
+                with self.transaction():
+                    self.cursor.execute("""
+                        UPDATE users 
+                        SET last_login = CURRENT_TIMESTAMP 
+                        WHERE id = ?
+                    """, (user_id,))
+
+                
+                # التغييرات التي تسجلها المشغلات تُنسب لهذا المستخدم
+                self.set_change_user(user_id)
                 
                 # تسجيل حدث تسجيل الدخول
                 audit_logger.log_event(
@@ -245,8 +287,16 @@ class Database:
             print(f"خطأ في التحقق من تسجيل الدخول: {str(e)}")
             return None
 
-    def create_backup(self):
-        """إنشاء نسخة احتياطية من قاعدة البيانات"""
+    def create_backup(self, progress=None):
+        """
+        إنشاء نسخة احتياطية من قاعدة البيانات
+
+        النسخ على خطوات من لقطة قراءة ثابتة (online_backup): الكتابة في
+        الاتصالات الأخرى تستمر أثناء النسخ. يمكن استدعاؤها من خيط عمل.
+
+        Args:
+            progress (callable): تُستدعى بـ (الصفحات المنسوخة، الإجمالي)
+        """
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_path = os.path.join(
@@ -254,15 +304,7 @@ class Database:
                 f'aboraaya_backup_{timestamp}.db'
             )
             
-            # إغلاق الاتصال مؤقتاً
-            self.conn.close()
-            
-            # نسخ الملف
-            shutil.copy2(self.db_path, backup_path)
-            
-            # إعادة فتح الاتصال
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
+            online_backup(self.db_path, backup_path, progress=progress)
             
             return True, backup_path
             
@@ -284,28 +326,28 @@ class Database:
             contract_filename = car_data[10]
             contract_upload_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S') if contract_filename else None
 
-            # إنشاء سجل جديد للسيارة
-            self.cursor.execute("""
-                INSERT INTO cars (
-                    brand, model, year, chassis, engine,
-                    condition, transaction_type, price,
-                    purchase_date, license_expiry,
-                    contract_filename, contract_upload_date,
-                    client_name, client_phone, client_address,
-                    client_status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (*car_data[:10], contract_filename, contract_upload_date, *car_data[11:]))
-            
-            car_id = self.cursor.lastrowid
-            self.conn.commit()
-
-            # تسجيل الحدث
-            audit_logger.log_event(
-                user_id=user_id,
-                username=username,
-                event_type="إضافة_سيارة",
-                description=f"تمت إضافة سيارة جديدة: {car_data[0]} {car_data[1]}"
-            )
+            with self.transaction():
+                # إنشاء سجل جديد للسيارة
+                self.cursor.execute("""
+                    INSERT INTO cars (
+                        brand, model, year, chassis, engine,
+                        condition, transaction_type, price,
+                        purchase_date, license_expiry,
+                        contract_filename, contract_upload_date,
+                        client_name, client_phone, client_address,
+                        client_status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (*car_data[:10], contract_filename, contract_upload_date, *car_data[11:]))
+                
+                car_id = self.cursor.lastrowid
+
+                # تسجيل الحدث بعد نجاح المعاملة
+                self.on_commit(lambda: audit_logger.log_event(
+                    user_id=user_id,
+                    username=username,
+                    event_type="إضافة_سيارة",
+                    description=f"تمت إضافة سيارة جديدة: {car_data[0]} {car_data[1]}"
+                ))
             
             return True
             
@@ -318,22 +360,21 @@ class Database:
         try:
             contract_upload_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            self.cursor.execute("""
-                UPDATE cars 
-                SET contract_filename = ?,
-                    contract_upload_date = ?
-                WHERE id = ?
-            """, (contract_filename, contract_upload_date, car_id))
-            
-            self.conn.commit()
-
-            # تسجيل الحدث
-            audit_logger.log_event(
-                user_id=user_id,
-                username=username,
-                event_type="تحديث_عقد",
-                description=f"تم تحديث عقد السيارة رقم {car_id}"
-            )
+            with self.transaction():
+                self.cursor.execute("""
+                    UPDATE cars 
+                    SET contract_filename = ?,
+                        contract_upload_date = ?
+                    WHERE id = ?
+                """, (contract_filename, contract_upload_date, car_id))
+
+                # تسجيل الحدث بعد نجاح المعاملة
+                self.on_commit(lambda: audit_logger.log_event(
+                    user_id=user_id,
+                    username=username,
+                    event_type="تحديث_عقد",
+                    description=f"تم تحديث عقد السيارة رقم {car_id}"
+                ))
             
             return True
         except Exception as e:
@@ -345,37 +386,37 @@ class Database:
         try:
             name, phone, address, status = client_data
             
-            # محاولة تحديث العميل إذا كان موجود
-            self.cursor.execute("""
-                UPDATE clients 
-                SET name = ?, address = ?, status = ?
-                WHERE phone = ?
-            """, (name, address, status, phone))
-            
-            # إذا لم يتم تحديث أي صف (العميل غير موجود)، قم بإضافته
-            if self.cursor.rowcount == 0:
+            with self.transaction():
+                # محاولة تحديث العميل إذا كان موجود
                 self.cursor.execute("""
-                    INSERT INTO clients (name, phone, address, status)
-                    VALUES (?, ?, ?, ?)
-                """, (name, phone, address, status))
+                    UPDATE clients 
+                    SET name = ?, address = ?, status = ?
+                    WHERE phone = ?
+                """, (name, address, status, phone))
                 
-                # تسجيل حدث الإضافة
-                audit_logger.log_event(
-                    user_id=user_id,
-                    username=username,
-                    event_type="إضافة_عميل",
-                    description=f"تمت إضافة عميل جديد: {name}"
-                )
-            else:
-                # تسجيل حدث التحديث
-                audit_logger.log_event(
-                    user_id=user_id,
-                    username=username,
-                    event_type="تحديث_عميل",
-                    description=f"تم تحديث بيانات العميل: {name}"
-                )
+                # إذا لم يتم تحديث أي صف (العميل غير موجود)، قم بإضافته
+                if self.cursor.rowcount == 0:
+                    self.cursor.execute("""
+                        INSERT INTO clients (name, phone, address, status)
+                        VALUES (?, ?, ?, ?)
+                    """, (name, phone, address, status))
+                    
+                    # تسجيل حدث الإضافة
+                    self.on_commit(lambda: audit_logger.log_event(
+                        user_id=user_id,
+                        username=username,
+                        event_type="إضافة_عميل",
+                        description=f"تمت إضافة عميل جديد: {name}"
+                    ))
+                else:
+                    # تسجيل حدث التحديث
+                    self.on_commit(lambda: audit_logger.log_event(
+                        user_id=user_id,
+                        username=username,
+                        event_type="تحديث_عميل",
+                        description=f"تم تحديث بيانات العميل: {name}"
+                    ))
             
-            self.conn.commit()
             return True
             
         except sqlite3.Error as e:
@@ -385,39 +426,38 @@ class Database:
     def add_transaction(self, transaction_data, user_id, username):
         """إضافة معاملة جديدة"""
         try:
-            self.cursor.execute("""
-                INSERT INTO transactions (
-                    type, name, date, amount,
-                    related_to_car, car_engine
-                )
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, transaction_data)
-            
-            transaction_id = self.cursor.lastrowid
-            self.conn.commit()
-
-            # تسجيل الحدث
-            audit_logger.log_event(
-                user_id=user_id,
-                username=username,
-                event_type="إضافة_معاملة",
-                description=f"تمت إضافة معاملة جديدة: {transaction_data[1]}"
-            )
+            with self.transaction():
+                self.cursor.execute("""
+                    INSERT INTO transactions (
+                        type, name, date, amount,
+                        related_to_car, car_engine
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, transaction_data)
+                
+                transaction_id = self.cursor.lastrowid
+
+                # تسجيل الحدث بعد نجاح المعاملة
+                self.on_commit(lambda: audit_logger.log_event(
+                    user_id=user_id,
+                    username=username,
+                    event_type="إضافة_معاملة",
+                    description=f"تمت إضافة معاملة جديدة: {transaction_data[1]}"
+                ))
             
             return True
         except sqlite3.IntegrityError:
             return False
 
     def close(self):
-        """إغلاق الاتصال بقاعدة البيانات"""
-        if self.conn:
+        """إغلاق جميع اتصالات قاعدة البيانات"""
+        if self.pool:
             try:
-                self.conn.close()
+                self.pool.close_all()
             except Exception:
                 pass
             finally:
-                self.conn = None
-                self.cursor = None
+                self.pool = None
 
     def __enter__(self):
         return self
@@ -0,0 +1,139 @@
+import os
+import time
+import sqlite3
+from pathlib import Path
+
+# عدد الصفحات المنسوخة في كل خطوة (4 KB للصفحة: 1024 صفحة = 4 MB تقريباً)
+DEFAULT_STEP_PAGES = 1024
+
+
+class BackupCancelled(Exception):
+    """أُلغي النسخ الاحتياطي قبل اكتماله"""
+
+
+def online_backup(source_path, target_path, pages=DEFAULT_STEP_PAGES, progress=None, cancelled=None):
+    """
+    نسخة متسقة من قاعدة بيانات مفتوحة عبر واجهة النسخ في SQLite
+
+    النسخ يتم على خطوات (pages صفحة لكل خطوة) عبر اتصال قراءة مستقل، مع
+    معاملة قراءة مفتوحة طوال النسخ: في وضع WAL تبقى لقطة البيانات ثابتة
+    والكتّاب في الاتصالات الأخرى يكملون عملهم، ولا يعاد النسخ من البداية
+    كلما كُتب شيء (وهو ما يحدث لواجهة النسخ دون معاملة مفتوحة).
+
+    النسخة تُكتب في ملف مؤقت ثم تُنقل إلى target_path بعد نجاح فحصها،
+    فلا يظهر ملف ناقص عند الانقطاع أو الإلغاء.
+
+    Args:
+        source_path (str): قاعدة البيانات المصدر
+        target_path (str): ملف النسخة
+        pages (int): عدد الصفحات في كل خطوة
+        progress (callable): تُستدعى بـ (الصفحات المنسوخة، إجمالي الصفحات) بعد كل خطوة
+        cancelled (callable): تعيد True لإلغاء النسخ
+
+    Returns:
+        dict: {path, pages, bytes, seconds, steps}
+    """
+    start = time.perf_counter()
+    temp_path = f"{target_path}.tmp"
+    steps = [0, 0]
+
+    def on_step(status, remaining, total):
+        steps[0] += 1
+        steps[1] = total
+        if cancelled and cancelled():
+            raise BackupCancelled("تم إلغاء النسخ الاحتياطي")
+        if progress:
+            progress(total - remaining, total)
+
+    uri = f"{Path(source_path).absolute().as_uri()}?mode=ro"
+    source = sqlite3.connect(uri, uri=True, isolation_level=None)
+    try:
+        # تثبيت لقطة القراءة قبل أول خطوة
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=pages, progress=on_step, sleep=0.05)
+            # النسخة نفسها تعمل بنظام journal عادي: ملف واحد مكتمل
+            target.execute("PRAGMA journal_mode = DELETE")
+            check = target.execute("PRAGMA quick_check").fetchone()[0]
+            if check != 'ok':
+                raise sqlite3.DatabaseError(f"فحص النسخة فشل: {check}")
+        finally:
+            target.close()
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+
+    os.replace(temp_path, target_path)
+    return {
+        'path': target_path,
+        'pages': steps[1],
+        'bytes': os.path.getsize(target_path),
+        'seconds': round(time.perf_counter() - start, 3),
+        'steps': steps[0]
+    }
+
+
+def table_counts(db_path):
+    """
+    عدد الصفوف في كل جدول من جداول قاعدة بيانات (لقطة نسخة أو ملف نسخة كامل)
+
+    Returns:
+        dict: {اسم الجدول: عدد الصفوف}
+    """
+    conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY name
+        """)]
+        return {
+            table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            for table in tables
+        }
+    finally:
+        conn.close()
+
+
+def incremental_backup(source_path, store, manifest_path, pages=DEFAULT_STEP_PAGES, progress=None, cancelled=None,
+                       on_snapshot=None):
+    """
+    نسخة احتياطية مقسمة إلى قطع (ChunkStore): لا يُخزن إلا ما تغير
+
+    اللقطة تُؤخذ بـ online_backup في ملف مؤقت بجوار الـ manifest ثم تُقسم
+    وتُحذف.
+
+    Args:
+        source_path (str): قاعدة البيانات المصدر
+        store (ChunkStore): مخزن القطع
+        manifest_path (str): ملف الـ manifest للنسخة
+        pages, progress, cancelled: كما في online_backup
+        on_snapshot (callable): تُستدعى بمسار اللقطة قبل حذفها، ونتيجتها في result['snapshot']
+
+    Returns:
+        dict: نتيجة online_backup مع {size, sha256, chunks, new_chunks, new_bytes, table_counts}
+              (bytes هنا حجم اللقطة، والمخزن فعلاً new_bytes)
+    """
+    start = time.perf_counter()
+    snapshot_path = f"{manifest_path}.snapshot"
+    try:
+        result = online_backup(source_path, snapshot_path, pages, progress, cancelled)
+        # عدد الصفوف من اللقطة نفسها: يطابق محتوى النسخة تماماً
+        result['table_counts'] = table_counts(snapshot_path)
+        if on_snapshot:
+            result['snapshot'] = on_snapshot(snapshot_path)
+        result.update(store.store(snapshot_path, manifest_path))
+        result['path'] = manifest_path
+    finally:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+from pathlib import Path
+
+# مجلدات الملفات التي تشير إليها قاعدة البيانات (بجوار aboraaya.db)
+SNAPSHOT_TREES = ('contracts', 'invoices')
+FILES_DIR = 'files'
+FILES_MANIFEST = 'files.json'
+
+
+def file_references(db_path):
+    """
+    أسماء الملفات التي تشير إليها قاعدة بيانات (لقطة نسخة عادةً)
+
+    Returns:
+        dict: {'contracts': set, 'invoices': set}
+    """
+    conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        contracts = {
+            row[0] for row in conn.execute(
+                "SELECT contract_filename FROM cars WHERE contract_filename IS NOT NULL AND contract_filename != ''"
+            )
+        }
+        invoices = {
+            row[0] for row in conn.execute(
+                "SELECT file_path FROM invoices WHERE file_path IS NOT NULL AND file_path != ''"
+            )
+        }
+    finally:
+        conn.close()
+    return {'contracts': contracts, 'invoices': invoices}
+
+
+def _copy_with_hash(source, target, block_size=1024 * 1024):
+    """نسخ ملف مع حساب بصمته في نفس القراءة (والإبقاء على وقت التعديل)"""
+    digest = hashlib.sha256()
+    temp_path = f"{target}.tmp"
+    with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+        for block in iter(lambda: src.read(block_size), b''):
+            digest.update(block)
+            dst.write(block)
+    shutil.copystat(source, temp_path)
+    os.replace(temp_path, target)
+    return digest.hexdigest()
+
+
+class FileSnapshots:
+    """
+    لقطات مجلدي العقود والفواتير مع كل نسخة احتياطية (backups/files/{ts})
+
+    كل لقطة شجرة كاملة، لكن الملف الذي لم يتغير (نفس الحجم ووقت التعديل
+    في المصدر) يُربط ربطاً صلباً (hard link) بنسخته في اللقطة السابقة على
+    طريقة rsync --link-dest: اللقطة اليومية لا تكلف إلا الملفات الجديدة أو
+    المعدلة. ملفات اللقطات لا تُعدل أبداً بعد كتابتها، فالربط آمن، وحذف
+    لقطة لا يمس الملفات المرتبطة في غيرها.
+    """
+
+    def __init__(self, backup_dir, source_dir=None):
+        """
+        Args:
+            backup_dir (str): مجلد النسخ الاحتياطية
+            source_dir (str): المجلد الذي يضم contracts/ و invoices/ (لا يلزم للقراءة والحذف)
+        """
+        self.backup_dir = backup_dir
+        self.source_dir = source_dir
+        self.root = os.path.join(backup_dir, FILES_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def snapshot_dir(self, timestamp):
+        return os.path.join(self.root, timestamp)
+
+    def load(self, timestamp):
+        """قراءة manifest لقطة (أو None إذا لم تكتمل)"""
+        try:
+            with open(os.path.join(self.snapshot_dir(timestamp), FILES_MANIFEST), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def timestamps(self):
+        """اللقطات المكتملة من الأقدم للأحدث"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, FILES_MANIFEST))
+        )
+
+    def create(self, timestamp, references=None):
+        """
+        إنشاء لقطة للملفات
+
+        تُؤخذ بعد لقطة قاعدة البيانات: الملف المضاف بعدها يظهر زائداً
+        (لا ضرر منه)، وما تشير إليه اللقطة ولم يُنسخ يُعاد البحث عنه ثم
+        يُسجل في missing.
+
+        Args:
+            timestamp (str): الطابع الزمني للنسخة
+            references (dict): ناتج file_references للقطة قاعدة البيانات
+
+        Returns:
+            dict: {files, bytes, linked, copied, copied_bytes, missing, seconds}
+        """
+        start = time.perf_counter()
+        target_root = self.snapshot_dir(timestamp)
+        previous = None
+        for name in reversed(self.timestamps()):
+            if name < timestamp:
+                previous = name
+                break
+        previous_files = (self.load(previous) or {}).get('files', {}) if previous else {}
+
+        files = {}
+        linked = copied = copied_bytes = 0
+        try:
+            for tree in SNAPSHOT_TREES:
+                source_tree = os.path.join(self.source_dir, tree)
+                os.makedirs(os.path.join(target_root, tree), exist_ok=True)
+                names = sorted(os.listdir(source_tree)) if os.path.isdir(source_tree) else []
+                for name in names:
+                    source = os.path.join(source_tree, name)
+                    # ملفات مخفية/مؤقتة (مثل سجل استئناف إعادة توليد الفواتير) لا تُنسخ
+                    if name.startswith('.') or name.endswith('.tmp') or not os.path.isfile(source):
+                        continue
+                    relative = f"{tree}/{name}"
+                    target = os.path.join(target_root, tree, name)
+                    stat = os.stat(source)
+                    entry = previous_files.get(relative)
+                    if (entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns):
+                        try:
+                            os.link(os.path.join(self.snapshot_dir(previous), tree, name), target)
+                            files[relative] = entry
+                            linked += 1
+                            continue
+                        except OSError:
+                            # نظام ملفات بلا روابط صلبة أو ملف لقطة سابقة مفقود: نسخ عادي
+                            pass
+                    try:
+                        digest = _copy_with_hash(source, target)
+                    except FileNotFoundError:
+                        # حُذف من المصدر أثناء اللقطة
+                        continue
+                    files[relative] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+                    copied += 1
+                    copied_bytes += stat.st_size
+
+            # ما تشير إليه قاعدة البيانات يجب أن يكون في اللقطة
+            missing = []
+            for tree, names in (references or {}).items():
+                for name in sorted(names):
+                    relative = f"{tree}/{name}"
+                    if relative in files:
+                        continue
+                    source = os.path.join(self.source_dir, tree, name)
+                    if os.path.isfile(source):
+                        stat = os.stat(source)
+                        digest = _copy_with_hash(source, os.path.join(target_root, tree, name))
+                        files[relative] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+                        copied += 1
+                        copied_bytes += stat.st_size
+                    else:
+                        missing.append(relative)
+
+            manifest = {
+                'timestamp': timestamp,
+                'previous': previous,
+                'files': files,
+                'missing': missing
+            }
+            # الـ manifest آخراً: لقطة بلا manifest غير مكتملة ولا يُربط بها
+            temp_path = os.path.join(target_root, f"{FILES_MANIFEST}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_path, os.path.join(target_root, FILES_MANIFEST))
+        except BaseException:
+            shutil.rmtree(target_root, ignore_errors=True)
+            raise
+
+        return {
+            'files': len(files),
+            'bytes': sum(entry['size'] for entry in files.values()),
+            'linked': linked,
+            'copied': copied,
+            'copied_bytes': copied_bytes,
+            'missing': missing,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+    def verify(self, timestamp):
+        """
+        التحقق من ملفات لقطة (وجودها، حجمها وبصمتها)
+
+        Returns:
+            list: المشاكل (فارغة إذا كانت اللقطة سليمة)
+        """
+        manifest = self.load(timestamp)
+        if manifest is None:
+            return ["لقطة الملفات غير موجودة أو غير مكتملة"]
+        problems = []
+        target_root = self.snapshot_dir(timestamp)
+        for relative, entry in manifest['files'].items():
+            path = os.path.join(target_root, *relative.split('/'))
+            digest = hashlib.sha256()
+            try:
+                if os.path.getsize(path) != entry['size']:
+                    problems.append(f"{relative}: الحجم لا يطابق")
+                    continue
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(block)
+            except OSError:
+                problems.append(f"{relative}: غير موجود")
+                continue
+            if digest.hexdigest() != entry['sha256']:
+                problems.append(f"{relative}: البصمة لا تطابق")
+        return problems
+
+    def restore(self, timestamp):
+        """
+        استرجاع ملفات لقطة إلى contracts/ و invoices/
+
+        الملفات تُنسخ (لا تُربط) حتى لا يغير تعديل ملف حي نسخته في اللقطات.
+        الملف الحي المطابق (نفس الحجم ووقت التعديل) لا يُعاد نسخه، والملفات
+        الحية غير الموجودة في اللقطة تبقى كما هي.
+
+        Returns:
+            int: عدد الملفات المنسوخة
+        """
+        manifest = self.load(timestamp)
+        if manifest is None:
+            raise ValueError("لقطة الملفات غير موجودة أو غير مكتملة")
+        restored = 0
+        target_root = self.snapshot_dir(timestamp)
+        for relative, entry in manifest['files'].items():
+            tree, name = relative.split('/', 1)
+            live = os.path.join(self.source_dir, tree, name)
+            try:
+                stat = os.stat(live)
+                if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+                    continue
+            except FileNotFoundError:
+                pass
+            os.makedirs(os.path.dirname(live), exist_ok=True)
+            _copy_with_hash(os.path.join(target_root, tree, name), live)
+            restored += 1
+        return restored
+
+    def remove(self, timestamp):
+        """حذف لقطة (الملفات المرتبطة في اللقطات الأخرى تبقى)"""
+        shutil.rmtree(self.snapshot_dir(timestamp), ignore_errors=True)
@@ -3,3 +3,4 @@ from .accounting import AccountingManager
 from .installments import InstallmentsManager
 from .invoices import InvoicesManager
 from .reports import ReportsManager
+from .rollups import RollupsManager
@@ -8,10 +8,12 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QColor
 from ..utils import UIHelper
+from .rollups import RollupsManager
 
 class AccountingManager:
     def __init__(self, database):
         self.database = database
+        self.rollups = RollupsManager(database)
         self.categories = {
             "إيراد": [
                 "مبيعات سيارات",
@@ -38,21 +40,21 @@ class AccountingManager:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
             
-            self.database.cursor.execute("""
-                INSERT INTO financial_entries (
-                    entry_type, category, amount, date,
-                    description, created_by, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                entry_type,
-                category,
-                amount,
-                date,
-                description,
-                user_id
-            ))
-            
-            self.database.conn.commit()
+            with self.database.transaction():
+                self.database.cursor.execute("""
+                    INSERT INTO financial_entries (
+                        entry_type, category, amount, date,
+                        description, created_by, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (
+                    entry_type,
+                    category,
+                    amount,
+                    date,
+                    description,
+                    user_id
+                ))
+            
             return True, None
             
         except Exception as e:
@@ -93,24 +95,24 @@ class AccountingManager:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
             
-            self.database.cursor.execute("""
-                UPDATE financial_entries
-                SET entry_type = ?,
-                    category = ?,
-                    amount = ?,
-                    date = ?,
-                    description = ?
-                WHERE id = ?
-            """, (
-                entry_type,
-                category,
-                amount,
-                date,
-                description,
-                entry_id
-            ))
-            
-            self.database.conn.commit()
+            with self.database.transaction():
+                self.database.cursor.execute("""
+                    UPDATE financial_entries
+                    SET entry_type = ?,
+                        category = ?,
+                        amount = ?,
+                        date = ?,
+                        description = ?
+                    WHERE id = ?
+                """, (
+                    entry_type,
+                    category,
+                    amount,
+                    date,
+                    description,
+                    entry_id
+                ))
+            
             return True, None
             
         except Exception as e:
@@ -123,12 +125,12 @@ class AccountingManager:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
             
-            self.database.cursor.execute(
-                "DELETE FROM financial_entries WHERE id = ?",
-                (entry_id,)
-            )
+            with self.database.transaction():
+                self.database.cursor.execute(
+                    "DELETE FROM financial_entries WHERE id = ?",
+                    (entry_id,)
+                )
             
-            self.database.conn.commit()
             return True, None
             
         except Exception as e:
@@ -141,22 +143,8 @@ class AccountingManager:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
             
-            query = """
-                SELECT entry_type,
-                       SUM(amount) as total,
-                       COUNT(*) as count
-                FROM financial_entries
-            """
-            params = []
-            
-            if start_date and end_date:
-                query += " WHERE date BETWEEN ? AND ?"
-                params.extend([start_date, end_date])
-                
-            query += " GROUP BY entry_type"
-            
-            self.database.cursor.execute(query, params)
-            results = self.database.cursor.fetchall()
+            # المجاميع محسوبة مسبقاً في جداول المجاميع بدلاً من المرور على كل العمليات
+            results = self.rollups.get_totals(start_date, end_date)
             
             summary = {
                 "إيراد": {"total": 0, "count": 0},
@@ -0,0 +1,262 @@
+import os
+import sys
+import sqlite3
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from .invoice_generator import INVOICE_DATA_QUERY, InvoiceRenderer
+
+# حالة كل عملية عاملة: اتصال قراءة فقط ورسام خاص بها
+_worker = {}
+
+
+def _init_worker(db_path, invoices_dir):
+    """تهيئة العملية العاملة مرة واحدة"""
+    uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    _worker['conn'] = conn
+    _worker['renderer'] = InvoiceRenderer()
+    _worker['invoices_dir'] = invoices_dir
+
+
+def _render_chunk(invoice_numbers):
+    """
+    رسم مجموعة فواتير داخل العملية العاملة
+
+    Returns:
+        list: (رقم الفاتورة، اسم الملف أو None، رسالة الخطأ أو None)
+    """
+    conn = _worker['conn']
+    renderer = _worker['renderer']
+    invoices_dir = _worker['invoices_dir']
+    results = []
+
+    for invoice_number in invoice_numbers:
+        temp_path = None
+        try:
+            data = conn.execute(INVOICE_DATA_QUERY, (invoice_number,)).fetchone()
+            if not data:
+                results.append((invoice_number, None, "لم يتم العثور على الفاتورة"))
+                continue
+
+            filename = f"invoice_{invoice_number}.pdf"
+            filepath = os.path.join(invoices_dir, filename)
+
+            # الكتابة في ملف مؤقت ثم الاستبدال حتى لا يبقى ملف ناقص عند الانقطاع
+            temp_path = f"{filepath}.{os.getpid()}.tmp"
+            renderer.render(temp_path, data)
+            os.replace(temp_path, filepath)
+            results.append((invoice_number, filename, None))
+
+        except Exception as e:
+            # لا يبقى ملف مؤقت لرسم فشل
+            if temp_path and os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            results.append((invoice_number, None, str(e)))
+
+    return results
+
+
+class BulkInvoiceRegenerator:
+    """إعادة إنشاء ملفات الفواتير بالجملة عبر مجموعة عمليات متوازية"""
+
+    def __init__(self, database, workers=None, chunk_size=20, batch_size=200):
+        """
+        تهيئة المولد
+
+        Args:
+            database (Database): قاعدة البيانات
+            workers (int): عدد العمليات (الافتراضي عدد المعالجات)
+            chunk_size (int): عدد الفواتير في كل مهمة ترسل لعملية عاملة
+            batch_size (int): عدد تحديثات file_path المجمعة في كل معاملة
+        """
+        self.database = database
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.invoices_dir = os.path.join(os.path.dirname(self.database.db_path), 'invoices')
+
+    def journal_path(self, start_date=None, end_date=None):
+        """ملف سجل التقدم الخاص بنطاق التواريخ (للاستئناف بعد الانقطاع)"""
+        scope = f"{start_date}_{end_date}" if start_date and end_date else "all"
+        return os.path.join(self.invoices_dir, f".regenerate_{scope}.journal")
+
+    def get_invoice_numbers(self, start_date=None, end_date=None):
+        """أرقام الفواتير المطلوب إعادة إنشائها"""
+        query = "SELECT invoice_number FROM invoices"
+        params = []
+        if start_date and end_date:
+            query += " WHERE invoice_date BETWEEN ? AND ?"
+            params.extend([start_date, end_date])
+        query += " ORDER BY id"
+
+        cursor = self.database.read_cursor()
+        cursor.execute(query, params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def _read_journal(self, path):
+        """الفواتير التي اكتملت في تشغيل سابق"""
+        if not os.path.exists(path):
+            return set()
+        with open(path, encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _flush(self, updates, journal):
+        """حفظ مسارات الملفات دفعة واحدة ثم تسجيلها في سجل التقدم"""
+        if not updates:
+            return
+        with self.database.transaction():
+            self.database.cursor.executemany(
+                "UPDATE invoices SET file_path = ? WHERE invoice_number = ?",
+                updates
+            )
+        # السجل يُكتب بعد نجاح المعاملة فقط
+        journal.write("".join(f"{number}\n" for _, number in updates))
+        journal.flush()
+        updates.clear()
+
+    def regenerate(self, start_date=None, end_date=None, progress=None, resume=True):
+        """
+        إعادة إنشاء الفواتير (تنتظر حتى تنتهي: من الواجهات عبر RegenerationTask)
+
+        Args:
+            start_date (str): بداية الفترة (YYYY-MM-DD)، أو None لكل الفواتير
+            end_date (str): نهاية الفترة
+            progress (callable): تُستدعى بـ (المكتمل، الإجمالي) بعد كل مجموعة
+            resume (bool): تخطي الفواتير المكتملة في تشغيل سابق لم ينته
+
+        Returns:
+            tuple: (نجاح العملية، ملخص {total, done, skipped, failed, errors})
+        """
+        summary = {'total': 0, 'done': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+        try:
+            os.makedirs(self.invoices_dir, exist_ok=True)
+            journal_path = self.journal_path(start_date, end_date)
+            if not resume and os.path.exists(journal_path):
+                os.remove(journal_path)
+
+            numbers = self.get_invoice_numbers(start_date, end_date)
+            completed = self._read_journal(journal_path)
+            pending = [number for number in numbers if number not in completed]
+            summary['total'] = len(numbers)
+            summary['skipped'] = len(numbers) - len(pending)
+
+            chunks = [
+                pending[i:i + self.chunk_size]
+                for i in range(0, len(pending), self.chunk_size)
+            ]
+            updates = []
+
+            with open(journal_path, 'a', encoding='utf-8') as journal, ProcessPoolExecutor(
+                max_workers=self.workers,
+                # spawn وليس fork: العمليات تُنشأ من خيط عامل داخل تطبيق Qt، ونسخ حالته بـ fork غير آمن
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.database.db_path, self.invoices_dir)
+            ) as pool:
+                futures = [pool.submit(_render_chunk, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    for invoice_number, filename, error in future.result():
+                        if error:
+                            summary['failed'] += 1
+                            summary['errors'].append((invoice_number, error))
+                        else:
+                            summary['done'] += 1
+                            updates.append((filename, invoice_number))
+
+                    if len(updates) >= self.batch_size:
+                        self._flush(updates, journal)
+
+                    if progress:
+                        progress(summary['skipped'] + summary['done'] + summary['failed'], summary['total'])
+
+                self._flush(updates, journal)
+
+            # اكتمل العمل: سجل التقدم لم يعد مطلوباً
+            if not summary['failed']:
+                os.remove(journal_path)
+
+            return not summary['failed'], summary
+
+        except Exception as e:
+            print(f"Error in bulk regeneration: {str(e)}")
+            summary['errors'].append((None, str(e)))
+            return False, summary
+
+
+class _RegenerationSignals(QObject):
+    """إشارات تنقل تقدم إعادة الإنشاء ونتيجتها إلى خيط الواجهة"""
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool, object)
+
+
+class RegenerationTask(QRunnable):
+    """
+    إعادة إنشاء الفواتير بالجملة في خيط عمل
+
+    regenerate تنتظر مجموعة العمليات حتى تنتهي، فاستدعاؤها من خيط الواجهة
+    يجمد النوافذ طوال التشغيل: الواجهات تشغلها عبر هذه المهمة
+    (InvoicesManager.regenerate_invoices) وسطر الأوامر يستدعيها مباشرة.
+    """
+
+    def __init__(self, regenerator, start_date=None, end_date=None, resume=True):
+        super().__init__()
+        self.regenerator = regenerator
+        self.start_date = start_date
+        self.end_date = end_date
+        self.resume = resume
+        self.signals = _RegenerationSignals()
+
+    def run(self):
+        # regenerate لا ترفع استثناءات: الأخطاء في الملخص
+        success, summary = self.regenerator.regenerate(
+            self.start_date, self.end_date,
+            progress=lambda done, total: self.signals.progress.emit(done, total),
+            resume=self.resume
+        )
+        self.signals.finished.emit(success, summary)
+
+
+def main():
+    """إعادة إنشاء الفواتير من سطر الأوامر"""
+    from ..database import Database
+
+    parser = argparse.ArgumentParser(description="إعادة إنشاء ملفات الفواتير بالجملة")
+    parser.add_argument('--from', dest='start_date', help="بداية الفترة (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end_date', help="نهاية الفترة (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, help="عدد العمليات المتوازية")
+    parser.add_argument('--restart', action='store_true', help="تجاهل التقدم السابق والبدء من جديد")
+    args = parser.parse_args()
+
+    def show_progress(done, total):
+        print(f"\r    {done:,} / {total:,}", end="", flush=True)
+
+    database = Database()
+    try:
+        regenerator = BulkInvoiceRegenerator(database, workers=args.workers)
+        success, summary = regenerator.regenerate(
+            args.start_date, args.end_date,
+            progress=show_progress,
+            resume=not args.restart
+        )
+    finally:
+        database.close()
+
+    print()
+    print(
+        f"الإجمالي: {summary['total']:,} | تم: {summary['done']:,} | "
+        f"تم تخطيه: {summary['skipped']:,} | فشل: {summary['failed']:,}"
+    )
+    for invoice_number, error in summary['errors'][:20]:
+        print(f"    {invoice_number}: {error}")
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
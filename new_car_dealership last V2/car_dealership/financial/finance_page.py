@@ -13,6 +13,7 @@ from .installments import InstallmentsManager
 from .invoices import InvoicesManager
 from .reports import ReportsManager
 from ..utils.ui_helper import UIHelper
+from ..query_executor import QueryExecutor
 
 class FinancePage(QWidget):
     def __init__(self, database, parent=None):
@@ -25,6 +26,9 @@ class FinancePage(QWidget):
         self.invoices_manager = InvoicesManager(database)
         self.reports_manager = ReportsManager(database)
         
+        # منفذ الاستعلامات في الخلفية حتى لا تتجمد الواجهة
+        self.executor = QueryExecutor(database, self)
+        
         # تهيئة المتغيرات
         self.car_select = None
         self.client_select = None
@@ -80,6 +84,9 @@ class FinancePage(QWidget):
     def on_tab_changed(self, index):
         """تحديث البيانات عند تغيير التبويب"""
         try:
+            # نتائج التبويب السابق لم تعد مطلوبة
+            self.executor.cancel_all()
+            
             if index == 0:  # تبويب المحاسبة
                 self.load_accounting_entries()
             elif index == 1:  # تبويب الأقساط
@@ -98,6 +105,15 @@ class FinancePage(QWidget):
         self.load_installments()
         self.load_invoices()
 
+    def reload(self):
+        """إعادة تحميل كل بيانات الصفحة (بعد استرجاع نسخة احتياطية)"""
+        self.executor.cancel_all()
+        self.load_accounting_entries()
+        self.load_installments()
+        self.load_invoices()
+        self.load_cars()
+        self.load_clients()
+
     def create_accounting_tab(self):
         """إنشاء تبويب المحاسبة"""
         tab = QWidget()
@@ -396,7 +412,7 @@ class FinancePage(QWidget):
                 
             try:
                 total_amount = float(total_amount_text)
-            if total_amount <= 0 or not isinstance(total_amount, (int, float)):
+                if total_amount <= 0 or not isinstance(total_amount, (int, float)):
                     UIHelper.show_warning(self, "تنبيه", "يرجى إدخال مبلغ صحيح أكبر من الصفر")
                     return
             except ValueError:
@@ -468,8 +484,23 @@ class FinancePage(QWidget):
         self.installment_amount.setText("قيمة القسط: 0.00 ج.م")
 
     def load_installments(self):
-        """تحميل الأقساط"""
-        installments = self.installments_manager.get_installments()
+        """تحميل الأقساط في الخلفية"""
+        self.executor.submit(
+            'installments',
+            self.fetch_installments,
+            on_result=self.populate_installments,
+            on_error=lambda error: UIHelper.show_error(
+                self, "خطأ", f"فشل في تحميل الأقساط: {error}"
+            )
+        )
+
+    def fetch_installments(self):
+        """تحديث حالات الأقساط ثم جلبها (تعمل على خيط عمل)"""
+        self.installments_manager.update_status()
+        return self.installments_manager.get_installments()
+
+    def populate_installments(self, installments):
+        """عرض الأقساط في الجدول"""
         self.installments_table.setRowCount(len(installments))
         
         for i, inst in enumerate(installments):
@@ -606,6 +637,7 @@ class FinancePage(QWidget):
             "تقرير المبيعات",
             "تقرير العملاء"
         ])
+        self.report_type.currentIndexChanged.connect(self.cancel_report)
         layout.addWidget(QLabel("نوع التقرير:"))
         layout.addWidget(self.report_type)
         
@@ -620,6 +652,9 @@ class FinancePage(QWidget):
         self.report_end_date.setDate(QDate.currentDate())
         self.report_end_date.setCalendarPopup(True)
         
+        self.report_start_date.dateChanged.connect(self.cancel_report)
+        self.report_end_date.dateChanged.connect(self.cancel_report)
+        
         date_layout.addWidget(QLabel("من:"))
         date_layout.addWidget(self.report_start_date)
         date_layout.addWidget(QLabel("إلى:"))
@@ -752,8 +787,18 @@ class FinancePage(QWidget):
                 self.accounting_table.item(i, j).setBackground(QColor(color))
 
     def load_invoices(self):
-        """تحميل الفواتير"""
-        invoices = self.invoices_manager.get_invoices()
+        """تحميل الفواتير في الخلفية"""
+        self.executor.submit(
+            'invoices',
+            self.invoices_manager.get_invoices,
+            on_result=self.populate_invoices,
+            on_error=lambda error: UIHelper.show_error(
+                self, "خطأ", f"فشل في تحميل الفواتير: {error}"
+            )
+        )
+
+    def populate_invoices(self, invoices):
+        """عرض الفواتير في الجدول"""
         self.invoices_table.setRowCount(len(invoices))
         
         for i, invoice in enumerate(invoices):
@@ -859,39 +904,51 @@ class FinancePage(QWidget):
         self.payment_method.setCurrentIndex(0)
 
     def generate_report(self):
-        """توليد التقرير"""
+        """توليد التقرير في الخلفية"""
         try:
             report_type = self.report_type.currentText()
             start_date = self.report_start_date.date().toString(Qt.DateFormat.ISODate)
             end_date = self.report_end_date.date().toString(Qt.DateFormat.ISODate)
             
             if report_type == "تقرير الإيرادات والمصروفات":
-                success, results, summary, error = self.reports_manager.generate_financial_report(start_date, end_date)
-                if success:
-                    self.show_financial_report(results, summary)
-                else:
-                    UIHelper.show_error(self, "خطأ", f"فشل في توليد التقرير: {error}")
+                generate = self.reports_manager.generate_financial_report
+                show = self.show_financial_report
             elif report_type == "تقرير الأقساط":
-                success, results, summary, error = self.reports_manager.generate_installments_report(start_date, end_date)
-                if success:
-                    self.show_installments_report(results, summary)
-                else:
-                    UIHelper.show_error(self, "خطأ", f"فشل في توليد التقرير: {error}")
+                generate = self.reports_manager.generate_installments_report
+                show = self.show_installments_report
             elif report_type == "تقرير المبيعات":
-                success, results, summary, error = self.reports_manager.generate_sales_report(start_date, end_date)
-                if success:
-                    self.show_sales_report(results, summary)
-                else:
-                    UIHelper.show_error(self, "خطأ", f"فشل في توليد التقرير: {error}")
+                generate = self.reports_manager.generate_sales_report
+                show = self.show_sales_report
             else:  # تقرير العملاء
-                success, results, summary, error = self.reports_manager.generate_clients_report(start_date, end_date)
-                if success:
-                    self.show_clients_report(results, summary)
-                else:
-                    UIHelper.show_error(self, "خطأ", f"فشل في توليد التقرير: {error}")
+                generate = self.reports_manager.generate_clients_report
+                show = self.show_clients_report
+            
+            # أي تقرير سابق لم يكتمل يُلغى تلقائياً
+            self.executor.submit(
+                'report',
+                generate,
+                start_date,
+                end_date,
+                on_result=lambda result: self.on_report_ready(result, show),
+                on_error=lambda error: UIHelper.show_error(
+                    self, "خطأ", f"حدث خطأ أثناء توليد التقرير: {error}"
+                )
+            )
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"حدث خطأ أثناء توليد التقرير: {str(e)}")
 
+    def on_report_ready(self, result, show):
+        """عرض التقرير بعد وصول نتيجته"""
+        success, results, summary, error = result
+        if success:
+            show(results, summary)
+        else:
+            UIHelper.show_error(self, "خطأ", f"فشل في توليد التقرير: {error}")
+
+    def cancel_report(self):
+        """إلغاء التقرير الجاري عند تغيير نوعه أو فترته"""
+        self.executor.cancel('report')
+
     def show_financial_report(self, results, summary):
         """عرض تقرير الإيرادات والمصروفات"""
         self.report_table.clear()
@@ -1077,30 +1134,6 @@ class FinancePage(QWidget):
         except ValueError:
             self.installment_amount.clear()
 
-    def load_installments(self):
-        """تحميل الأقساط"""
-        installments = self.installments_manager.get_installments()
-        self.installments_table.setRowCount(len(installments))
-        
-        for i, installment in enumerate(installments):
-            car, client, amount, count, start_date, status = installment
-            
-            self.installments_table.setItem(i, 0, QTableWidgetItem(car))
-            self.installments_table.setItem(i, 1, QTableWidgetItem(client))
-            self.installments_table.setItem(i, 2, QTableWidgetItem(f"{amount:,.2f}"))
-            self.installments_table.setItem(i, 3, QTableWidgetItem(str(count)))
-            self.installments_table.setItem(i, 4, QTableWidgetItem(start_date))
-            self.installments_table.setItem(i, 5, QTableWidgetItem(status))
-            
-            color = {
-                'متأخر': '#fff3cd',
-                'جاري': '#d1e7dd',
-                'منتهي': '#e2e3e5'
-            }.get(status, '#ffffff')
-            
-            for j in range(6):
-                self.installments_table.item(i, j).setBackground(QColor(color))
-
     def export_report(self):
         """تصدير التقرير إلى Excel"""
         if self.report_table.rowCount() == 0:
@@ -22,47 +22,47 @@ class InstallmentsManager:
             remaining_amount = total_amount - down_payment
             next_payment_date = QDate.fromString(start_date, Qt.DateFormat.ISODate).addMonths(1)
             
-            self.database.cursor.execute("""
-                INSERT INTO installments (
-                    car_id, client_id, total_amount,
-                    paid_amount, remaining_amount,
-                    installment_count, start_date,
-                    next_payment_date, status,
-                    notes, created_by, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                car_id,
-                client_id,
-                total_amount,
-                down_payment,
-                remaining_amount,
-                installment_count,
-                start_date,
-                next_payment_date.toString(Qt.DateFormat.ISODate),
-                "جاري",
-                notes,
-                user_id
-            ))
-            
-            installment_id = self.database.cursor.lastrowid
-            
-            # إضافة الدفعة المقدمة كعملية مالية
-            if down_payment > 0:
+            with self.database.transaction():
                 self.database.cursor.execute("""
-                    INSERT INTO financial_entries (
-                        entry_type, category, amount,
-                        date, description, created_by
-                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO installments (
+                        car_id, client_id, total_amount,
+                        paid_amount, remaining_amount,
+                        installment_count, start_date,
+                        next_payment_date, status,
+                        notes, created_by, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (
-                    "إيراد",
-                    "أقساط",
+                    car_id,
+                    client_id,
+                    total_amount,
                     down_payment,
+                    remaining_amount,
+                    installment_count,
                     start_date,
-                    f"دفعة مقدمة للقسط رقم {installment_id}",
+                    next_payment_date.toString(Qt.DateFormat.ISODate),
+                    "جاري",
+                    notes,
                     user_id
                 ))
+                
+                installment_id = self.database.cursor.lastrowid
+                
+                # إضافة الدفعة المقدمة كعملية مالية
+                if down_payment > 0:
+                    self.database.cursor.execute("""
+                        INSERT INTO financial_entries (
+                            entry_type, category, amount,
+                            date, description, created_by
+                        ) VALUES (?, ?, ?, ?, ?, ?)
+                    """, (
+                        "إيراد",
+                        "أقساط",
+                        down_payment,
+                        start_date,
+                        f"دفعة مقدمة للقسط رقم {installment_id}",
+                        user_id
+                    ))
             
-            self.database.conn.commit()
             return True, installment_id, None
             
         except Exception as e:
@@ -74,74 +74,74 @@ class InstallmentsManager:
         try:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
-            # التحقق من القسط
-            self.database.cursor.execute("""
-                SELECT remaining_amount, next_payment_date
-                FROM installments
-                WHERE id = ?
-            """, (installment_id,))
-            
-            result = self.database.cursor.fetchone()
-            if not result:
-                return False, "لم يتم العثور على القسط"
+            with self.database.transaction():
+                # التحقق من القسط
+                self.database.cursor.execute("""
+                    SELECT remaining_amount, next_payment_date
+                    FROM installments
+                    WHERE id = ?
+                """, (installment_id,))
                 
-            remaining, next_date = result
-            
-            if amount > remaining:
-                return False, "المبلغ المدخل أكبر من المبلغ المتبقي"
-            
-            # تسجيل الدفعة
-            self.database.cursor.execute("""
-                INSERT INTO installment_payments (
-                    installment_id, payment_date,
-                    amount, payment_method, notes,
-                    created_by
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                installment_id,
-                payment_date,
-                amount,
-                payment_method,
-                notes,
-                user_id
-            ))
-            
-            # تحديث القسط
-            new_remaining = remaining - amount
-            new_status = "منتهي" if new_remaining == 0 else "جاري"
-            next_payment_date = QDate.fromString(next_date, Qt.DateFormat.ISODate).addMonths(1)
-            
-            self.database.cursor.execute("""
-                UPDATE installments
-                SET remaining_amount = ?,
-                    paid_amount = paid_amount + ?,
-                    next_payment_date = ?,
-                    status = ?
-                WHERE id = ?
-            """, (
-                new_remaining,
-                amount,
-                next_payment_date.toString(Qt.DateFormat.ISODate),
-                new_status,
-                installment_id
-            ))
-            
-            # إضافة العملية المالية
-            self.database.cursor.execute("""
-                INSERT INTO financial_entries (
-                    entry_type, category, amount,
-                    date, description, created_by
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                "إيراد",
-                "أقساط",
-                amount,
-                payment_date,
-                f"دفعة للقسط رقم {installment_id}",
-                user_id
-            ))
+                result = self.database.cursor.fetchone()
+                if not result:
+                    return False, "لم يتم العثور على القسط"
+                    
+                remaining, next_date = result
+                
+                if amount > remaining:
+                    return False, "المبلغ المدخل أكبر من المبلغ المتبقي"
+                
+                # تسجيل الدفعة
+                self.database.cursor.execute("""
+                    INSERT INTO installment_payments (
+                        installment_id, payment_date,
+                        amount, payment_method, notes,
+                        created_by
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    installment_id,
+                    payment_date,
+                    amount,
+                    payment_method,
+                    notes,
+                    user_id
+                ))
+                
+                # تحديث القسط
+                new_remaining = remaining - amount
+                new_status = "منتهي" if new_remaining == 0 else "جاري"
+                next_payment_date = QDate.fromString(next_date, Qt.DateFormat.ISODate).addMonths(1)
+                
+                self.database.cursor.execute("""
+                    UPDATE installments
+                    SET remaining_amount = ?,
+                        paid_amount = paid_amount + ?,
+                        next_payment_date = ?,
+                        status = ?
+                    WHERE id = ?
+                """, (
+                    new_remaining,
+                    amount,
+                    next_payment_date.toString(Qt.DateFormat.ISODate),
+                    new_status,
+                    installment_id
+                ))
+                
+                # إضافة العملية المالية
+                self.database.cursor.execute("""
+                    INSERT INTO financial_entries (
+                        entry_type, category, amount,
+                        date, description, created_by
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    "إيراد",
+                    "أقساط",
+                    amount,
+                    payment_date,
+                    f"دفعة للقسط رقم {installment_id}",
+                    user_id
+                ))
             
-            self.database.conn.commit()
             return True, None
             
         except Exception as e:
@@ -199,24 +199,24 @@ class InstallmentsManager:
             self.database.ensure_connection()
             current_date = QDate.currentDate().toString(Qt.DateFormat.ISODate)
             
-            # تحديث الأقساط المتأخرة
-            self.database.cursor.execute("""
-                UPDATE installments
-                SET status = 'متأخر'
-                WHERE status = 'جاري'
-                AND next_payment_date < ?
-                AND remaining_amount > 0
-            """, (current_date,))
-            
-            # تحديث الأقساط المنتهية
-            self.database.cursor.execute("""
-                UPDATE installments
-                SET status = 'منتهي'
-                WHERE status IN ('جاري', 'متأخر')
-                AND remaining_amount = 0
-            """)
+            with self.database.transaction():
+                # تحديث الأقساط المتأخرة
+                self.database.cursor.execute("""
+                    UPDATE installments
+                    SET status = 'متأخر'
+                    WHERE status = 'جاري'
+                    AND next_payment_date < ?
+                    AND remaining_amount > 0
+                """, (current_date,))
+                
+                # تحديث الأقساط المنتهية
+                self.database.cursor.execute("""
+                    UPDATE installments
+                    SET status = 'منتهي'
+                    WHERE status IN ('جاري', 'متأخر')
+                    AND remaining_amount = 0
+                """)
             
-            self.database.conn.commit()
             return True, None
             
         except Exception as e:
@@ -251,19 +251,19 @@ class InstallmentsManager:
         try:
             # التأكد من وجود اتصال نشط بقاعدة البيانات
             self.database.ensure_connection()
-            # حذف الدفعات المرتبطة
-            self.database.cursor.execute(
-                "DELETE FROM installment_payments WHERE installment_id = ?",
-                (installment_id,)
-            )
-            
-            # حذف القسط
-            self.database.cursor.execute(
-                "DELETE FROM installments WHERE id = ?",
-                (installment_id,)
-            )
+            with self.database.transaction():
+                # حذف الدفعات المرتبطة
+                self.database.cursor.execute(
+                    "DELETE FROM installment_payments WHERE installment_id = ?",
+                    (installment_id,)
+                )
+                
+                # حذف القسط
+                self.database.cursor.execute(
+                    "DELETE FROM installments WHERE id = ?",
+                    (installment_id,)
+                )
             
-            self.database.conn.commit()
             return True, None
             
         except Exception as e:
@@ -6,117 +6,140 @@ from reportlab.lib.units import inch, cm
 from reportlab.platypus import Table, TableStyle
 from reportlab.lib import colors
 import os
+import threading
 import arabic_reshaper
 from bidi.algorithm import get_display
 from datetime import datetime
+from functools import lru_cache
 
-class InvoiceGenerator:
-    def __init__(self, database):
-        self.database = database
-        
-        # تحميل الخط العربي
-        font_path = os.path.join(os.path.dirname(__file__), '..', 'assets', 'fonts', 'Cairo-Regular.ttf')
-        pdfmetrics.registerFont(TTFont('Arabic', font_path))
+FONT_NAME = 'Arabic'
+FONT_PATH = os.path.join(os.path.dirname(__file__), '..', 'assets', 'fonts', 'Cairo-Regular.ttf')
 
-    def generate_invoice(self, invoice_number):
-        """توليد فاتورة بصيغة PDF"""
-        try:
-            # الحصول على بيانات الفاتورة
-            self.database.ensure_connection()
-            self.database.cursor.execute("""
-                SELECT i.invoice_number,
-                       c.brand || ' ' || c.model AS car_name,
-                       c.chassis, c.engine,
-                       cl.name AS client_name,
-                       cl.phone AS client_phone,
-                       cl.address AS client_address,
-                       i.invoice_date,
-                       i.total_amount,
-                       i.payment_method,
-                       i.payment_status,
-                       u.username AS created_by
-                FROM invoices i
-                JOIN cars c ON i.car_id = c.id
-                JOIN clients cl ON i.client_id = cl.id
-                JOIN users u ON i.created_by = u.id
-                WHERE i.invoice_number = ?
-            """, (invoice_number,))
-            
-            invoice_data = self.database.cursor.fetchone()
-            if not invoice_data:
-                return False, "لم يتم العثور على الفاتورة"
+# استعلام بيانات الفاتورة (الترتيب مستخدم في دوال الرسم)
+INVOICE_DATA_QUERY = """
+    SELECT i.invoice_number,
+           c.brand || ' ' || c.model AS car_name,
+           c.chassis, c.engine,
+           cl.name AS client_name,
+           cl.phone AS client_phone,
+           cl.address AS client_address,
+           i.invoice_date,
+           i.total_amount,
+           i.payment_method,
+           i.payment_status,
+           u.username AS created_by
+    FROM invoices i
+    JOIN cars c ON i.car_id = c.id
+    JOIN clients cl ON i.client_id = cl.id
+    JOIN users u ON i.created_by = u.id
+    WHERE i.invoice_number = ?
+"""
 
-            # إنشاء مجلد للفواتير إذا لم يكن موجوداً
-            invoices_dir = os.path.join(os.path.dirname(self.database.db_path), 'invoices')
-            os.makedirs(invoices_dir, exist_ok=True)
-            
-            # إنشاء ملف PDF
-            filename = f"invoice_{invoice_number}.pdf"
-            filepath = os.path.join(invoices_dir, filename)
-            
-            # إنشاء الفاتورة
-            c = canvas.Canvas(filepath, pagesize=A4)
-            width, height = A4
-            
-            # إعداد الخط
-            c.setFont('Arabic', 16)
-            
-            # ترويسة الفاتورة
-            self._draw_header(c, width, height)
-            
-            # بيانات الفاتورة
-            self._draw_invoice_details(c, width, height, invoice_data)
-            
-            # بيانات السيارة
-            self._draw_car_details(c, width, height, invoice_data)
-            
-            # بيانات العميل
-            self._draw_client_details(c, width, height, invoice_data)
-            
-            # المبلغ والتوقيع
-            self._draw_amount_and_signature(c, width, height, invoice_data)
-            
-            c.save()
-            
-            # تحديث مسار الملف في قاعدة البيانات
-            self.database.cursor.execute("""
-                UPDATE invoices
-                SET file_path = ?
-                WHERE invoice_number = ?
-            """, (filename, invoice_number))
-            
-            self.database.conn.commit()
-            
-            return True, filepath
-            
-        except Exception as e:
-            print(f"Error generating invoice: {str(e)}")
-            return False, str(e)
 
-    def _draw_header(self, canvas, width, height):
-        """رسم ترويسة الفاتورة"""
-        # شعار المعرض
-        canvas.setFont('Arabic', 24)
-        self._draw_arabic_text(canvas, "معرض أبو ريا موتورز", width/2, height-2*cm, align='center')
-        
-        canvas.setFont('Arabic', 18)
-        self._draw_arabic_text(canvas, "لتجارة السيارات", width/2, height-3*cm, align='center')
-        
-        # معلومات الاتصال
-        canvas.setFont('Arabic', 12)
-        self._draw_arabic_text(canvas, "العنوان: القاهرة - مصر", width/2, height-4*cm, align='center')
-        self._draw_arabic_text(canvas, "هاتف: 01234567890", width/2, height-4.7*cm, align='center')
-        
-        # عنوان الفاتورة
-        canvas.setFont('Arabic', 20)
-        self._draw_arabic_text(canvas, "فاتورة بيع سيارة", width/2, height-6*cm, align='center')
-        
-        # خط فاصل
-        canvas.line(50, height-6.5*cm, width-50, height-6.5*cm)
+@lru_cache(maxsize=4096)
+def shape_arabic(text):
+    """تشكيل النص العربي وترتيب اتجاهه (النتائج محفوظة لأن النصوص تتكرر)"""
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def register_font(font_path=FONT_PATH):
+    """تسجيل الخط العربي مرة واحدة فقط في العملية"""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+
+
+class InvoiceRenderer:
+    """رسم ملف PDF للفاتورة من بياناتها، مع قالب ثابت محضر مسبقاً"""
+
+    def __init__(self, font_path=FONT_PATH, pagesize=A4):
+        """
+        تهيئة الرسام
+
+        Args:
+            font_path (str): مسار الخط العربي
+            pagesize (tuple): مقاس الصفحة
+        """
+        register_font(font_path)
+        self.pagesize = pagesize
+        self.template = self._build_template()
+
+    def _build_template(self):
+        """
+        تحضير العناصر الثابتة (الترويسة والعناوين والتوقيعات) مرة واحدة
+
+        يُشكل النص وتُحسب بداية كل سطر حسب محاذاته هنا، فلا يبقى عند
+        رسم كل فاتورة إلا تنفيذ الأوامر
+
+        Returns:
+            list: أوامر رسم ('text', حجم الخط، النص المشكل، x, y) أو ('line', x1, y1, x2, y2)
+        """
+        width, height = self.pagesize
+        template = []
+
+        def text(size, value, x, y, align='right'):
+            shaped = shape_arabic(value)
+            text_width = pdfmetrics.stringWidth(shaped, FONT_NAME, size)
+            if align == 'center':
+                x -= text_width / 2
+            elif align == 'right':
+                x -= text_width
+            template.append(('text', size, shaped, x, y))
+
+        # ترويسة الفاتورة
+        text(24, "معرض أبو ريا موتورز", width/2, height-2*cm, 'center')
+        text(18, "لتجارة السيارات", width/2, height-3*cm, 'center')
+        text(12, "العنوان: القاهرة - مصر", width/2, height-4*cm, 'center')
+        text(12, "هاتف: 01234567890", width/2, height-4.7*cm, 'center')
+        text(20, "فاتورة بيع سيارة", width/2, height-6*cm, 'center')
+        template.append(('line', 50, height-6.5*cm, width-50, height-6.5*cm))
+
+        # عناوين الأقسام
+        text(14, "بيانات السيارة:", 2*cm, height-10*cm)
+        text(14, "بيانات المشتري:", 2*cm, height-15*cm)
+
+        # التوقيعات
+        text(12, "توقيع البائع", 3*cm, height-26*cm)
+        text(12, "توقيع المشتري", width-5*cm, height-26*cm)
+        template.append(('line', 2*cm, height-27*cm, 6*cm, height-27*cm))
+        template.append(('line', width-6*cm, height-27*cm, width-2*cm, height-27*cm))
+
+        return template
+
+    def _draw_template(self, c):
+        """تنفيذ أوامر القالب الثابت المحضرة مسبقاً على الصفحة"""
+        for command in self.template:
+            if command[0] == 'text':
+                _, size, shaped, x, y = command
+                c.setFont(FONT_NAME, size)
+                c.drawString(x, y, shaped)
+            else:
+                c.line(*command[1:])
+
+    def render(self, filepath, data):
+        """
+        رسم الفاتورة في ملف PDF
+
+        Args:
+            filepath (str): مسار الملف الناتج
+            data (tuple): صف بيانات الفاتورة بترتيب INVOICE_DATA_QUERY
+        """
+        width, height = self.pagesize
+        c = canvas.Canvas(filepath, pagesize=self.pagesize)
+
+        # العناصر الثابتة
+        self._draw_template(c)
+
+        # الحقول المتغيرة فقط
+        self._draw_invoice_details(c, width, height, data)
+        self._draw_car_details(c, width, height, data)
+        self._draw_client_details(c, width, height, data)
+        self._draw_amount(c, width, height, data)
+
+        c.save()
 
     def _draw_invoice_details(self, canvas, width, height, data):
         """رسم تفاصيل الفاتورة"""
-        canvas.setFont('Arabic', 14)
+        canvas.setFont(FONT_NAME, 14)
         
         # رقم الفاتورة والتاريخ
         self._draw_arabic_text(canvas, f"رقم الفاتورة: {data[0]}", 2*cm, height-8*cm)
@@ -124,29 +147,21 @@ class InvoiceGenerator:
 
     def _draw_car_details(self, canvas, width, height, data):
         """رسم تفاصيل السيارة"""
-        canvas.setFont('Arabic', 14)
-        
-        # بيانات السيارة
-        self._draw_arabic_text(canvas, "بيانات السيارة:", 2*cm, height-10*cm)
-        canvas.setFont('Arabic', 12)
+        canvas.setFont(FONT_NAME, 12)
         self._draw_arabic_text(canvas, f"الماركة والموديل: {data[1]}", 3*cm, height-11*cm)
         self._draw_arabic_text(canvas, f"رقم الشاسيه: {data[2]}", 3*cm, height-12*cm)
         self._draw_arabic_text(canvas, f"رقم المحرك: {data[3]}", 3*cm, height-13*cm)
 
     def _draw_client_details(self, canvas, width, height, data):
         """رسم بيانات العميل"""
-        canvas.setFont('Arabic', 14)
-        
-        # بيانات العميل
-        self._draw_arabic_text(canvas, "بيانات المشتري:", 2*cm, height-15*cm)
-        canvas.setFont('Arabic', 12)
+        canvas.setFont(FONT_NAME, 12)
         self._draw_arabic_text(canvas, f"الاسم: {data[4]}", 3*cm, height-16*cm)
         self._draw_arabic_text(canvas, f"رقم الهاتف: {data[5]}", 3*cm, height-17*cm)
         self._draw_arabic_text(canvas, f"العنوان: {data[6]}", 3*cm, height-18*cm)
 
-    def _draw_amount_and_signature(self, canvas, width, height, data):
-        """رسم المبلغ والتوقيع"""
-        canvas.setFont('Arabic', 14)
+    def _draw_amount(self, canvas, width, height, data):
+        """رسم المبلغ والإقرار ومعلومات الإنشاء"""
+        canvas.setFont(FONT_NAME, 14)
         
         # المبلغ وطريقة الدفع
         amount_text = f"{data[8]:,.2f} جنيه مصري"
@@ -154,32 +169,85 @@ class InvoiceGenerator:
         self._draw_arabic_text(canvas, f"طريقة الدفع: {data[9]}", 2*cm, height-21*cm)
         
         # إقرار الاستلام
-        canvas.setFont('Arabic', 12)
+        canvas.setFont(FONT_NAME, 12)
         receipt_text = f"أقر أنا معرض أبو ريا موتورز باستلام مبلغ وقدره {amount_text} من السيد/ {data[4]}"
         self._draw_arabic_text(canvas, receipt_text, width/2, height-23*cm, align='center')
         
-        # التوقيعات
-        canvas.setFont('Arabic', 12)
-        self._draw_arabic_text(canvas, "توقيع البائع", 3*cm, height-26*cm)
-        self._draw_arabic_text(canvas, "توقيع المشتري", width-5*cm, height-26*cm)
-        
-        # خطوط التوقيع
-        canvas.line(2*cm, height-27*cm, 6*cm, height-27*cm)
-        canvas.line(width-6*cm, height-27*cm, width-2*cm, height-27*cm)
-        
         # معلومات إضافية
-        canvas.setFont('Arabic', 10)
+        canvas.setFont(FONT_NAME, 10)
         self._draw_arabic_text(canvas, f"تم إنشاء الفاتورة بواسطة: {data[11]}", 2*cm, height-29*cm)
         self._draw_arabic_text(canvas, f"تاريخ الطباعة: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", width-6*cm, height-29*cm)
 
     def _draw_arabic_text(self, canvas, text, x, y, align='right'):
         """رسم نص عربي مع معالجة اتجاه الكتابة"""
-        reshaped_text = arabic_reshaper.reshape(text)
-        bidi_text = get_display(reshaped_text)
-        
+        self._draw_shaped(canvas, shape_arabic(text), x, y, align)
+
+    @staticmethod
+    def _draw_shaped(canvas, bidi_text, x, y, align):
+        """رسم نص مشكل مسبقاً حسب المحاذاة"""
         if align == 'center':
             canvas.drawCentredString(x, y, bidi_text)
         elif align == 'right':
             canvas.drawRightString(x, y, bidi_text)
         else:
             canvas.drawString(x, y, bidi_text)
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """الرسام المشترك (يُنشأ مرة واحدة في كل عملية)"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = InvoiceRenderer()
+    return _renderer
+
+
+class InvoiceGenerator:
+    def __init__(self, database, renderer=None):
+        self.database = database
+        self.renderer = renderer or get_renderer()
+
+    def fetch_invoice_data(self, invoice_number, cursor=None):
+        """جلب بيانات الفاتورة اللازمة للرسم"""
+        cursor = cursor or self.database.cursor
+        cursor.execute(INVOICE_DATA_QUERY, (invoice_number,))
+        return cursor.fetchone()
+
+    def invoice_path(self, invoice_number):
+        """اسم ملف الفاتورة ومساره الكامل"""
+        invoices_dir = os.path.join(os.path.dirname(self.database.db_path), 'invoices')
+        os.makedirs(invoices_dir, exist_ok=True)
+        filename = f"invoice_{invoice_number}.pdf"
+        return filename, os.path.join(invoices_dir, filename)
+
+    def generate_invoice(self, invoice_number):
+        """توليد فاتورة بصيغة PDF"""
+        try:
+            # الحصول على بيانات الفاتورة
+            self.database.ensure_connection()
+            invoice_data = self.fetch_invoice_data(invoice_number)
+            if not invoice_data:
+                return False, "لم يتم العثور على الفاتورة"
+
+            # إنشاء ملف PDF
+            filename, filepath = self.invoice_path(invoice_number)
+            self.renderer.render(filepath, invoice_data)
+            
+            # تحديث مسار الملف في قاعدة البيانات
+            with self.database.transaction():
+                self.database.cursor.execute("""
+                    UPDATE invoices
+                    SET file_path = ?
+                    WHERE invoice_number = ?
+                """, (filename, invoice_number))
+            
+            return True, filepath
+            
+        except Exception as e:
+            print(f"Error generating invoice: {str(e)}")
+            return False, str(e)
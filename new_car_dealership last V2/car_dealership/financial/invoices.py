@@ -5,7 +5,7 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView,
     QDateEdit, QMessageBox, QFileDialog
 )
-from PyQt6.QtCore import Qt, QDate, QUrl
+from PyQt6.QtCore import Qt, QDate, QUrl, QThreadPool
 from PyQt6.QtGui import QColor, QDesktopServices
 from datetime import datetime
 from ..utils.ui_helper import UIHelper
@@ -13,6 +13,8 @@ from ..utils.ui_helper import UIHelper
 class InvoicesManager:
     def __init__(self, database):
         self.database = database
+        # إعادة إنشاء الفواتير بالجملة الجارية في الخلفية
+        self.regeneration_task = None
 
     def create_invoice(self, car_id, client_id, amount, payment_method, user_id):
         """إنشاء فاتورة جديدة"""
@@ -25,53 +27,45 @@ class InvoicesManager:
             year = current_date.strftime("%Y")
             month = current_date.strftime("%m")
             
-            self.database.cursor.execute("""
-                SELECT MAX(CAST(SUBSTR(invoice_number, -4) AS INTEGER))
-                FROM invoices
-                WHERE invoice_number LIKE ?
-            """, (f"INV-{year}{month}%",))
-            
-            result = self.database.cursor.fetchone()
-            last_sequence = result[0] if result[0] else 0
-            new_sequence = str(last_sequence + 1).zfill(4)
-            invoice_number = f"INV-{year}{month}-{new_sequence}"
-            
-            # حفظ الفاتورة
-            self.database.cursor.execute("""
-                INSERT INTO invoices (
-                    invoice_number, car_id, client_id,
-                    invoice_date, total_amount,
-                    payment_method, payment_status,
-                    created_by, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                invoice_number,
-                car_id,
-                client_id,
-                QDate.currentDate().toString(Qt.DateFormat.ISODate),
-                amount,
-                payment_method,
-                "مدفوع" if payment_method == "نقدي" else "تقسيط",
-                user_id
-            ))
-            
-            # إضافة العملية المالية إذا كان الدفع نقدي
-            if payment_method == "نقدي":
+            with self.database.transaction():
+                # الرقم يُحجز داخل نفس المعاملة: التراجع يلغيه فلا تظهر فجوات
+                new_sequence = str(self.allocate_sequence(f"{year}{month}")).zfill(4)
+                invoice_number = f"INV-{year}{month}-{new_sequence}"
+                
+                # حفظ الفاتورة
                 self.database.cursor.execute("""
-                    INSERT INTO financial_entries (
-                        entry_type, category, amount,
-                        date, description, created_by
-                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO invoices (
+                        invoice_number, car_id, client_id,
+                        invoice_date, total_amount,
+                        payment_method, payment_status,
+                        created_by, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (
-                    "إيراد",
-                    "مبيعات سيارات",
-                    amount,
+                    invoice_number,
+                    car_id,
+                    client_id,
                     QDate.currentDate().toString(Qt.DateFormat.ISODate),
-                    f"فاتورة رقم {invoice_number}",
+                    amount,
+                    payment_method,
+                    "مدفوع" if payment_method == "نقدي" else "تقسيط",
                     user_id
                 ))
-            
-            self.database.conn.commit()
+                
+                # إضافة العملية المالية إذا كان الدفع نقدي
+                if payment_method == "نقدي":
+                    self.database.cursor.execute("""
+                        INSERT INTO financial_entries (
+                            entry_type, category, amount,
+                            date, description, created_by
+                        ) VALUES (?, ?, ?, ?, ?, ?)
+                    """, (
+                        "إيراد",
+                        "مبيعات سيارات",
+                        amount,
+                        QDate.currentDate().toString(Qt.DateFormat.ISODate),
+                        f"فاتورة رقم {invoice_number}",
+                        user_id
+                    ))
             
             # إنشاء ملف PDF للفاتورة
             from .invoice_generator import InvoiceGenerator
@@ -87,6 +81,32 @@ class InvoicesManager:
             print(f"Error in create_invoice: {str(e)}")
             return False, None, str(e)
 
+    def allocate_sequence(self, period):
+        """
+        حجز الرقم التالي في تسلسل الفواتير الشهري
+
+        يجب استدعاؤها داخل معاملة الفاتورة (BEGIN IMMEDIATE يمنع كاتباً آخر
+        من حجز نفس الرقم)
+
+        Args:
+            period (str): الشهر بصيغة YYYYMM
+
+        Returns:
+            int: الرقم المحجوز
+        """
+        self.database.cursor.execute("""
+            INSERT INTO invoice_sequences (period, last_value)
+            VALUES (?, 1)
+            ON CONFLICT (period) DO UPDATE
+            SET last_value = last_value + 1
+        """, (period,))
+        
+        self.database.cursor.execute(
+            "SELECT last_value FROM invoice_sequences WHERE period = ?",
+            (period,)
+        )
+        return self.database.cursor.fetchone()[0]
+
     def get_invoices(self, start_date=None, end_date=None, payment_method=None):
         """جلب الفواتير"""
         try:
@@ -237,6 +257,38 @@ class InvoicesManager:
             print(f"Error in regenerate_invoice: {str(e)}")
             return False, str(e)
 
+    def regenerate_invoices(self, start_date=None, end_date=None, on_progress=None, on_finished=None,
+                            workers=None):
+        """
+        إعادة إنشاء ملفات كل الفواتير (أو فواتير فترة) بالتوازي في الخلفية
+
+        Args:
+            start_date (str): بداية الفترة (YYYY-MM-DD)، أو None لكل الفواتير
+            end_date (str): نهاية الفترة
+            on_progress (callable): تُستدعى في خيط الواجهة بـ (المكتمل، الإجمالي)
+            on_finished (callable): تُستدعى في خيط الواجهة بـ (النجاح، الملخص)
+            workers (int): عدد العمليات المتوازية
+
+        Returns:
+            RegenerationTask: المهمة الجارية، أو None إذا كانت إعادة إنشاء أخرى جارية
+        """
+        from .bulk_regeneration import BulkInvoiceRegenerator, RegenerationTask
+        if self.regeneration_task is not None:
+            return None
+
+        def finished(success, summary):
+            self.regeneration_task = None
+            if on_finished:
+                on_finished(success, summary)
+
+        regenerator = BulkInvoiceRegenerator(self.database, workers=workers)
+        self.regeneration_task = RegenerationTask(regenerator, start_date, end_date)
+        if on_progress:
+            self.regeneration_task.signals.progress.connect(on_progress)
+        self.regeneration_task.signals.finished.connect(finished)
+        QThreadPool.globalInstance().start(self.regeneration_task)
+        return self.regeneration_task
+
     def get_sales_summary(self, start_date=None, end_date=None):
         """الحصول على ملخص المبيعات"""
         try:
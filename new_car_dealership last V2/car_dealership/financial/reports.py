@@ -9,29 +9,18 @@ from PyQt6.QtGui import QColor
 import pandas as pd
 import openpyxl
 from ..utils.ui_helper import UIHelper
+from .rollups import RollupsManager
 
 class ReportsManager:
     def __init__(self, database):
         self.database = database
+        self.rollups = RollupsManager(database)
 
     def generate_financial_report(self, start_date, end_date):
         """توليد تقرير الإيرادات والمصروفات"""
         try:
-            # التأكد من وجود اتصال نشط بقاعدة البيانات
-            self.database.ensure_connection()
-            
-            self.database.cursor.execute("""
-                SELECT entry_type,
-                       category,
-                       SUM(amount) as total,
-                       COUNT(*) as count
-                FROM financial_entries
-                WHERE date BETWEEN ? AND ?
-                GROUP BY entry_type, category
-                ORDER BY entry_type, category
-            """, (start_date, end_date))
-            
-            results = self.database.cursor.fetchall()
+            # من المجاميع اليومية: التكلفة بعدد أيام الفترة لا بعدد العمليات
+            results = self.rollups.get_totals(start_date, end_date, by_category=True)
             
             summary = {
                 "إيراد": {"total": 0, "details": {}},
@@ -54,10 +43,10 @@ class ReportsManager:
     def generate_installments_report(self, start_date, end_date):
         """توليد تقرير الأقساط"""
         try:
-            # التأكد من وجود اتصال نشط بقاعدة البيانات
-            self.database.ensure_connection()
+            # التقارير تقرأ عبر اتصال القراءة حتى لا تعطل عمليات الكتابة
+            cursor = self.database.read_cursor()
             
-            self.database.cursor.execute("""
+            cursor.execute("""
                 SELECT i.id,
                        c.brand || ' ' || c.model as car_name,
                        cl.name as client_name,
@@ -74,7 +63,7 @@ class ReportsManager:
                 ORDER BY i.status, i.next_payment_date
             """, (start_date, end_date))
             
-            results = self.database.cursor.fetchall()
+            results = cursor.fetchall()
             
             summary = {
                 "total_count": len(results),
@@ -97,10 +86,10 @@ class ReportsManager:
     def generate_sales_report(self, start_date, end_date):
         """توليد تقرير المبيعات"""
         try:
-            # التأكد من وجود اتصال نشط بقاعدة البيانات
-            self.database.ensure_connection()
+            # التقارير تقرأ عبر اتصال القراءة حتى لا تعطل عمليات الكتابة
+            cursor = self.database.read_cursor()
             
-            self.database.cursor.execute("""
+            cursor.execute("""
                 SELECT i.invoice_number,
                        c.brand || ' ' || c.model AS car_name,
                        cl.name AS client_name,
@@ -115,7 +104,7 @@ class ReportsManager:
                 ORDER BY i.invoice_date DESC
             """, (start_date, end_date))
             
-            results = self.database.cursor.fetchall()
+            results = cursor.fetchall()
             
             summary = {
                 "total_count": len(results),
@@ -141,10 +130,10 @@ class ReportsManager:
     def generate_clients_report(self, start_date, end_date):
         """توليد تقرير العملاء"""
         try:
-            # التأكد من وجود اتصال نشط بقاعدة البيانات
-            self.database.ensure_connection()
+            # التقارير تقرأ عبر اتصال القراءة حتى لا تعطل عمليات الكتابة
+            cursor = self.database.read_cursor()
             
-            self.database.cursor.execute("""
+            cursor.execute("""
                 SELECT cl.name,
                        cl.phone,
                        COUNT(DISTINCT i.id) as invoices_count,
@@ -160,7 +149,7 @@ class ReportsManager:
                 ORDER BY total_amount DESC NULLS LAST
             """, (start_date, end_date, start_date, end_date))
             
-            results = self.database.cursor.fetchall()
+            results = cursor.fetchall()
             
             summary = {
                 "total_clients": len(results),
@@ -0,0 +1,176 @@
+import sys
+import argparse
+from ..migrations import REBUILD_ROLLUPS_STATEMENTS
+
+
+class RollupsManager:
+    """المجاميع المالية اليومية والشهرية التي تحدثها المشغلات"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def get_totals(self, start_date=None, end_date=None, by_category=False):
+        """
+        مجاميع العمليات المالية من جداول المجاميع
+
+        Args:
+            start_date (str): بداية الفترة (YYYY-MM-DD)
+            end_date (str): نهاية الفترة (YYYY-MM-DD)
+            by_category (bool): التجميع حسب الفئة أيضاً
+
+        Returns:
+            list: صفوف (entry_type, [category,] total, count)
+        """
+        columns = "entry_type, category" if by_category else "entry_type"
+
+        if start_date and end_date:
+            # عدد الصفوف المقروءة يتناسب مع عدد الأيام في الفترة
+            query = f"""
+                SELECT {columns}, SUM(total), SUM(count)
+                FROM financial_daily_totals
+                WHERE day BETWEEN ? AND ?
+                GROUP BY {columns}
+                ORDER BY {columns}
+            """
+            params = (start_date, end_date)
+        else:
+            query = f"""
+                SELECT {columns}, SUM(total), SUM(count)
+                FROM financial_monthly_totals
+                GROUP BY {columns}
+                ORDER BY {columns}
+            """
+            params = ()
+
+        cursor = self.database.read_cursor()
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def rebuild(self):
+        """إعادة بناء المجاميع بالكامل من جدول العمليات المالية"""
+        try:
+            self.database.ensure_connection()
+            with self.database.transaction():
+                for statement in REBUILD_ROLLUPS_STATEMENTS:
+                    self.database.cursor.execute(statement)
+            return True, None
+
+        except Exception as e:
+            print(f"Error in rebuild rollups: {str(e)}")
+            return False, str(e)
+
+    def check_consistency(self, tolerance=0.005):
+        """
+        مقارنة المجاميع بالجدول الأصلي
+
+        Args:
+            tolerance (float): الفرق المسموح به في المبالغ (أخطاء التقريب)
+
+        Returns:
+            tuple: (متطابقة أم لا، قائمة الاختلافات)
+        """
+        cursor = self.database.read_cursor()
+        mismatches = []
+
+        # المجاميع اليومية مقابل العمليات المالية
+        cursor.execute("""
+            SELECT r.day, r.entry_type, r.category, r.total, r.count, d.total, d.count
+            FROM (
+                SELECT date AS day, entry_type, category,
+                       SUM(amount) AS total, COUNT(*) AS count
+                FROM financial_entries
+                GROUP BY date, entry_type, category
+            ) r
+            LEFT JOIN financial_daily_totals d
+                ON d.day = r.day AND d.entry_type = r.entry_type AND d.category = r.category
+            WHERE d.count IS NULL OR d.count != r.count OR ABS(d.total - r.total) > ?
+            UNION ALL
+            SELECT d.day, d.entry_type, d.category, NULL, NULL, d.total, d.count
+            FROM financial_daily_totals d
+            WHERE NOT EXISTS (
+                SELECT 1 FROM financial_entries e
+                WHERE e.date = d.day AND e.entry_type = d.entry_type AND e.category = d.category
+            )
+        """, (tolerance,))
+        for row in cursor.fetchall():
+            mismatches.append(self._mismatch('يومي', row))
+
+        # المجاميع الشهرية مقابل اليومية
+        cursor.execute("""
+            SELECT r.month, r.entry_type, r.category, r.total, r.count, m.total, m.count
+            FROM (
+                SELECT substr(day, 1, 7) AS month, entry_type, category,
+                       SUM(total) AS total, SUM(count) AS count
+                FROM financial_daily_totals
+                GROUP BY substr(day, 1, 7), entry_type, category
+            ) r
+            LEFT JOIN financial_monthly_totals m
+                ON m.month = r.month AND m.entry_type = r.entry_type AND m.category = r.category
+            WHERE m.count IS NULL OR m.count != r.count OR ABS(m.total - r.total) > ?
+            UNION ALL
+            SELECT m.month, m.entry_type, m.category, NULL, NULL, m.total, m.count
+            FROM financial_monthly_totals m
+            WHERE NOT EXISTS (
+                SELECT 1 FROM financial_daily_totals d
+                WHERE substr(d.day, 1, 7) = m.month
+                AND d.entry_type = m.entry_type AND d.category = m.category
+            )
+        """, (tolerance,))
+        for row in cursor.fetchall():
+            mismatches.append(self._mismatch('شهري', row))
+
+        return not mismatches, mismatches
+
+    @staticmethod
+    def _mismatch(level, row):
+        """وصف اختلاف واحد"""
+        period, entry_type, category, expected_total, expected_count, actual_total, actual_count = row
+        return {
+            'level': level,
+            'period': period,
+            'entry_type': entry_type,
+            'category': category,
+            'expected': (expected_total, expected_count),
+            'actual': (actual_total, actual_count)
+        }
+
+
+def main():
+    """أوامر صيانة المجاميع من سطر الأوامر"""
+    from ..database import Database
+
+    parser = argparse.ArgumentParser(description="صيانة المجاميع المالية")
+    parser.add_argument('--rebuild', action='store_true', help="إعادة بناء المجاميع من العمليات المالية")
+    parser.add_argument('--check', action='store_true', help="مقارنة المجاميع بالعمليات المالية")
+    args = parser.parse_args()
+
+    database = Database()
+    manager = RollupsManager(database)
+    try:
+        if args.rebuild:
+            success, error = manager.rebuild()
+            if not success:
+                print(f"فشل في إعادة بناء المجاميع: {error}")
+                return 1
+            print("تمت إعادة بناء المجاميع بنجاح")
+
+        if args.check or not args.rebuild:
+            consistent, mismatches = manager.check_consistency()
+            if consistent:
+                print("المجاميع متطابقة مع العمليات المالية")
+                return 0
+
+            print(f"عدد الاختلافات: {len(mismatches)}")
+            for item in mismatches:
+                print(
+                    f"    [{item['level']}] {item['period']} {item['entry_type']} / {item['category']}: "
+                    f"المتوقع {item['expected']} - الفعلي {item['actual']}"
+                )
+            return 1
+        return 0
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,219 @@
 import os
+import html
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QTextEdit,
-    QComboBox, QDateEdit, QCheckBox,
-    QFileDialog
+    QPushButton, QLabel, QTableView,
+    QComboBox, QDateEdit, QCheckBox, QLineEdit,
+    QFileDialog, QHeaderView, QAbstractItemView,
+    QStyledItemDelegate, QStyle, QApplication
 )
-from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QFont
-from .utils import UIHelper
+from PyQt6.QtCore import Qt, QDate, QTimer, QAbstractTableModel, QModelIndex, QRectF
+from PyQt6.QtGui import QFont, QColor, QTextDocument, QTextOption
+from .utils import UIHelper, TextNormalizer
 from .audit_log import audit_logger
+from .audit_store import matches
 from datetime import datetime, timedelta
 
+# دور البيانات الذي يعيد نص الخلية بصيغة HTML مع تظليل كلمات البحث
+HIGHLIGHT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def _marked_html(text, spans):
+    """النص بصيغة HTML مع تظليل المواضع المطابقة"""
+    parts = []
+    last = 0
+    for start, end in spans:
+        parts.append(html.escape(text[last:start]))
+        parts.append(f'<span style="background-color: #ffe08a;">{html.escape(text[start:end])}</span>')
+        last = end
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts)
+
+
+class HighlightDelegate(QStyledItemDelegate):
+    """رسم الخلايا التي تحمل تظليلاً للبحث عبر QTextDocument"""
+
+    def paint(self, painter, option, index):
+        marked = index.data(HIGHLIGHT_ROLE)
+        if not marked:
+            super().paint(painter, option, index)
+            return
+        
+        self.initStyleOption(option, index)
+        option.text = ''
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+        
+        document = QTextDocument()
+        document.setDefaultFont(option.font)
+        text_option = QTextOption()
+        text_option.setTextDirection(option.direction)
+        text_option.setWrapMode(QTextOption.WrapMode.NoWrap)
+        document.setDefaultTextOption(text_option)
+        document.setHtml(marked)
+        document.setTextWidth(option.rect.width())
+        
+        painter.save()
+        top = option.rect.top() + (option.rect.height() - document.size().height()) / 2
+        painter.translate(option.rect.left(), top)
+        painter.setClipRect(QRectF(0, 0, option.rect.width(), option.rect.height()))
+        document.drawContents(painter)
+        painter.restore()
+
+
+class AuditEventsModel(QAbstractTableModel):
+    """
+    نموذج جدول أحداث التدقيق: الأحدث أولاً، يُحمّل صفحة بصفحة عند التمرير
+    
+    الصفوف تُحفظ كصفوف جاهزة للعرض (تُحلل مرة واحدة عند التحميل)، والمتابعة
+    المباشرة تضيف الأحداث الجديدة فقط بقراءة ملف السجل من آخر موضع.
+    
+    في وضع البحث النصي تأتي الصفوف مرتبة حسب الصلة مع تظليل الكلمات المطابقة.
+    """
+
+    HEADERS = ['الوقت', 'المستخدم', 'المعرف', 'نوع الحدث', 'الوصف', 'الحالة']
+    PAGE_SIZE = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._filters = {}
+        self._search = None
+        self._position = None
+        self._before = None
+        self._offset = 0
+        self._exhausted = True
+
+    @staticmethod
+    def _to_row(event):
+        """صف العرض من حدث (مع HTML التظليل لعمودي المستخدم والوصف إن وجد)"""
+        highlights = event.get('highlights') or {}
+        marked = {}
+        for column, field in ((1, 'username'), (4, 'description')):
+            if highlights.get(field):
+                marked[column] = _marked_html(event[field], highlights[field])
+        return (
+            event['timestamp'],
+            event['username'],
+            '' if event['user_id'] is None else str(event['user_id']),
+            event['event_type'],
+            event['description'],
+            event['status'],
+            marked
+        )
+
+    def set_filters(self, filters, search=None):
+        """
+        إعادة التحميل بمرشحات جديدة (الصفحة الأولى فقط)
+        
+        Args:
+            filters (dict): event_type, date_from, date_to, status
+            search (str): نص البحث النصي (اختياري)
+        """
+        self.beginResetModel()
+        self._rows = []
+        self._filters = dict(filters)
+        self._search = search or None
+        # الموضع يُحفظ قبل الصفحة الأولى: ما يُكتب بعده يصل عبر المتابعة فقط
+        self._position = audit_logger.tail_position()
+        self._before = None
+        self._offset = 0
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row[index.column()]
+        if role == HIGHLIGHT_ROLE:
+            return row[6].get(index.column())
+        if role == Qt.ItemDataRole.ForegroundRole and row[5] == 'فشل':
+            return QColor('#dc3545')
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        """تحميل الصفحة التالية (الأقدم) من الفهرس"""
+        if parent.isValid() or self._exhausted:
+            return
+        if self._search:
+            # نتائج البحث مرتبة حسب الصلة فتُرقّم بالإزاحة
+            events = audit_logger.search_logs(
+                self._search,
+                limit=self.PAGE_SIZE,
+                offset=self._offset,
+                max_id=self._position['max_id'],
+                **self._filters
+            )
+            self._offset += len(events)
+        else:
+            events = audit_logger.get_page(
+                before=self._before,
+                limit=self.PAGE_SIZE,
+                max_id=self._position['max_id'],
+                **self._filters
+            )
+        if len(events) < self.PAGE_SIZE:
+            self._exhausted = True
+        if not events:
+            return
+        self._before = (events[-1]['timestamp'], events[-1]['id'])
+        
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(events) - 1)
+        self._rows.extend(self._to_row(event) for event in events)
+        self.endInsertRows()
+
+    def poll_new_events(self):
+        """
+        إضافة الأحداث المكتوبة منذ آخر قراءة أعلى الجدول
+        
+        Returns:
+            int: عدد الصفوف المضافة
+        """
+        if self._position is None:
+            return 0
+        events, self._position = audit_logger.read_new_events(self._position)
+        new_rows = [
+            self._to_row(event) for event in events
+            if matches(event, **self._filters) and (
+                not self._search or TextNormalizer.matches(
+                    self._search, event.get('username'), event.get('description'), event.get('event_type')
+                )
+            )
+        ]
+        if not new_rows:
+            return 0
+        
+        new_rows.reverse()
+        self.beginInsertRows(QModelIndex(), 0, len(new_rows) - 1)
+        self._rows[0:0] = new_rows
+        self.endInsertRows()
+        return len(new_rows)
+
+
 class LogViewerDialog(QDialog):
+    # مهلة تجميع تغييرات المرشحات قبل إعادة التحميل (ملي ثانية)
+    FILTER_DEBOUNCE_MS = 300
+    # فترة فحص الأحداث الجديدة في وضع المتابعة (ملي ثانية)
+    FOLLOW_INTERVAL_MS = 1000
+
     def __init__(self, database, current_user_id, current_username):
         super().__init__()
         self.database = database
@@ -54,7 +256,7 @@ class LogViewerDialog(QDialog):
             'تفعيل_مستخدم',
             'تعطيل_مستخدم'
         ])
-        self.event_type_combo.currentTextChanged.connect(self.load_logs)
+        self.event_type_combo.currentTextChanged.connect(self.schedule_reload)
         filter_layout.addWidget(QLabel("نوع الحدث:"))
         filter_layout.addWidget(self.event_type_combo)
         
@@ -62,12 +264,12 @@ class LogViewerDialog(QDialog):
         self.date_from = QDateEdit()
         self.date_from.setCalendarPopup(True)
         self.date_from.setDate(QDate.currentDate().addDays(-7))
-        self.date_from.dateChanged.connect(self.load_logs)
+        self.date_from.dateChanged.connect(self.schedule_reload)
         
         self.date_to = QDateEdit()
         self.date_to.setCalendarPopup(True)
         self.date_to.setDate(QDate.currentDate())
-        self.date_to.dateChanged.connect(self.load_logs)
+        self.date_to.dateChanged.connect(self.schedule_reload)
         
         filter_layout.addWidget(QLabel("من:"))
         filter_layout.addWidget(self.date_from)
@@ -76,24 +278,58 @@ class LogViewerDialog(QDialog):
         
         # خيار عرض الأحداث الفاشلة فقط
         self.show_failed_only = QCheckBox("عرض الأحداث الفاشلة فقط")
-        self.show_failed_only.stateChanged.connect(self.load_logs)
+        self.show_failed_only.stateChanged.connect(self.schedule_reload)
         filter_layout.addWidget(self.show_failed_only)
         
+        # البحث النصي في الوصف وأسماء المستخدمين
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("بحث في الوصف أو اسم المستخدم...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.schedule_reload)
+        filter_layout.addWidget(self.search_input)
+        
+        # المتابعة المباشرة للأحداث الجديدة
+        self.follow_check = QCheckBox("متابعة مباشرة")
+        self.follow_check.toggled.connect(self.toggle_follow)
+        filter_layout.addWidget(self.follow_check)
+        
+        # تغييرات المرشحات المتتالية تُجمع في إعادة تحميل واحدة
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(self.FILTER_DEBOUNCE_MS)
+        self.reload_timer.timeout.connect(self.load_logs)
+        
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(self.FOLLOW_INTERVAL_MS)
+        self.follow_timer.timeout.connect(self.poll_new_events)
+        
         layout.addLayout(filter_layout)
 
-        # منطقة عرض السجلات
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
-        self.log_display.setStyleSheet("""
-            QTextEdit {
+        # ملخص الفترة (من البيانات الوصفية لمقاطع السجل)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        # جدول السجلات (نموذج يُحمّل صفحة بصفحة)
+        self.model = AuditEventsModel(self)
+        self.log_table = QTableView()
+        self.log_table.setModel(self.model)
+        self.log_table.setItemDelegate(HighlightDelegate(self.log_table))
+        self.log_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.log_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.log_table.verticalHeader().setVisible(False)
+        self.log_table.setAlternatingRowColors(True)
+        header = self.log_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        self.log_table.setColumnWidth(0, 150)
+        self.log_table.setStyleSheet("""
+            QTableView {
                 background-color: #f8f9fa;
                 border: 1px solid #dee2e6;
                 border-radius: 4px;
-                padding: 10px;
-                font-family: monospace;
             }
         """)
-        layout.addWidget(self.log_display)
+        layout.addWidget(self.log_table)
 
         # أزرار التحكم
         button_layout = QHBoxLayout()
@@ -146,8 +382,25 @@ class LogViewerDialog(QDialog):
             }
         """)
         
+        verify_button = QPushButton("التحقق من السلامة")
+        verify_button.clicked.connect(self.verify_integrity)
+        verify_button.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 4px;
+                min-width: 100px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        
         button_layout.addWidget(refresh_button)
         button_layout.addWidget(export_button)
+        button_layout.addWidget(verify_button)
         button_layout.addWidget(clear_button)
         
         layout.addLayout(button_layout)
@@ -157,49 +410,96 @@ class LogViewerDialog(QDialog):
         # تحميل السجلات عند فتح النافذة
         self.load_logs()
 
+    def schedule_reload(self):
+        """إعادة التحميل بعد توقف تغيير المرشحات"""
+        self.reload_timer.start()
+
+    def current_filters(self):
+        """مرشحات الاستعلام من أدوات التصفية"""
+        event_type = self.event_type_combo.currentText()
+        return dict(
+            event_type=None if event_type == 'الكل' else event_type,
+            date_from=self.date_from.date().toString(Qt.DateFormat.ISODate),
+            date_to=self.date_to.date().toString(Qt.DateFormat.ISODate),
+            status='فشل' if self.show_failed_only.isChecked() else None
+        )
+
     def load_logs(self):
         """تحميل وعرض السجلات"""
         try:
-            # تحديد معايير التصفية
-            event_type = self.event_type_combo.currentText()
-            date_from = self.date_from.date().toString(Qt.DateFormat.ISODate)
-            date_to = self.date_to.date().toString(Qt.DateFormat.ISODate)
-            show_failed = self.show_failed_only.isChecked()
-            
-            # الحصول على السجلات
-            logs = audit_logger.get_logs()
-            
-            # تصفية السجلات
-            filtered_logs = []
-            for log in logs:
-                # تحليل السجل
-                try:
-                    log_date = datetime.strptime(log.split(' - ')[0], '%Y-%m-%d %H:%M:%S')
-                    if date_from <= log_date.strftime('%Y-%m-%d') <= date_to:
-                        if event_type == 'الكل' or event_type in log:
-                            if not show_failed or (show_failed and 'فشل' in log):
-                                filtered_logs.append(log)
-                except:
-                    continue
+            self.reload_timer.stop()
+            filters = self.current_filters()
+            search = self.search_input.text().strip()
             
-            # عرض السجلات
-            self.log_display.clear()
-            if filtered_logs:
-                self.log_display.setPlainText('\n'.join(filtered_logs))
+            if search:
+                self.total_events = audit_logger.count_search_results(search, **filters)
             else:
-                self.log_display.setPlainText("لا توجد سجلات تطابق معايير البحث")
+                # العدد من الملفات الجانبية للمقاطع دون قراءة الأسطر
+                self.total_events = audit_logger.count_events(**filters)
+            self.update_summary()
+            
+            # الصفحة الأولى فقط؛ الباقي يُحمّل عند التمرير
+            self.model.set_filters(filters, search)
+            self.log_table.scrollToTop()
             
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"فشل في تحميل السجلات: {str(e)}")
 
+    def update_summary(self):
+        """عرض عدد الأحداث في الفترة"""
+        if self.total_events and self.search_input.text().strip():
+            self.summary_label.setText(f"عدد نتائج البحث: {self.total_events} (مرتبة حسب الصلة)")
+        elif self.total_events:
+            self.summary_label.setText(f"عدد الأحداث في الفترة: {self.total_events}")
+        else:
+            self.summary_label.setText("لا توجد سجلات تطابق معايير البحث")
+
+    def toggle_follow(self, enabled):
+        """تشغيل أو إيقاف المتابعة المباشرة"""
+        if enabled:
+            self.poll_new_events()
+            self.follow_timer.start()
+        else:
+            self.follow_timer.stop()
+
+    def poll_new_events(self):
+        """إضافة الأحداث الجديدة فقط دون إعادة تحميل الجدول"""
+        try:
+            at_top = self.log_table.verticalScrollBar().value() == 0
+            added = self.model.poll_new_events()
+            if added:
+                self.total_events += added
+                self.update_summary()
+                if at_top:
+                    self.log_table.scrollToTop()
+                    
+        except Exception as e:
+            self.follow_check.setChecked(False)
+            UIHelper.show_error(self, "خطأ", f"فشل في متابعة السجلات: {str(e)}")
+
     def export_logs(self):
         """تصدير السجلات إلى ملف"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"logs_export_{timestamp}.txt"
             
+            # التصدير يمر على كل الصفحات المطابقة وليس المحمّل في الجدول فقط
+            filters = self.current_filters()
+            search = self.search_input.text().strip()
+            before = None
+            offset = 0
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.log_display.toPlainText())
+                while True:
+                    if search:
+                        events = audit_logger.search_logs(search, limit=5000, offset=offset, **filters)
+                        offset += len(events)
+                    else:
+                        events = audit_logger.get_page(before=before, limit=5000, **filters)
+                    for event in events:
+                        f.write(audit_logger.format_event(event) + '\n')
+                    if len(events) < 5000:
+                        break
+                    before = (events[-1]['timestamp'], events[-1]['id'])
             
             audit_logger.log_event(
                 user_id=self.current_user_id,
@@ -217,6 +517,31 @@ class LogViewerDialog(QDialog):
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"فشل في تصدير السجلات: {str(e)}")
 
+    def verify_integrity(self):
+        """التحقق من أن السجلات لم تُعدل منذ كتابتها"""
+        ok, report = audit_logger.verify_integrity()
+        if isinstance(report, str):
+            UIHelper.show_error(self, "خطأ", report)
+            return
+        
+        if ok:
+            UIHelper.show_success(
+                self,
+                "السجلات سليمة",
+                f"تم فحص {report['checked']:,} سجل جديد حتى السجل {report['last_seq']:,}\n"
+                f"لم يُعثر على أي تعديل"
+                + ("\n\nتنبيه: التوقيع بالمفتاح المحلي المُولد على هذا الجهاز، فلا يكشف التعديل "
+                   "ممن يستطيع قراءة ملف المفتاح" if report.get('key_source') == 'local' else "")
+            )
+        else:
+            link = report['broken']
+            UIHelper.show_error(
+                self,
+                "السجلات معدلة",
+                f"أول رابط مكسور عند السجل {link['seq']}"
+                f" (المقطع: {link['segment']}، الموضع: {link['offset']})\n{link['reason']}"
+            )
+
     def clear_logs(self):
         """مسح جميع السجلات"""
         if not UIHelper.confirm_action(
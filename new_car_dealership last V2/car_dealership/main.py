@@ -321,6 +321,9 @@ class MainWindow(QMainWindow):
         self.finance_page = FinancePage(self.database)
         self.finance_page.set_user_info(self.user_id, self.username)
 
+        # بعد استرجاع نسخة احتياطية تُعاد قراءة بيانات كل الصفحات من القاعدة الجديدة
+        self.database.add_reload_listener(self.reload_pages)
+
         self.control_page = ControlWidget(
             self.database,
             self.user_id,
@@ -415,6 +418,12 @@ class MainWindow(QMainWindow):
         except Exception as e:
             UIHelper.show_error(self, "خطأ", f"حدث خطأ أثناء عرض الصفحة: {str(e)}")
 
+    def reload_pages(self):
+        """إعادة تحميل بيانات الصفحات بعد استبدال قاعدة البيانات"""
+        self.car_page.load_cars()
+        self.client_page.load_clients()
+        self.finance_page.reload()
+
     def logout(self):
         """تسجيل الخروج من التطبيق"""
         if UIHelper.confirm_action(self, "تأكيد", "هل أنت متأكد من تسجيل الخروج؟"):
@@ -424,6 +433,10 @@ class MainWindow(QMainWindow):
                 event_type="تسجيل_خروج",
                 description="تم تسجيل الخروج من النظام"
             )
+            # كتابة أحداث الجلسة المعلقة قبل تبديل المستخدم
+            audit_logger.flush()
+            # لا تُنسب تغييرات بعد الخروج للمستخدم السابق
+            self.database.set_change_user(None)
             
             self.hide()
             
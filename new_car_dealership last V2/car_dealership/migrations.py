@@ -0,0 +1,531 @@
+import sqlite3
+
+# كل ترحيل يجب أن يكون قابلاً لإعادة التنفيذ بأمان (IF NOT EXISTS / add_column)
+# لأن رقم الإصدار لا يُحدَّث إلا بعد نجاح الترحيل بالكامل
+
+BASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL,
+        last_login TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        active INTEGER DEFAULT 1
+    );
+
+    CREATE TABLE IF NOT EXISTS clients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        phone TEXT NOT NULL UNIQUE,
+        address TEXT NOT NULL,
+        status TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS cars (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        brand TEXT NOT NULL,
+        model TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        chassis TEXT NOT NULL UNIQUE,
+        engine TEXT NOT NULL UNIQUE,
+        condition TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        price REAL NOT NULL,
+        purchase_date TEXT NOT NULL,
+        license_expiry TEXT NOT NULL,
+        contract_filename TEXT,
+        contract_upload_date TEXT,
+        client_name TEXT NOT NULL,
+        client_phone TEXT NOT NULL,
+        client_address TEXT NOT NULL,
+        client_status TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        related_to_car INTEGER DEFAULT 0,
+        car_engine TEXT,
+        FOREIGN KEY(car_engine) REFERENCES cars(engine)
+    );
+
+    -- جداول النظام المالي
+    CREATE TABLE IF NOT EXISTS financial_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entry_type TEXT NOT NULL,  -- إيراد/مصروف
+        category TEXT NOT NULL,     -- فئة الإيراد/المصروف
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by INTEGER,
+        FOREIGN KEY(created_by) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS installments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        car_id INTEGER NOT NULL,
+        client_id INTEGER NOT NULL,
+        total_amount REAL NOT NULL,    -- إجمالي مبلغ التقسيط
+        paid_amount REAL DEFAULT 0,    -- المبلغ المدفوع
+        remaining_amount REAL,         -- المبلغ المتبقي
+        installment_count INTEGER,     -- عدد الأقساط
+        start_date TEXT NOT NULL,      -- تاريخ بداية التقسيط
+        next_payment_date TEXT,        -- تاريخ القسط القادم
+        status TEXT NOT NULL,          -- حالة التقسيط (جاري، منتهي، متأخر)
+        notes TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by INTEGER,
+        FOREIGN KEY(car_id) REFERENCES cars(id),
+        FOREIGN KEY(client_id) REFERENCES clients(id),
+        FOREIGN KEY(created_by) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS installment_payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        installment_id INTEGER NOT NULL,
+        payment_date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        payment_method TEXT NOT NULL,  -- نقدي، شيك، تحويل بنكي
+        notes TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by INTEGER,
+        FOREIGN KEY(installment_id) REFERENCES installments(id),
+        FOREIGN KEY(created_by) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        invoice_number TEXT UNIQUE NOT NULL,  -- رقم الفاتورة المميز
+        car_id INTEGER NOT NULL,
+        client_id INTEGER NOT NULL,
+        invoice_date TEXT NOT NULL,
+        total_amount REAL NOT NULL,
+        payment_method TEXT NOT NULL,  -- نقدي، تقسيط
+        payment_status TEXT NOT NULL,  -- مدفوع، غير مدفوع، تقسيط
+        notes TEXT,
+        file_path TEXT,               -- مسار ملف الفاتورة PDF
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        created_by INTEGER,
+        FOREIGN KEY(car_id) REFERENCES cars(id),
+        FOREIGN KEY(client_id) REFERENCES clients(id),
+        FOREIGN KEY(created_by) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS invoice_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        invoice_id INTEGER NOT NULL,
+        description TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 1,
+        unit_price REAL NOT NULL,
+        total_price REAL NOT NULL,
+        FOREIGN KEY(invoice_id) REFERENCES invoices(id)
+    );
+"""
+
+INDEXES_SCHEMA = """
+    -- العمليات المالية: التصفية والترتيب حسب التاريخ
+    CREATE INDEX IF NOT EXISTS idx_financial_entries_date
+        ON financial_entries(date);
+
+    -- الفواتير
+    CREATE INDEX IF NOT EXISTS idx_invoices_invoice_date
+        ON invoices(invoice_date);
+    CREATE INDEX IF NOT EXISTS idx_invoices_client_date
+        ON invoices(client_id, invoice_date);
+    CREATE INDEX IF NOT EXISTS idx_invoices_car_id
+        ON invoices(car_id);
+
+    CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id
+        ON invoice_items(invoice_id);
+
+    -- الأقساط
+    CREATE INDEX IF NOT EXISTS idx_installments_status_next_payment
+        ON installments(status, next_payment_date);
+    CREATE INDEX IF NOT EXISTS idx_installments_next_payment
+        ON installments(next_payment_date);
+    CREATE INDEX IF NOT EXISTS idx_installments_start_date
+        ON installments(start_date);
+    CREATE INDEX IF NOT EXISTS idx_installments_client_start
+        ON installments(client_id, start_date);
+    CREATE INDEX IF NOT EXISTS idx_installments_car_id
+        ON installments(car_id);
+
+    CREATE INDEX IF NOT EXISTS idx_installment_payments_installment_id
+        ON installment_payments(installment_id);
+"""
+
+# مجاميع العمليات المالية اليومية والشهرية، تحدثها المشغلات مع كل تعديل
+ROLLUPS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS financial_daily_totals (
+        day TEXT NOT NULL,
+        entry_type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, entry_type, category)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS financial_monthly_totals (
+        month TEXT NOT NULL,
+        entry_type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, entry_type, category)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_financial_entries_rollup_insert
+    AFTER INSERT ON financial_entries
+    BEGIN
+        INSERT INTO financial_daily_totals (day, entry_type, category, total, count)
+        VALUES (NEW.date, NEW.entry_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (day, entry_type, category) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+
+        INSERT INTO financial_monthly_totals (month, entry_type, category, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.entry_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (month, entry_type, category) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_financial_entries_rollup_delete
+    AFTER DELETE ON financial_entries
+    BEGIN
+        UPDATE financial_daily_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE day = OLD.date AND entry_type = OLD.entry_type AND category = OLD.category;
+
+        DELETE FROM financial_daily_totals
+        WHERE day = OLD.date AND entry_type = OLD.entry_type AND category = OLD.category
+        AND count <= 0;
+
+        UPDATE financial_monthly_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND entry_type = OLD.entry_type AND category = OLD.category;
+
+        DELETE FROM financial_monthly_totals
+        WHERE month = substr(OLD.date, 1, 7) AND entry_type = OLD.entry_type AND category = OLD.category
+        AND count <= 0;
+    END;
+
+    -- التعديل = حذف القيمة القديمة ثم إضافة الجديدة
+    CREATE TRIGGER IF NOT EXISTS trg_financial_entries_rollup_update
+    AFTER UPDATE OF date, entry_type, category, amount ON financial_entries
+    BEGIN
+        UPDATE financial_daily_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE day = OLD.date AND entry_type = OLD.entry_type AND category = OLD.category;
+
+        DELETE FROM financial_daily_totals
+        WHERE day = OLD.date AND entry_type = OLD.entry_type AND category = OLD.category
+        AND count <= 0;
+
+        UPDATE financial_monthly_totals
+        SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND entry_type = OLD.entry_type AND category = OLD.category;
+
+        DELETE FROM financial_monthly_totals
+        WHERE month = substr(OLD.date, 1, 7) AND entry_type = OLD.entry_type AND category = OLD.category
+        AND count <= 0;
+
+        INSERT INTO financial_daily_totals (day, entry_type, category, total, count)
+        VALUES (NEW.date, NEW.entry_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (day, entry_type, category) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+
+        INSERT INTO financial_monthly_totals (month, entry_type, category, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.entry_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (month, entry_type, category) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;
+    END;
+"""
+
+# إعادة بناء المجاميع من الجدول الأصلي (عبارات منفصلة لتعمل داخل معاملة)
+REBUILD_ROLLUPS_STATEMENTS = (
+    "DELETE FROM financial_daily_totals",
+    "DELETE FROM financial_monthly_totals",
+    """
+    INSERT INTO financial_daily_totals (day, entry_type, category, total, count)
+    SELECT date, entry_type, category, SUM(amount), COUNT(*)
+    FROM financial_entries
+    GROUP BY date, entry_type, category
+    """,
+    """
+    INSERT INTO financial_monthly_totals (month, entry_type, category, total, count)
+    SELECT substr(day, 1, 7), entry_type, category, SUM(total), SUM(count)
+    FROM financial_daily_totals
+    GROUP BY substr(day, 1, 7), entry_type, category
+    """,
+)
+
+# تسلسل أرقام الفواتير لكل شهر (INV-YYYYMM-NNNN)
+INVOICE_SEQUENCES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS invoice_sequences (
+        period TEXT PRIMARY KEY,             -- YYYYMM
+        last_value INTEGER NOT NULL
+    ) WITHOUT ROWID;
+
+    -- أي فاتورة تُدخل بطريق آخر (استيراد، بيانات قديمة) لا تسبق التسلسل
+    CREATE TRIGGER IF NOT EXISTS trg_invoices_sequence_insert
+    AFTER INSERT ON invoices
+    WHEN NEW.invoice_number GLOB 'INV-[0-9][0-9][0-9][0-9][0-9][0-9]-[0-9]*'
+    BEGIN
+        INSERT INTO invoice_sequences (period, last_value)
+        VALUES (substr(NEW.invoice_number, 5, 6), CAST(substr(NEW.invoice_number, 12) AS INTEGER))
+        ON CONFLICT (period) DO UPDATE
+        SET last_value = MAX(last_value, excluded.last_value);
+    END;
+
+    INSERT INTO invoice_sequences (period, last_value)
+    SELECT substr(invoice_number, 5, 6), MAX(CAST(substr(invoice_number, 12) AS INTEGER))
+    FROM invoices
+    WHERE invoice_number GLOB 'INV-[0-9][0-9][0-9][0-9][0-9][0-9]-[0-9]*'
+    GROUP BY substr(invoice_number, 5, 6)
+    ON CONFLICT (period) DO UPDATE
+    SET last_value = MAX(last_value, excluded.last_value);
+"""
+
+# سجل تغييرات الصفوف: تملؤه مشغلات SQL داخل نفس معاملة التعديل
+CHANGE_CAPTURE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS row_changes (
+        id INTEGER PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        operation TEXT NOT NULL,       -- INSERT / UPDATE / DELETE
+        changes TEXT NOT NULL,         -- JSON: الأعمدة المتغيرة فقط
+        user_id INTEGER,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_row_changes_row
+        ON row_changes(table_name, row_id);
+    CREATE INDEX IF NOT EXISTS idx_row_changes_changed_at
+        ON row_changes(changed_at);
+
+    -- المستخدم الحالي (صف واحد يُحدَّث عند تسجيل الدخول) لتنسب إليه التغييرات
+    CREATE TABLE IF NOT EXISTS change_session (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        user_id INTEGER
+    );
+"""
+
+# الجداول التي تُسجل تغييرات صفوفها
+CAPTURED_TABLES = (
+    'cars', 'clients', 'financial_entries',
+    'installments', 'installment_payments', 'invoices'
+)
+
+
+def get_schema_version(conn):
+    """قراءة إصدار المخطط المخزن في ملف قاعدة البيانات"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_schema_version(conn, version):
+    """تخزين إصدار المخطط (لا يقبل PRAGMA المعاملات المربوطة)"""
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def split_statements(script):
+    """
+    تقسيم نص SQL إلى عبارات منفصلة (المشغلات BEGIN ... END عبارة واحدة)
+
+    executescript ينهي أي معاملة مفتوحة قبل التنفيذ، فالترحيل ينفذ
+    عباراته واحدة تلو الأخرى داخل معاملته
+    """
+    statements = []
+    buffer = ''
+    for part in script.split(';'):
+        buffer += part + ';'
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip(' \t\n;'):
+                statements.append(buffer.strip())
+            buffer = ''
+    return statements
+
+
+def execute_script(conn, script):
+    """تنفيذ نص SQL عبارة عبارة (دون إنهاء المعاملة الحالية)"""
+    for statement in split_statements(script):
+        conn.execute(statement)
+
+
+def column_exists(conn, table, column):
+    """التحقق من وجود عمود في جدول"""
+    columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return any(row[1] == column for row in columns)
+
+
+def add_column(conn, table, column, definition):
+    """إضافة عمود لجدول موجود إذا لم يكن موجوداً"""
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def table_columns(conn, table):
+    """أسماء أعمدة جدول بترتيبها"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def register_change_user(conn, user_id=None):
+    """
+    تسجيل دالة current_user_id() التي تنسب بها مشغلات التسجيل التغييرات لمستخدم
+
+    الدالة خاصة بالاتصال ولا تُحفظ في ملف القاعدة: نسختان من البرنامج على نفس
+    الملف لا تتداخلان، والنسخ الاحتياطية والاسترجاع لا تحمل مستخدماً. كل اتصال
+    يكتب في الجداول المسجلة يجب أن يسجلها (مجمع الاتصالات يسجلها لكل اتصال).
+
+    Args:
+        conn (sqlite3.Connection): الاتصال
+        user_id (callable | int | None): دالة تعيد رقم المستخدم الحالي، أو قيمة ثابتة
+    """
+    getter = user_id if callable(user_id) else (lambda: user_id)
+    conn.create_function('current_user_id', 0, getter)
+
+
+def create_change_triggers(conn, table):
+    """
+    (إعادة) إنشاء مشغلات تسجيل تغييرات جدول من أعمدته الحالية
+
+    الإضافة تسجل القيم الجديدة والحذف القيم القديمة، والتعديل يسجل
+    [القديمة، الجديدة] للأعمدة المتغيرة فقط. json_patch مع '{}' يحذف
+    المفاتيح ذات القيمة NULL فيبقى السجل مختصراً.
+    يجب استدعاؤها مرة أخرى بعد أي ترحيل يضيف أعمدة لجدول مسجل.
+    """
+    columns = table_columns(conn, table)
+    user = "current_user_id()"
+
+    def snapshot(alias):
+        pairs = ', '.join(f"'{column}', {alias}.{column}" for column in columns)
+        return f"json_patch('{{}}', json_object({pairs}))"
+
+    diff_pairs = ', '.join(
+        f"'{column}', CASE WHEN OLD.{column} IS NOT NEW.{column} "
+        f"THEN json_array(OLD.{column}, NEW.{column}) END"
+        for column in columns
+    )
+    changed = ' OR '.join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+
+    for operation in ('insert', 'update', 'delete'):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_capture_{operation}")
+
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_capture_insert
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO row_changes (table_name, row_id, operation, changes, user_id)
+            VALUES ('{table}', NEW.id, 'INSERT', {snapshot('NEW')}, {user});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_capture_update
+        AFTER UPDATE ON {table}
+        WHEN {changed}
+        BEGIN
+            INSERT INTO row_changes (table_name, row_id, operation, changes, user_id)
+            VALUES ('{table}', NEW.id, 'UPDATE', json_patch('{{}}', json_object({diff_pairs})), {user});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_{table}_capture_delete
+        AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO row_changes (table_name, row_id, operation, changes, user_id)
+            VALUES ('{table}', OLD.id, 'DELETE', {snapshot('OLD')}, {user});
+        END
+    """)
+
+
+def _create_base_schema(conn):
+    """الجداول الأساسية للنظام"""
+    execute_script(conn, BASE_SCHEMA)
+
+
+def _create_indexes(conn):
+    """الفهارس الثانوية للاستعلامات المتكررة"""
+    execute_script(conn, INDEXES_SCHEMA)
+
+
+def _create_financial_rollups(conn):
+    """جداول المجاميع المالية ومشغلاتها، ثم تعبئتها من البيانات الحالية"""
+    execute_script(conn, ROLLUPS_SCHEMA)
+    for statement in REBUILD_ROLLUPS_STATEMENTS:
+        conn.execute(statement)
+
+
+def _create_invoice_sequences(conn):
+    """جدول تسلسل أرقام الفواتير، مهيأ من الفواتير الحالية"""
+    execute_script(conn, INVOICE_SEQUENCES_SCHEMA)
+
+
+def _create_change_capture(conn):
+    """جدول تغييرات الصفوف ومشغلات الجداول الأساسية"""
+    execute_script(conn, CHANGE_CAPTURE_SCHEMA)
+    for table in CAPTURED_TABLES:
+        create_change_triggers(conn, table)
+
+
+def _connection_change_user(conn):
+    """
+    المستخدم من دالة الاتصال current_user_id() بدلاً من صف change_session
+    المحفوظ في الملف (يتداخل بين نسخ البرنامج ويبقى بعد الخروج وفي النسخ)
+    """
+    for table in CAPTURED_TABLES:
+        create_change_triggers(conn, table)
+    conn.execute("DROP TABLE IF EXISTS change_session")
+
+
+# (الإصدار، الوصف، دالة الترحيل) بترتيب تصاعدي
+MIGRATIONS = [
+    (1, "الجداول الأساسية", _create_base_schema),
+    (2, "فهارس الاستعلامات", _create_indexes),
+    (3, "المجاميع المالية اليومية والشهرية", _create_financial_rollups),
+    (4, "تسلسل أرقام الفواتير", _create_invoice_sequences),
+    (5, "تسجيل تغييرات الصفوف", _create_change_capture),
+    (6, "نسب التغييرات لمستخدم الاتصال", _connection_change_user),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def apply_migrations(conn):
+    """
+    ترقية قاعدة البيانات إلى أحدث إصدار
+
+    كل ترحيل ورفع رقم الإصدار بعده في معاملة واحدة صريحة: الترحيل الذي
+    يفشل في منتصفه لا يترك أثراً (اتصال الكتابة يعمل بـ isolation_level=None
+    فلا يفتح Python المعاملة تلقائياً)
+
+    Args:
+        conn (sqlite3.Connection): اتصال الكتابة
+
+    Returns:
+        list: أرقام الترحيلات التي تم تطبيقها
+    """
+    current = get_schema_version(conn)
+    if current > LATEST_VERSION:
+        raise sqlite3.DatabaseError(
+            f"إصدار قاعدة البيانات ({current}) أحدث من إصدار البرنامج ({LATEST_VERSION})"
+        )
+
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migrate(conn)
+            set_schema_version(conn, version)
+            conn.execute("COMMIT")
+            applied.append(version)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"فشل ترحيل المخطط رقم {version} ({description}): {str(e)}")
+            raise
+
+    return applied
@@ -0,0 +1,175 @@
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _ExecutorSignals(QObject):
+    """إشارات تنقل نتائج خيوط العمل إلى خيط الواجهة"""
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+    done = pyqtSignal(object)
+
+
+class _QueryTask(QRunnable):
+    """مهمة تنفذ دالة استعلام واحدة على خيط عمل"""
+
+    def __init__(self, database, signals, key, generation, fn, args, kwargs):
+        super().__init__()
+        # المنفذ يحتفظ بالمرجع حتى تنتهي run() على خيط العمل (انظر done)
+        self.setAutoDelete(False)
+        self.database = database
+        self.signals = signals
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def run(self):
+        """تنفيذ الاستعلام وإرسال النتيجة"""
+        try:
+            if self.cancelled:
+                return
+
+            with self._lock:
+                # اتصالات هذا الخيط من المجمع، لإمكانية مقاطعتها عند الإلغاء
+                self._connections = [
+                    self.database.conn,
+                    self.database.read_connection()
+                ]
+
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception as e:
+                self.signals.failed.emit(self.key, self.generation, str(e))
+            else:
+                self.signals.finished.emit(self.key, self.generation, result)
+        finally:
+            with self._lock:
+                self._connections = []
+            # آخر ما تفعله المهمة: بعدها يمكن للمنفذ تحرير المرجع
+            self.signals.done.emit(self)
+
+    def cancel(self):
+        """إلغاء المهمة ومقاطعة استعلامها الجاري إن وجد"""
+        self.cancelled = True
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.interrupt()
+                except Exception:
+                    pass
+
+
+class QueryExecutor(QObject):
+    """تنفيذ استعلامات المديرين خارج خيط الواجهة وإعادة النتائج للنوافذ"""
+
+    def __init__(self, database, parent=None, max_threads=2):
+        """
+        تهيئة المنفذ
+
+        Args:
+            database (Database): قاعدة البيانات، ولكل خيط عمل اتصالاته الخاصة من المجمع
+            parent (QObject): الكائن الأب
+            max_threads (int): أقصى عدد لخيوط العمل
+        """
+        super().__init__(parent)
+        self.database = database
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_threads)
+        # إبقاء الخيوط حية حتى لا تتراكم اتصالات خيوط منتهية في المجمع
+        self.thread_pool.setExpiryTimeout(-1)
+
+        self._generations = {}
+        self._tasks = {}
+        self._callbacks = {}
+        # كل مهمة بدأت ولم تنته run() الخاصة بها بعد: تحرير آخر مرجع
+        # لمهمة جارية (عند الإلغاء أو وصول النتيجة) يحذفها أثناء تنفيذها
+        self._running = set()
+
+        self.signals = _ExecutorSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self.signals.done.connect(self._running.discard)
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, **kwargs):
+        """
+        تنفيذ دالة في الخلفية مع إلغاء أي طلب سابق بنفس المفتاح
+
+        Args:
+            key (str): مفتاح الطلب (مثل "cars" أو "report")
+            fn (callable): الدالة التي تنفذ الاستعلام وتعيد النتيجة
+            on_result (callable): تُستدعى في خيط الواجهة بالنتيجة
+            on_error (callable): تُستدعى في خيط الواجهة برسالة الخطأ
+
+        Returns:
+            int: رقم الجيل الخاص بهذا الطلب
+        """
+        self.cancel(key)
+
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+
+        task = _QueryTask(self.database, self.signals, key, generation, fn, args, kwargs)
+        self._tasks[key] = task
+        self._callbacks[key] = (generation, on_result, on_error)
+        self._running.add(task)
+        self.thread_pool.start(task)
+        return generation
+
+    def cancel(self, key):
+        """إلغاء الطلب الجاري بالمفتاح المحدد، ونتيجته لن تصل للواجهة"""
+        task = self._tasks.pop(key, None)
+        self._callbacks.pop(key, None)
+        if task is None:
+            return
+
+        # المهمة التي لم تبدأ تُسحب من الطابور، والجارية تُقاطع
+        if self.thread_pool.tryTake(task):
+            self._running.discard(task)
+        else:
+            task.cancel()
+
+    def cancel_all(self):
+        """إلغاء جميع الطلبات الجارية"""
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def is_pending(self, key):
+        """هل يوجد طلب لم تصل نتيجته بعد"""
+        return key in self._tasks
+
+    def shutdown(self):
+        """إلغاء كل الطلبات وانتظار انتهاء خيوط العمل"""
+        self.cancel_all()
+        self.thread_pool.waitForDone()
+        self._running.clear()
+
+    def _take(self, key, generation):
+        """إزالة الطلب إذا كان الأحدث لمفتاحه، وإرجاع دوال الاستدعاء"""
+        entry = self._callbacks.get(key)
+        if entry is None or entry[0] != generation:
+            # نتيجة طلب قديم تم استبداله
+            return None
+
+        self._callbacks.pop(key, None)
+        self._tasks.pop(key, None)
+        return entry
+
+    def _on_finished(self, key, generation, result):
+        """استقبال نتيجة ناجحة في خيط الواجهة"""
+        entry = self._take(key, generation)
+        if entry and entry[1]:
+            entry[1](result)
+
+    def _on_failed(self, key, generation, error):
+        """استقبال خطأ في خيط الواجهة"""
+        entry = self._take(key, generation)
+        if entry is None:
+            return
+        if entry[2]:
+            entry[2](error)
+        else:
+            print(f"خطأ في تنفيذ الاستعلام ({key}): {error}")
@@ -0,0 +1,294 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+
+# العبارات التي يمكن طلب خطة تنفيذها
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+# مسارات الملفات التي لا تُعتبر موقع الاستدعاء
+_INTERNAL_FILES = (os.path.abspath(__file__), sqlite3.__file__)
+
+
+def normalize_sql(sql):
+    """توحيد نص الاستعلام (إزالة المسافات الزائدة) لاستخدامه كمفتاح للإحصائيات"""
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def _percentile(sorted_values, fraction):
+    """حساب النسبة المئوية من قائمة مرتبة"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _caller_location():
+    """موقع الكود الذي نفذ الاستعلام (ملف:سطر)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.abspath(filename) not in _INTERNAL_FILES:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "غير معروف"
+
+
+class _Measurement:
+    """قياس تنفيذ واحد لاستعلام (يشمل وقت جلب النتائج)"""
+    __slots__ = ('elapsed', 'rows', 'logged')
+
+    def __init__(self, elapsed, rows):
+        self.elapsed = elapsed
+        self.rows = rows
+        self.logged = False
+
+
+class _StatementStats:
+    """الإحصائيات المجمعة لاستعلام واحد"""
+
+    def __init__(self, sql, max_samples):
+        self.sql = sql
+        self.count = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.callers = set()
+        self.samples = deque(maxlen=max_samples)
+
+
+class QueryStats:
+    """تجميع توقيتات الاستعلامات وتسجيل الاستعلامات البطيئة"""
+
+    def __init__(self, slow_threshold_ms=200, max_samples=1000):
+        """
+        تهيئة الإحصائيات
+
+        Args:
+            slow_threshold_ms (float): الحد الأدنى (بالمللي ثانية) لاعتبار الاستعلام بطيئاً
+            max_samples (int): عدد القياسات المحفوظة لكل استعلام لحساب النسب المئوية
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_samples = max_samples
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._statements = {}
+
+        # سجل الاستعلامات البطيئة في مجلد السجلات بجانب سجل الأحداث
+        self.logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.log_file = os.path.join(self.logs_dir, 'slow_queries.log')
+
+        self.logger = logging.getLogger('slow_queries')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._handler = None
+
+    def _get_logger(self):
+        """فتح ملف سجل الاستعلامات البطيئة عند أول استخدام"""
+        if self._handler is None:
+            self._handler = logging.FileHandler(self.log_file, encoding='utf-8')
+            self._handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+            self.logger.addHandler(self._handler)
+        return self.logger
+
+    def configure(self, slow_threshold_ms=None, enabled=None):
+        """تعديل حد الاستعلام البطيء أو تفعيل/تعطيل القياس"""
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        if enabled is not None:
+            self.enabled = enabled
+
+    def record(self, sql, elapsed, rows, caller):
+        """تسجيل تنفيذ استعلام وإرجاع القياس لتحديثه عند جلب النتائج"""
+        key = normalize_sql(sql)
+        measurement = _Measurement(elapsed, rows)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _StatementStats(key, self.max_samples)
+            stats.count += 1
+            stats.rows += max(rows, 0)
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.callers.add(caller)
+            stats.samples.append(measurement)
+        return key, measurement
+
+    def add_fetch(self, key, measurement, elapsed, rows):
+        """إضافة وقت وعدد صفوف الجلب إلى قياس سابق"""
+        with self._lock:
+            measurement.elapsed += elapsed
+            measurement.rows += rows
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.rows += rows
+                stats.total += elapsed
+                stats.max = max(stats.max, measurement.elapsed)
+
+    def is_slow(self, measurement):
+        """هل تجاوز القياس حد الاستعلام البطيء ولم يُسجل بعد"""
+        return (
+            not measurement.logged
+            and measurement.elapsed * 1000 >= self.slow_threshold_ms
+        )
+
+    def log_slow(self, conn, sql, params, measurement, caller):
+        """كتابة الاستعلام البطيء مع خطة تنفيذه في السجل"""
+        measurement.logged = True
+        try:
+            plan = self.explain(conn, sql, params)
+            self._get_logger().warning(
+                f"{measurement.elapsed * 1000:.1f}ms | الصفوف: {measurement.rows} | "
+                f"الموقع: {caller}\n"
+                f"    SQL: {normalize_sql(sql)}\n"
+                f"    الخطة:\n{plan}"
+            )
+        except Exception as e:
+            print(f"خطأ في تسجيل الاستعلام البطيء: {str(e)}")
+
+    @staticmethod
+    def explain(conn, sql, params=()):
+        """خطة تنفيذ الاستعلام (EXPLAIN QUERY PLAN) كنص"""
+        statement = sql.strip()
+        if not statement.upper().startswith(_EXPLAINABLE):
+            return "        -"
+        try:
+            # مؤشر عادي حتى لا يُقاس الاستعلام التفسيري نفسه
+            cursor = conn.cursor(sqlite3.Cursor)
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", params or ())
+            rows = cursor.fetchall()
+            cursor.close()
+            return "\n".join(f"        {row[-1]}" for row in rows) or "        -"
+        except sqlite3.Error as e:
+            return f"        (تعذر الحصول على الخطة: {str(e)})"
+
+    def snapshot(self):
+        """
+        ملخص الإحصائيات لكل استعلام مرتباً حسب إجمالي الوقت
+
+        Returns:
+            list: قائمة قواميس تحتوي sql, count, rows, p50_ms, p95_ms, max_ms, total_ms, callers
+        """
+        with self._lock:
+            items = [
+                (stats, sorted(m.elapsed for m in stats.samples))
+                for stats in self._statements.values()
+            ]
+            result = []
+            for stats, durations in items:
+                result.append({
+                    'sql': stats.sql,
+                    'count': stats.count,
+                    'rows': stats.rows,
+                    'p50_ms': _percentile(durations, 0.50) * 1000,
+                    'p95_ms': _percentile(durations, 0.95) * 1000,
+                    'max_ms': stats.max * 1000,
+                    'total_ms': stats.total * 1000,
+                    'callers': sorted(stats.callers)
+                })
+
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+    def reset(self):
+        """مسح جميع الإحصائيات المجمعة"""
+        with self._lock:
+            self._statements.clear()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """مؤشر يقيس زمن كل استعلام وعدد صفوفه وموقع استدعائه"""
+
+    _stats_key = None
+    _measurement = None
+
+    def _measure(self, method, sql, params, *args):
+        if not query_stats.enabled:
+            self._measurement = None
+            return method(self, sql, *args)
+
+        caller = _caller_location()
+        start = time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            rows = self.rowcount if self.rowcount > 0 else 0
+            self._stats_key, self._measurement = query_stats.record(sql, elapsed, rows, caller)
+            self._sql, self._params, self._caller = sql, params, caller
+            # استعلامات القراءة تُفحص بعد جلب صفوفها
+            if self.description is None and query_stats.is_slow(self._measurement):
+                query_stats.log_slow(self.connection, sql, params, self._measurement, caller)
+
+    def execute(self, sql, parameters=()):
+        return self._measure(sqlite3.Cursor.execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # خطة التنفيذ تُطلب بمعاملات الصف الأول إن أمكن
+        if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters:
+            params = seq_of_parameters[0]
+        else:
+            params = None
+        return self._measure(sqlite3.Cursor.executemany, sql, params, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._measure(sqlite3.Cursor.executescript, sql_script, None)
+
+    def _measure_fetch(self, method, *args):
+        if self._measurement is None:
+            return method(self, *args)
+
+        start = time.perf_counter()
+        result = method(self, *args)
+        elapsed = time.perf_counter() - start
+
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 1 if result is not None else 0
+        query_stats.add_fetch(self._stats_key, self._measurement, elapsed, rows)
+
+        if query_stats.is_slow(self._measurement):
+            query_stats.log_slow(
+                self.connection, self._sql, self._params, self._measurement, self._caller
+            )
+        return result
+
+    def fetchone(self):
+        return self._measure_fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return self._measure_fetch(sqlite3.Cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._measure_fetch(sqlite3.Cursor.fetchall)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """اتصال ينشئ مؤشرات مقاسة افتراضياً (بما في ذلك conn.execute)"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# إنشاء نسخة عامة من الإحصائيات
+query_stats = QueryStats()
@@ -0,0 +1,117 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout,
+    QPushButton, QLabel, QSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QColor
+from .utils import UIHelper
+from .query_stats import query_stats
+
+
+class QueryStatsDialog(QDialog):
+    def __init__(self, database, current_user_id, current_username):
+        super().__init__()
+        self.database = database
+        self.current_user_id = current_user_id
+        self.current_username = current_username
+        self.init_ui()
+        self.load_stats()
+
+    def init_ui(self):
+        """تهيئة واجهة المستخدم"""
+        self.setWindowTitle("أداء الاستعلامات")
+        self.setGeometry(100, 100, 1100, 600)
+
+        layout = QVBoxLayout()
+
+        # عنوان الصفحة
+        title_label = QLabel("إحصائيات الاستعلامات")
+        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title_label)
+
+        # حد الاستعلام البطيء
+        settings_layout = QHBoxLayout()
+        self.threshold_input = QSpinBox()
+        self.threshold_input.setRange(1, 60000)
+        self.threshold_input.setSuffix(" ms")
+        self.threshold_input.setValue(int(query_stats.slow_threshold_ms))
+        self.threshold_input.valueChanged.connect(self.update_threshold)
+        settings_layout.addWidget(QLabel("حد الاستعلام البطيء:"))
+        settings_layout.addWidget(self.threshold_input)
+        settings_layout.addWidget(QLabel(f"السجل: {query_stats.log_file}"))
+        settings_layout.addStretch()
+        layout.addLayout(settings_layout)
+
+        # جدول الإحصائيات
+        self.table = QTableWidget()
+        self.table.setColumnCount(8)
+        self.table.setHorizontalHeaderLabels([
+            "الاستعلام", "عدد المرات", "الصفوف", "p50 (ms)",
+            "p95 (ms)", "الأقصى (ms)", "الإجمالي (ms)", "موقع الاستدعاء"
+        ])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setWordWrap(False)
+        layout.addWidget(self.table)
+
+        # الأزرار
+        button_layout = QHBoxLayout()
+
+        refresh_button = QPushButton("تحديث")
+        refresh_button.clicked.connect(self.load_stats)
+        button_layout.addWidget(refresh_button)
+
+        reset_button = QPushButton("مسح الإحصائيات")
+        reset_button.clicked.connect(self.reset_stats)
+        button_layout.addWidget(reset_button)
+
+        close_button = QPushButton("إغلاق")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(close_button)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def load_stats(self):
+        """تحميل الإحصائيات المجمعة"""
+        try:
+            stats = query_stats.snapshot()
+            threshold = query_stats.slow_threshold_ms
+            self.table.setRowCount(len(stats))
+
+            for i, item in enumerate(stats):
+                values = [
+                    item['sql'],
+                    str(item['count']),
+                    str(item['rows']),
+                    f"{item['p50_ms']:.2f}",
+                    f"{item['p95_ms']:.2f}",
+                    f"{item['max_ms']:.2f}",
+                    f"{item['total_ms']:.2f}",
+                    ", ".join(item['callers'])
+                ]
+                for j, value in enumerate(values):
+                    cell = QTableWidgetItem(value)
+                    cell.setToolTip(value)
+                    self.table.setItem(i, j, cell)
+
+                # تمييز الاستعلامات التي يتجاوز p95 لها الحد
+                if item['p95_ms'] >= threshold:
+                    for j in range(len(values)):
+                        self.table.item(i, j).setBackground(QColor("#f8d7da"))
+
+        except Exception as e:
+            UIHelper.show_error(self, "خطأ", f"حدث خطأ أثناء تحميل الإحصائيات: {str(e)}")
+
+    def update_threshold(self, value):
+        """تعديل حد الاستعلام البطيء"""
+        query_stats.configure(slow_threshold_ms=value)
+        self.load_stats()
+
+    def reset_stats(self):
+        """مسح الإحصائيات المجمعة"""
+        if UIHelper.confirm_action(self, "تأكيد", "هل أنت متأكد من مسح إحصائيات الاستعلامات؟"):
+            query_stats.reset()
+            self.load_stats()
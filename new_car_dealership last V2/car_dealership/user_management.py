@@ -195,46 +195,45 @@ class UserManagementDialog(QDialog):
             return
         
         try:
-            if self.selected_user_id:  # تعديل مستخدم موجود
-                if password:  # إذا تم إدخال كلمة مرور جديدة
+            with self.database.transaction():
+                if self.selected_user_id:  # تعديل مستخدم موجود
+                    if password:  # إذا تم إدخال كلمة مرور جديدة
+                        hashed_password = Security.hash_password(password)
+                        self.database.cursor.execute("""
+                            UPDATE users 
+                            SET username = ?, password = ?, role = ?
+                            WHERE id = ?
+                        """, (username, hashed_password, role, self.selected_user_id))
+                    else:  # تحديث بدون تغيير كلمة المرور
+                        self.database.cursor.execute("""
+                            UPDATE users 
+                            SET username = ?, role = ?
+                            WHERE id = ?
+                        """, (username, role, self.selected_user_id))
+                    
+                    event_type = "تعديل_مستخدم"
+                    description = f"تم تعديل بيانات المستخدم: {username}"
+                    message = "تم تحديث بيانات المستخدم بنجاح"
+                else:  # إضافة مستخدم جديد
                     hashed_password = Security.hash_password(password)
                     self.database.cursor.execute("""
-                        UPDATE users 
-                        SET username = ?, password = ?, role = ?
-                        WHERE id = ?
-                    """, (username, hashed_password, role, self.selected_user_id))
-                else:  # تحديث بدون تغيير كلمة المرور
-                    self.database.cursor.execute("""
-                        UPDATE users 
-                        SET username = ?, role = ?
-                        WHERE id = ?
-                    """, (username, role, self.selected_user_id))
-                
-                audit_logger.log_event(
-                    user_id=self.current_user_id,
-                    username=self.current_username,
-                    event_type="تعديل_مستخدم",
-                    description=f"تم تعديل بيانات المستخدم: {username}"
-                )
-                
-                UIHelper.show_success(self, "نجاح", "تم تحديث بيانات المستخدم بنجاح")
-            else:  # إضافة مستخدم جديد
-                hashed_password = Security.hash_password(password)
-                self.database.cursor.execute("""
-                    INSERT INTO users (username, password, role, active)
-                    VALUES (?, ?, ?, 1)
-                """, (username, hashed_password, role))
-                
-                audit_logger.log_event(
-                    user_id=self.current_user_id,
-                    username=self.current_username,
-                    event_type="إضافة_مستخدم",
-                    description=f"تم إضافة مستخدم جديد: {username}"
-                )
-                
-                UIHelper.show_success(self, "نجاح", "تم إضافة المستخدم بنجاح")
+                        INSERT INTO users (username, password, role, active)
+                        VALUES (?, ?, ?, 1)
+                    """, (username, hashed_password, role))
+                    
+                    event_type = "إضافة_مستخدم"
+                    description = f"تم إضافة مستخدم جديد: {username}"
+                    message = "تم إضافة المستخدم بنجاح"
             
-            self.database.conn.commit()
+            # التسجيل والرسائل بعد نجاح المعاملة حتى لا يبقى قفل الكتابة مفتوحاً
+            audit_logger.log_event(
+                user_id=self.current_user_id,
+                username=self.current_username,
+                event_type=event_type,
+                description=description
+            )
+            
+            UIHelper.show_success(self, "نجاح", message)
             self.clear_fields()
             self.load_users()
             
@@ -254,15 +253,16 @@ class UserManagementDialog(QDialog):
             return
         
         try:
-            self.database.cursor.execute("""
-                UPDATE users 
-                SET active = ?
-                WHERE id = ?
-            """, (active, self.selected_user_id))
-            
             status = "تفعيل" if active == 1 else "تعطيل"
             username = self.table.item(self.table.currentRow(), 1).text()
             
+            with self.database.transaction():
+                self.database.cursor.execute("""
+                    UPDATE users 
+                    SET active = ?
+                    WHERE id = ?
+                """, (active, self.selected_user_id))
+            
             audit_logger.log_event(
                 user_id=self.current_user_id,
                 username=self.current_username,
@@ -270,7 +270,6 @@ class UserManagementDialog(QDialog):
                 description=f"تم {status} المستخدم: {username}"
             )
             
-            self.database.conn.commit()
             self.load_users()
             UIHelper.show_success(self, "نجاح", f"تم {status} المستخدم بنجاح")
             
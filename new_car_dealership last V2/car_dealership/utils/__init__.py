@@ -1,3 +1,4 @@
 from .ui_helper import UIHelper
 from .validator import Validator
 from .constants import Constants
+from .text_normalizer import TextNormalizer
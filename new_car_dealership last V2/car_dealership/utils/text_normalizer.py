@@ -0,0 +1,68 @@
+import re
+
+class TextNormalizer:
+    """توحيد النصوص العربية للبحث: الهمزات والتاء المربوطة والتشكيل والتطويل"""
+
+    # التشكيل وعلامات القرآن والتطويل (تُحذف)
+    _REMOVED = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+
+    # حروف تُوحّد إلى شكل واحد (حرف مقابل حرف، فلا تتغير المواضع إلا بالحذف)
+    _CHAR_MAP = str.maketrans({
+        'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+        'ى': 'ي', 'ئ': 'ي',
+        'ؤ': 'و',
+        'ة': 'ه',
+        '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+        '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9'
+    })
+
+    @staticmethod
+    def normalize(text):
+        """النص بعد التوحيد (للفهرسة والاستعلام)."""
+        if not text:
+            return ''
+        text = TextNormalizer._REMOVED.sub('', str(text))
+        return text.translate(TextNormalizer._CHAR_MAP).lower()
+
+    @staticmethod
+    def normalize_with_map(text):
+        """
+        النص بعد التوحيد مع موضع كل حرف منه في النص الأصلي
+
+        Returns:
+            tuple: (النص الموحد، قائمة المواضع الأصلية)
+        """
+        chars = []
+        positions = []
+        for i, char in enumerate(str(text or '')):
+            if TextNormalizer._REMOVED.match(char):
+                continue
+            for out in char.translate(TextNormalizer._CHAR_MAP).lower():
+                chars.append(out)
+                positions.append(i)
+        return ''.join(chars), positions
+
+    @staticmethod
+    def tokens(text):
+        """كلمات النص بعد التوحيد."""
+        return re.findall(r'\w+', TextNormalizer.normalize(text))
+
+    @staticmethod
+    def fts_query(text):
+        """
+        استعلام FTS5 من نص المستخدم: كل كلمة مطلوبة وتطابق كبادئة
+
+        الكلمات توضع بين علامتي تنصيص فلا تُفسر رموز المستخدم كعوامل FTS5.
+        """
+        return ' '.join(f'"{token}"*' for token in TextNormalizer.tokens(text))
+
+    @staticmethod
+    def matches(query, *texts):
+        """هل كل كلمات الاستعلام بادئات لكلمات في أحد النصوص (نفس دلالة fts_query)."""
+        words = set()
+        for text in texts:
+            words.update(TextNormalizer.tokens(text))
+        return all(
+            any(word.startswith(token) for word in words)
+            for token in TextNormalizer.tokens(query)
+        )
@@ -11,6 +11,8 @@ from car_dealership.database import Database
 from car_dealership.login import LoginWindow
 from car_dealership.main import MainWindow
 from car_dealership.audit_log import audit_logger
+from car_dealership.backup_catalog import BACKUP_DIR
+from car_dealership.backup_scheduler import BackupScheduler
 
 def setup_environment():
     """تهيئة بيئة التطبيق"""
@@ -51,6 +53,10 @@ def main():
         # تهيئة قاعدة البيانات
         database = Database()
         
+        # النسخ الاحتياطي التلقائي في الخلفية (حسب backups/backup_schedule.json)
+        scheduler = BackupScheduler(database.db_path, BACKUP_DIR)
+        scheduler.start()
+        
         print("جاري عرض نافذة تسجيل الدخول...")
         
         # عرض نافذة تسجيل الدخول
@@ -82,9 +88,12 @@ def main():
             window.showMaximized()  # عرض النافذة بحجم كامل
             
             # تشغيل حلقة الأحداث الرئيسية
-            return app.exec()
+            result = app.exec()
+            scheduler.stop()
+            return result
             
         print("تم إلغاء تسجيل الدخول")
+        scheduler.stop()
         return 0
         
     except Exception as e:
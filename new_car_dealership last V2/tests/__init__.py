@@ -0,0 +1 @@
+"""اختبارات التطبيق"""
@@ -0,0 +1,138 @@
+"""
+اختبارات سلسلة بصمات سجل التدقيق (audit_chain)
+
+يُكتب سجل مؤقت عبر AuditStore بمفتاح توقيع من متغير البيئة (فلا يُنشأ
+ملف مفتاح في ملف المستخدم)، ويُتحقق منه مرة، ثم يُعبث بملفاته كما يفعل
+من يريد إخفاء تعديل، ويُتحقق من أن التحقق يبلغ عن أول رابط مكسور بسببه
+ورقم سجله.
+
+الاستخدام (من مجلد التطبيق):
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from car_dealership.audit_store import AuditStore, EVENT_FIELDS
+from car_dealership.audit_chain import KEY_ENV, GENESIS_HASH, record_hash
+
+EVENTS = 2500
+# checkpoint_interval الافتراضي: نقاط تحقق دورية عند 1000 و 2000
+INTERVAL = 1000
+
+
+def event(index):
+    return {
+        'timestamp': f"2024-05-01 10:{index // 60 % 60:02d}:{index % 60:02d}",
+        'user_id': 1,
+        'username': 'admin',
+        'event_type': 'اختبار',
+        'description': f"حدث {index}",
+        'status': 'نجاح'
+    }
+
+
+class AuditChainTest(unittest.TestCase):
+    """اكتشاف تعديل ملفات السجل ونقاط التحقق وحالة التحقق"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {KEY_ENV: 'test-audit-chain-key'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.logs_dir = tempfile.mkdtemp(prefix='audit_chain_')
+        self.store = AuditStore(self.logs_dir)
+        self.store.append([event(i) for i in range(EVENTS)])
+        self.store.checkpoint()
+        report = self.store.verify()
+        self.assertTrue(report['ok'], report['broken'])
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.logs_dir, ignore_errors=True)
+
+    def read_records(self):
+        with open(self.store.events_file, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def write_records(self, records):
+        with open(self.store.events_file, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def assertBroken(self, report, seq, reason):
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['broken']['seq'], seq, report['broken'])
+        self.assertEqual(report['broken']['reason'], reason)
+
+    def test_edited_line(self):
+        records = self.read_records()
+        records[4]['description'] = "وصف معدل"
+        self.write_records(records)
+
+        self.assertBroken(self.store.verify(full=True), 5, "محتوى السجل معدل")
+
+    def test_edited_line_with_recomputed_chain(self):
+        # إعادة حساب كل البصمات بعد التعديل لا تطابق نقاط التحقق الموقعة
+        records = self.read_records()
+        records[4]['description'] = "وصف معدل"
+        prev_hash = GENESIS_HASH
+        for record in records:
+            record['prev_hash'] = prev_hash
+            record['hash'] = prev_hash = record_hash(record['seq'], prev_hash, record, EVENT_FIELDS)
+        self.write_records(records)
+
+        self.assertBroken(
+            self.store.verify(full=True), INTERVAL, "السجل لا يطابق نقطة التحقق الموقعة"
+        )
+
+    def test_deleted_line(self):
+        records = self.read_records()
+        del records[9]
+        self.write_records(records)
+
+        self.assertBroken(self.store.verify(full=True), 11, "تسلسل غير متصل (المتوقع 10)")
+
+    def test_truncated_checkpoints_file(self):
+        with open(self.store.chain.checkpoints_file, encoding='utf-8') as f:
+            lines = f.readlines()
+        with open(self.store.chain.checkpoints_file, 'w', encoding='utf-8') as f:
+            f.writelines(lines[:1])
+
+        # النقطة التي بدأ منها التحقق التزايدي لم تعد موجودة
+        self.assertBroken(
+            self.store.verify(), EVENTS, "نقطة التحقق المعتمدة سابقاً حُذفت من ملف نقاط التحقق"
+        )
+        # ومن أول السجل: أول سجل دوري بلا نقطة تحقق
+        self.assertBroken(
+            self.store.verify(full=True), 2 * INTERVAL, "نقطة التحقق الموقعة لهذا السجل مفقودة"
+        )
+
+    def test_checkpoints_file_cut_mid_line(self):
+        with open(self.store.chain.checkpoints_file, 'rb') as f:
+            data = f.read()
+        with open(self.store.chain.checkpoints_file, 'wb') as f:
+            f.write(data[:-20])
+
+        self.assertBroken(self.store.verify(full=True), None, "سطر تالف في ملف نقاط التحقق")
+
+    def test_deleted_state_file(self):
+        os.remove(self.store.chain.state_file)
+
+        self.assertBroken(
+            self.store.verify(), None,
+            "حالة آخر تحقق ناجح (audit_verify.json) مفقودة أو توقيعها غير صحيح"
+        )
+        # التحقق الكامل الصريح يعيد بناء الحالة
+        report = self.store.verify(full=True)
+        self.assertTrue(report['ok'], report['broken'])
+        self.assertTrue(self.store.verify()['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
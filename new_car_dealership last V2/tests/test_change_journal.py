@@ -0,0 +1,171 @@
+"""
+اختبارات الاسترجاع إلى لحظة محددة (change_journal.recover)
+
+تُنشأ قاعدة مؤقتة بالترحيلات الحالية ونسخة احتياطية منها، ثم تُنفذ تغييرات
+تلتقطها مشغلات row_changes وتُؤرشف إلى backups/journal، ويُقارن ناتج
+recover بمحتوى الجداول المسجلة كما كان في اللحظة المطلوبة.
+
+الاستخدام (من مجلد التطبيق):
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+from car_dealership.database import Database
+from car_dealership.backup_scheduler import take_backup
+from car_dealership.chunk_store import ChunkStore
+from car_dealership.change_journal import ChangeJournal, recover, ABANDONED_DIR
+from car_dealership.migrations import CAPTURED_TABLES
+
+
+def dump(db_path):
+    """صفوف الجداول المسجلة وسجل التغييرات في ملف قاعدة بيانات"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            for table in CAPTURED_TABLES + ('row_changes',)
+        }
+    finally:
+        conn.close()
+
+
+def pause():
+    """changed_at بدقة الملي ثانية: فاصل يضمن أن اللحظة تقع بين تغييرين"""
+    time.sleep(0.05)
+
+
+class RecoverTest(unittest.TestCase):
+    """إعادة بناء القاعدة من نسخة احتياطية وسجل التغييرات المؤرشف"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='change_journal_')
+        self.backup_dir = os.path.join(self.work_dir, 'backups')
+        self.database = Database(os.path.join(self.work_dir, 'aboraaya.db'))
+        self.journal = ChangeJournal(self.backup_dir)
+        self.output = os.path.join(self.work_dir, 'recovered.db')
+
+        # النسخة الأساسية تبدأ من موضع غير صفري في سجل التغييرات
+        self.add_client('أساسي')
+        self.backup = take_backup(self.database.db_path, self.backup_dir)
+        pause()
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def add_client(self, name):
+        """إضافة عميل وإرجاع معرفه"""
+        with self.database.transaction() as conn:
+            return conn.execute(
+                "INSERT INTO clients (name, phone, address, status) VALUES (?, ?, ?, ?)",
+                (name, f"010{name}", "القاهرة", "نشط")
+            ).lastrowid
+
+    def execute(self, sql, params=()):
+        with self.database.transaction() as conn:
+            conn.execute(sql, params)
+
+    def live(self):
+        return dump(self.database.db_path)
+
+    def moment(self):
+        """اللحظة الحالية بين تغييرين (مع محتوى القاعدة فيها)"""
+        pause()
+        moment = datetime.now()
+        state = self.live()
+        pause()
+        return moment, state
+
+    def backup_position(self):
+        """موضع سجل التغييرات في النسخة الأساسية"""
+        restored = os.path.join(self.work_dir, 'position.db')
+        ChunkStore(self.backup_dir).restore(self.backup['path'], restored)
+        return dump(restored)['row_changes'][-1][0]
+
+    def recover(self, moment):
+        result = recover(moment, self.output, self.backup_dir, self.database.db_path)
+        self.assertEqual(result['base'], self.backup['timestamp'])
+        return result
+
+    def test_recover_between_two_changes(self):
+        client_id = self.add_client('أحمد')
+        moment, expected = self.moment()
+        self.execute("UPDATE clients SET phone = ? WHERE id = ?", ('0100000000', client_id))
+        self.journal.archive(self.database.db_path)
+
+        result = self.recover(moment)
+
+        self.assertEqual(result['replayed'], 1)
+        self.assertEqual(dump(self.output), expected)
+        self.assertNotEqual(dump(self.output), self.live())
+
+    def test_recover_across_restore_fork(self):
+        removed_id = self.add_client('محذوف')
+        moment, expected = self.moment()
+        self.execute("DELETE FROM clients WHERE id = ?", (removed_id,))
+        self.journal.archive(self.database.db_path)
+
+        # استرجاع النسخة الأساسية ثم تغيير جديد: تاريخ ما بعد النسخة يُترك في فرع
+        restored = os.path.join(self.work_dir, 'restored.db')
+        ChunkStore(self.backup_dir).restore(self.backup['path'], restored)
+        self.database.replace_database(restored)
+        self.add_client('بعد الاسترجاع')
+        self.journal.archive(self.database.db_path)
+
+        branches = self.journal.branches()
+        self.assertEqual(len(branches), 1)
+        self.assertEqual(
+            os.path.dirname(branches[0]['directory']),
+            os.path.join(self.journal.root, ABANDONED_DIR)
+        )
+        self.assertEqual(branches[0]['fork'], self.backup_position())
+
+        # لحظة على التاريخ المتروك تُبنى من الفرع
+        self.recover(moment)
+        self.assertEqual(dump(self.output), expected)
+
+        # والتاريخ الحالي يُبنى من الأرشيف بعد التفرع
+        self.recover(datetime.now())
+        self.assertEqual(dump(self.output), self.live())
+
+    def test_update_changing_id(self):
+        client_id = self.add_client('منقول')
+        self.execute("UPDATE clients SET id = ?, phone = ? WHERE id = ?", (500, '0111111111', client_id))
+        self.execute("UPDATE clients SET address = ? WHERE id = ?", ('الجيزة', 500))
+        self.journal.archive(self.database.db_path)
+        moment, expected = self.moment()
+
+        self.recover(moment)
+
+        recovered = dump(self.output)
+        self.assertEqual(recovered, expected)
+        ids = [row[0] for row in recovered['clients']]
+        self.assertIn(500, ids)
+        self.assertNotIn(client_id, ids)
+
+    def test_live_tail_after_archive(self):
+        self.add_client('مؤرشف')
+        self.journal.archive(self.database.db_path)
+        archived = self.journal.last_id
+        # تغيير لم يُؤرشف بعد: يُقرأ من القاعدة الحية
+        self.add_client('غير مؤرشف')
+        moment, expected = self.moment()
+        self.add_client('بعد اللحظة')
+
+        result = self.recover(moment)
+
+        self.assertEqual(self.journal.last_id, archived)
+        self.assertEqual(result['replayed'], 2)
+        self.assertEqual(dump(self.output), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
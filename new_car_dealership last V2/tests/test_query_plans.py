@@ -0,0 +1,111 @@
+"""
+اختبارات خطط الاستعلامات المتكررة (EXPLAIN QUERY PLAN)
+
+تُنشأ قاعدة مؤقتة بالترحيلات الحالية، وتُنفذ دوال المديرين كما تستدعيها
+الصفحات مع تسجيل عبارات SQL الفعلية (set_trace_callback)، ثم يُتحقق من أن
+خطة كل عبارة تستخدم الفهرس المقصود لها وليس مسحاً كاملاً للجدول.
+
+الاستخدام (من مجلد التطبيق):
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from car_dealership.database import Database
+from car_dealership.financial.accounting import AccountingManager
+from car_dealership.financial.installments import InstallmentsManager
+from car_dealership.financial.invoices import InvoicesManager
+from car_dealership.financial.reports import ReportsManager
+
+START_DATE = '2024-01-01'
+END_DATE = '2024-12-31'
+
+
+class QueryPlanTest(unittest.TestCase):
+    """خطط الاستعلامات المتكررة في مديري الصفحات المالية"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='query_plans_')
+        self.database = Database(os.path.join(self.work_dir, 'query_plans.db'))
+        self.statements = []
+        # المديرون يقرؤون عبر اتصال الكتابة أو اتصال القراءة لنفس الخيط
+        for conn in (self.database.conn, self.database.read_connection()):
+            conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def traced(self, table):
+        """عبارات SELECT/UPDATE/DELETE المنفذة على جدول (بقيم معاملاتها)"""
+        return [
+            sql for sql in self.statements
+            if table in sql and sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))
+        ]
+
+    def plan(self, sql):
+        """تفاصيل خطة عبارة (عمود detail من EXPLAIN QUERY PLAN)"""
+        rows = self.database.read_connection().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return [row[3] for row in rows]
+
+    def assertUsesIndex(self, sql, table, index):
+        """الجدول في الخطة يُقرأ عبر الفهرس المحدد"""
+        plan = self.plan(sql)
+        # خطوات الجدول نفسه: "SCAN <الجدول>" أو "SEARCH <الجدول> USING ..."
+        steps = [step for step in plan if step.split()[:2] in (['SCAN', table], ['SEARCH', table])]
+        self.assertTrue(
+            any(f"USING INDEX {index}" in step or f"USING COVERING INDEX {index}" in step for step in plan),
+            f"الفهرس {index} غير مستخدم:\n{sql}\n{plan}"
+        )
+        self.assertFalse(
+            any(step.startswith('SCAN') for step in steps),
+            f"مسح كامل للجدول {table}:\n{sql}\n{plan}"
+        )
+
+    def run_traced(self, call, table):
+        """تنفيذ دالة مدير وإرجاع العبارات التي نفذتها على الجدول"""
+        self.statements.clear()
+        call()
+        statements = self.traced(table)
+        self.assertTrue(statements, f"لم تُنفذ أي عبارة على {table}")
+        return statements
+
+    def test_financial_entries_by_date(self):
+        manager = AccountingManager(self.database)
+        for sql in self.run_traced(lambda: manager.get_entries(START_DATE, END_DATE), 'financial_entries'):
+            self.assertUsesIndex(sql, 'financial_entries', 'idx_financial_entries_date')
+
+    def test_invoices_by_date(self):
+        manager = InvoicesManager(self.database)
+        for sql in self.run_traced(lambda: manager.get_invoices(START_DATE, END_DATE), 'invoices'):
+            self.assertUsesIndex(sql, 'i', 'idx_invoices_invoice_date')
+
+    def test_clients_report_invoices_by_client_and_date(self):
+        manager = ReportsManager(self.database)
+        for sql in self.run_traced(lambda: manager.generate_clients_report(START_DATE, END_DATE), 'invoices'):
+            self.assertUsesIndex(sql, 'i', 'idx_invoices_client_date')
+            self.assertUsesIndex(sql, 'inst', 'idx_installments_client_start')
+
+    def test_installments_by_status(self):
+        manager = InstallmentsManager(self.database)
+        for sql in self.run_traced(lambda: manager.get_installments(status='متأخر'), 'installments'):
+            self.assertUsesIndex(sql, 'i', 'idx_installments_status_next_payment')
+
+    def test_installments_status_update(self):
+        manager = InstallmentsManager(self.database)
+        for sql in self.run_traced(manager.update_status, 'installments'):
+            self.assertUsesIndex(sql, 'installments', 'idx_installments_status_next_payment')
+
+    def test_installments_by_next_payment(self):
+        manager = InstallmentsManager(self.database)
+        for sql in self.run_traced(lambda: manager.get_installments(start_date=START_DATE, end_date=END_DATE),
+                                   'installments'):
+            self.assertUsesIndex(sql, 'i', 'idx_installments_next_payment')
+
+
+if __name__ == '__main__':
+    unittest.main()